@@ -11,7 +11,7 @@
     Unix: https://docs.python.org/3/using/unix.html
   Przyda się też IDE - Pycharm : https://www.jetbrains.com/help/pycharm/installation-guide.html
 
-  Należy również zainstalować paczkę numpy (https://numpy.org/install/), oraz easyAI (https://zulko.github.io/easyAI/installation.html)
+  Należy również zainstalować paczkę easyAI (https://zulko.github.io/easyAI/installation.html)
 
 ## Zasady gry:
   Oware rozgrywane jest na płaszczyźnie składającej się z dwóch rzędów zawierających po sześć wgłębień.
@@ -27,9 +27,13 @@
 
 """
 
-import numpy as np
+from array import array
+
 from easyAI import TwoPlayerGame, Negamax, AI_Player
 
+from OwareSearch import IterativeDeepening
+from OwareTT import OwareTT
+
 
 class Oware(TwoPlayerGame):
     """
@@ -37,8 +41,10 @@ class Oware(TwoPlayerGame):
 
         Atrybuty:
             - players (array) : tablica graczy
-            - board (array) : tablica z aktualnym stanem gry
+            - board (array('B')) : zwarta tablica bajtów z aktualnym stanem gry (12 kubeczków)
             - current_player (int) : numer gracza aktualnie wykonującego ruch (1,2)
+            - undo_stack (list) : stos danych potrzebnych do cofnięcia kolejnych ruchów (ruch, liczba zasianych
+                                  nasion, punktacja, zebrane kubeczki), wykorzystywany przez unmake_move
             - player (Player) : gracz aktualnie wykonujący ruch
             - opponent_index (int) : indeks przeciwnika (0,1)
 
@@ -46,11 +52,15 @@ class Oware(TwoPlayerGame):
                 - __init__(self, players) : Inicjalizacja gry Oware
                 - possible_moves(self) : Zwrócenie możliwych ruchów
                 - make_move(self, move) : Modyfikacja planszy zgodnie z wykonanym ruchem
+                - unmake_move(self, move) : Cofnięcie ostatniego ruchu (przywrócenie planszy i punktacji)
                 - collect_seeds(self, position) : Zebranie nasion z kubeczków i zwiększenie punktacji gracza
                 - lose(self) : Czy aktualny gracz przegrał
                 - is_over(self) : Sprawdzenie czy gra została zakończona
                 - scoring(self) : Metoda oceniająca jakość gry gracza (AI)
                 - show(self) : Wyświetlenie aktualnego stanu gry
+
+        Plansza trzymana jest w tablicy array('B'), a ruchy wykonywane są w miejscu. Dzięki metodzie unmake_move
+        algorytm Negamax z easyAI nie kopiuje całego obiektu gry (razem z graczami) w każdym węźle drzewa.
     """
 
     def __init__(self, players=None):
@@ -69,8 +79,9 @@ class Oware(TwoPlayerGame):
         for i, player in enumerate(players):
             player.score = 0
         self.players = players
-        self.board = np.array([4] * 12)
+        self.board = array('B', [4] * 12)
         self.current_player = 1
+        self.undo_stack = []
 
     def possible_moves(self):
         """
@@ -80,17 +91,18 @@ class Oware(TwoPlayerGame):
             :returns:
                 array: Lista indeksów kubeczków, które gracz może wybrać aby rozpocząć ruch.
         """
+        board = self.board
         moves = []
         if self.current_player == 1:
-            if max(self.board[6:12]) == 0:
-                moves = [i for i in range(6) if self.board[i] >= (6 - i)]
+            if not any(board[6:12]):
+                moves = [i for i in range(6) if board[i] >= (6 - i)]
             if not moves:
-                moves = [i for i in range(6) if self.board[i] != 0]
+                moves = [i for i in range(6) if board[i]]
         else:
-            if max(self.board[:6]) == 0:
-                moves = [i for i in range(6, 12) if self.board[i] >= (6 - (i % 6))]
+            if not any(board[0:6]):
+                moves = [i for i in range(6, 12) if board[i] >= (6 - (i % 6))]
             if not moves:
-                moves = [i for i in range(6, 12) if self.board[i] != 0]
+                moves = [i for i in range(6, 12) if board[i]]
         return moves
 
     def make_move(self, move):
@@ -98,6 +110,7 @@ class Oware(TwoPlayerGame):
         Modyfikuje planszę (tabelę) gry zgodnie z jej zasadami. Gracz podaje indeks kubeczka z którego zabiera
         nasiona, które następnie rozkłada po następnych kubeczkach w kierunku odwrotnym niż ruch wskazówek zegara
         z pominięciem kubeczka od którego zaczął. Po wykonaniu ruchu aktualizowana jest punktacja gracza.
+        Plansza modyfikowana jest w miejscu, a dane potrzebne do cofnięcia ruchu odkładane są na stos undo_stack.
 
             :parameter:
                 move (int): Indeks kubeczka, w którym gracz rozpoczyna ruch.
@@ -107,21 +120,59 @@ class Oware(TwoPlayerGame):
         """
 
         move = int(move)
-        seeds_to_sow = self.board[move]
-        self.board[move] = 0
+        players = self.players
+        board = self.board
+        seeds_to_sow = board[move]
+        scores = players[0].score, players[1].score
+
+        board[move] = 0
         current_position = move
+        if seeds_to_sow:
+            # pełne okrążenia zasiewają każdy kubeczek poza startowym, resztę rozkładamy po kolei
+            laps, rest = divmod(seeds_to_sow, 11)
+            if laps:
+                for i in range(12):
+                    if i != move:
+                        board[i] += laps
+            for offset in range(1, rest + 1):
+                board[(move + offset) % 12] += 1
+            current_position = (move + (seeds_to_sow - 1) % 11 + 1) % 12
+
+        # na stos trafia tylko to, czego nie da się odtworzyć z samego ruchu - liczba nasion, punktacja
+        # i zebrane kubeczki (pozycja, liczba nasion), które unmake_move przywraca przed cofnięciem zasiewu
+        self.undo_stack.append((move, seeds_to_sow, scores, self.collect_seeds(current_position)))
+        opponents_first_index = (self.opponent_index - 1) * 6
+        if not any(board[opponents_first_index: opponents_first_index + 6]):
+            players_first_index = (self.current_player - 1) * 6
+            players[self.current_player - 1].score += sum(board[players_first_index: players_first_index + 6])
 
-        while seeds_to_sow > 0:
-            current_position = (current_position + 1) % 12
-            if current_position != move:
-                self.board[current_position] += 1
-                seeds_to_sow -= 1
+    def unmake_move(self, move):
+        """
+        Cofa ostatni ruch wykonany metodą make_move w miejscu: przywraca zebrane nasiona, cofa zasiew
+        i przywraca punktację obu graczy ze stosu undo_stack. Wykorzystywana przez algorytm Negamax
+        zamiast kopiowania całej gry.
 
-        self.collect_seeds(current_position)
-        opponents_first_index = (self.opponent_index - 1) * 6
-        if max(self.board[opponents_first_index: opponents_first_index + 6]) == 0:
-            self.players[self.current_player - 1].score += sum(
-                self.board[(self.current_player - 1) * 6: (self.current_player - 1) * 6 + 6])
+            :parameter:
+                move (int): Indeks kubeczka, od którego zaczęto cofany ruch (ruch zapisany jest też na stosie,
+                            więc może to być None)
+
+            :returns:
+                void
+        """
+
+        players = self.players
+        board = self.board
+        move, seeds_to_sow, (players[0].score, players[1].score), captured = self.undo_stack.pop()
+        for position, seeds in captured:
+            board[position] = seeds
+        laps, rest = divmod(seeds_to_sow, 11)
+        if laps:
+            for i in range(12):
+                if i != move:
+                    board[i] -= laps
+        for offset in range(1, rest + 1):
+            board[(move + offset) % 12] -= 1
+        board[move] = seeds_to_sow
 
     def collect_seeds(self, position):
         """
@@ -134,19 +185,21 @@ class Oware(TwoPlayerGame):
                 position (int): Indeks kubeczka, w którym zakończony został ruch
 
             :returns
-                void
+                list: Zebrane kubeczki jako pary (indeks, liczba nasion)
         """
 
-        if self.current_player == 1 and 6 <= position <= 11 and self.board[position] in [2, 3]:
-            while 6 <= position <= 11 and self.board[position] in [2, 3]:
-                self.players[0].score += self.board[position]
-                self.board[position] = 0
-                position = (position - 1) % 12
-        elif self.current_player == 2 and 0 <= position <= 5 and self.board[position] in [2, 3]:
-            while 0 <= position <= 5 and self.board[position] in [2, 3]:
-                self.players[1].score += self.board[position]
-                self.board[position] = 0
-                position = (position - 1) % 12
+        board = self.board
+        if self.current_player == 1:
+            first, player = 6, self.players[0]
+        else:
+            first, player = 0, self.players[1]
+        captured = []
+        while first <= position <= first + 5 and 2 <= board[position] <= 3:
+            captured.append((position, board[position]))
+            player.score += board[position]
+            board[position] = 0
+            position -= 1
+        return captured
 
     def lose(self):
         """
@@ -171,9 +224,10 @@ class Oware(TwoPlayerGame):
                 bool: True, jeśli gra Oware została zakończona; w przeciwnym razie False.
         """
 
-        return self.lose() or sum(self.board) < 7 or (
-                (max(self.board[:6]) == 0 and self.current_player == 1)
-                or (max(self.board[6:12]) == 0 and self.current_player == 2))
+        board = self.board
+        return self.lose() or sum(board) < 7 or (
+                (self.current_player == 1 and not any(board[0:6]))
+                or (self.current_player == 2 and not any(board[6:12])))
 
     def scoring(self):
         """
@@ -197,15 +251,17 @@ class Oware(TwoPlayerGame):
             Gracz 1 -> [4, 4, 4, 4, 4, 4] suma: 20
         """
         print("Plansza:")
-        print("Gracz 2 ->", self.board[6:12][::-1], " suma:", self.players[1].score)
-        print("Gracz 1 ->", self.board[0:6], " suma:", self.players[0].score)
+        print("Gracz 2 ->", list(self.board[6:12][::-1]), " suma:", self.players[1].score)
+        print("Gracz 1 ->", list(self.board[0:6]), " suma:", self.players[0].score)
 
 if __name__ == "__main__":
     ai_algo = Negamax(1)
-    ai_algo2 = Negamax(6)
+    # przeszukiwanie z iteracyjnym pogłębianiem - ograniczony czas odpowiedzi (500 ms) zamiast stałej głębokości
+    ai_algo2 = IterativeDeepening(time_ms=500, tt=OwareTT())
     game = Oware([AI_Player(ai_algo), AI_Player(ai_algo2)])
 
     game.play()
+    print("Tablica transpozycji gracza 2:", ai_algo2.tt.stats())
     if game.players[0].score > game.players[1].score:
         print("Gracz 1 wygrywa.")
     elif game.players[0].score < game.players[1].score:
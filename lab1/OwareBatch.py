@@ -0,0 +1,206 @@
+"""
+# Wektorowe przetwarzanie wielu pozycji Oware jednocześnie
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Instrukcja przygotowania środowiska:
+  Oprócz easyAI należy zainstalować paczkę numpy (https://numpy.org/install/)
+
+## Opis:
+  Metody klasy Oware przetwarzają jedną planszę na raz w pętlach Pythona. Funkcje tego modułu przyjmują N plansz
+  naraz - tablicę boards o kształcie (N, 12), punktację scores o kształcie (N, 2) oraz numery graczy wykonujących
+  ruch players o kształcie (N,) (wartości 1 lub 2) - i liczą wszystko operacjami numpy:
+    - legal_moves : maski dozwolonych ruchów (jak Oware.possible_moves)
+    - sow : rozsianie nasion (jak pierwsza część Oware.make_move)
+    - make_moves : pełny ruch z przejęciem nasion i punktacją (Oware.make_move i Oware.collect_seeds)
+    - is_over, scoring : odpowiedniki Oware.is_over i Oware.scoring
+    - expand : wszystkie pozycje potomne dla całej partii plansz (rozwijanie liści przeszukiwania)
+
+  Funkcje przydają się do generowania danych treningowych oraz do rozwijania liści drzewa przeszukiwania partiami.
+"""
+
+import numpy as np
+
+PITS = np.arange(12)
+SLOTS = np.arange(6)
+
+
+def row_start(players):
+    """
+    Zwraca indeks pierwszego kubeczka gracza.
+
+        :parameter:
+            players (ndarray): Numery graczy (1 lub 2)
+
+        :returns:
+            ndarray: 0 dla gracza 1 i 6 dla gracza 2
+    """
+
+    return (np.asarray(players) - 1) * 6
+
+
+def row_sums(boards, players):
+    """
+    Zwraca sumę nasion w rzędzie każdego z podanych graczy.
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            players (ndarray): Numery graczy (N,)
+
+        :returns:
+            ndarray: Sumy nasion (N,)
+    """
+
+    rows = row_start(players)[:, None] + SLOTS
+    return np.take_along_axis(boards, rows, axis=1).sum(axis=1)
+
+
+def legal_moves(boards, players):
+    """
+    Wyznacza dozwolone ruchy dla wszystkich plansz. Gdy rząd przeciwnika jest pusty, dozwolone są tylko ruchy,
+    które dosiewają mu nasiona (o ile taki ruch istnieje) - tak jak w Oware.possible_moves.
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            players (ndarray): Numery graczy wykonujących ruch (N,)
+
+        :returns:
+            ndarray: Maska (N, 6) - element [i, j] odpowiada kubeczkowi row_start(players[i]) + j
+    """
+
+    boards = np.asarray(boards)
+    players = np.asarray(players)
+    own = np.take_along_axis(boards, row_start(players)[:, None] + SLOTS, axis=1)
+    nonempty = own > 0
+    feeding = own >= 6 - SLOTS
+    opponent_empty = row_sums(boards, 3 - players) == 0
+    must_feed = opponent_empty & feeding.any(axis=1)
+    return np.where(must_feed[:, None], feeding, nonempty)
+
+
+def sow(boards, moves):
+    """
+    Rozsiewa nasiona z wybranych kubeczków (z pominięciem kubeczka startowego).
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            moves (ndarray): Indeksy kubeczków (N,) - numeracja planszy (0-11)
+
+        :returns:
+            tuple: (nowe plansze (N, 12), indeksy kubeczków, do których trafiło ostatnie nasiono (N,))
+    """
+
+    boards = np.asarray(boards)
+    moves = np.asarray(moves)
+    seeds = np.take_along_axis(boards, moves[:, None], axis=1)[:, 0]
+    distance = (PITS - moves[:, None]) % 12
+    laps, rest = np.divmod(seeds, 11)
+    received = laps[:, None] + (distance <= rest[:, None])
+    received[distance == 0] = 0
+    sown = boards + received
+    sown[np.arange(len(moves)), moves] = 0
+    last = np.where(seeds > 0, (moves + (seeds - 1) % 11 + 1) % 12, moves)
+    return sown, last
+
+
+def make_moves(boards, scores, players, moves):
+    """
+    Wykonuje ruchy na wszystkich planszach: rozsiewa nasiona, przejmuje nasiona z rzędu przeciwnika (2 lub 3
+    nasiona, idąc wstecz od ostatniego kubeczka) i gdy rząd przeciwnika jest pusty dolicza graczowi nasiona
+    z jego rzędu - tak jak Oware.make_move.
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            scores (ndarray): Punktacja graczy (N, 2)
+            players (ndarray): Numery graczy wykonujących ruch (N,)
+            moves (ndarray): Indeksy kubeczków (N,)
+
+        :returns:
+            tuple: (nowe plansze (N, 12), nowa punktacja (N, 2), liczba przejętych nasion (N,))
+    """
+
+    players = np.asarray(players)
+    rows = np.arange(len(players))
+    sown, position = sow(boards, moves)
+    first = row_start(3 - players)
+
+    captured = np.zeros(len(players), dtype=sown.dtype)
+    active = np.ones(len(players), dtype=bool)
+    for _ in range(6):
+        inside = (position >= first) & (position <= first + 5)
+        seeds = sown[rows, np.clip(position, 0, 11)]
+        active &= inside & ((seeds == 2) | (seeds == 3))
+        if not active.any():
+            break
+        captured += np.where(active, seeds, 0)
+        sown[rows[active], position[active]] = 0
+        position = position - 1
+
+    scores = np.array(scores, copy=True)
+    mover = players - 1
+    scores[rows, mover] += captured
+    opponent_empty = row_sums(sown, 3 - players) == 0
+    scores[rows, mover] += np.where(opponent_empty, row_sums(sown, players), 0)
+    return sown, scores, captured
+
+
+def is_over(boards, scores, players):
+    """
+    Sprawdza zakończenie gry dla wszystkich plansz (jak Oware.is_over).
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            scores (ndarray): Punktacja graczy (N, 2)
+            players (ndarray): Numery graczy wykonujących ruch (N,)
+
+        :returns:
+            ndarray: Maska (N,) zakończonych gier
+    """
+
+    boards = np.asarray(boards)
+    scores = np.asarray(scores)
+    players = np.asarray(players)
+    opponent_score = scores[np.arange(len(players)), 2 - players]
+    return (opponent_score > 24) | (boards.sum(axis=1) < 7) | (row_sums(boards, players) == 0)
+
+
+def scoring(scores, players):
+    """
+    Ocena pozycji z perspektywy gracza wykonującego ruch (jak Oware.scoring): 48 - punkty przeciwnika.
+
+        :parameter:
+            scores (ndarray): Punktacja graczy (N, 2)
+            players (ndarray): Numery graczy wykonujących ruch (N,)
+
+        :returns:
+            ndarray: Oceny (N,)
+    """
+
+    scores = np.asarray(scores)
+    players = np.asarray(players)
+    return 48 - scores[np.arange(len(players)), 2 - players]
+
+
+def expand(boards, scores, players):
+    """
+    Rozwija wszystkie niezakończone plansze - wykonuje każdy dozwolony ruch i zwraca pozycje potomne
+    (z przełączonym graczem wykonującym ruch).
+
+        :parameter:
+            boards (ndarray): Plansze (N, 12)
+            scores (ndarray): Punktacja graczy (N, 2)
+            players (ndarray): Numery graczy wykonujących ruch (N,)
+
+        :returns:
+            tuple: (indeksy plansz rodziców (M,), ruchy (M,), plansze (M, 12), punktacja (M, 2), gracze (M,))
+    """
+
+    boards = np.asarray(boards)
+    scores = np.asarray(scores)
+    players = np.asarray(players)
+    mask = legal_moves(boards, players) & ~is_over(boards, scores, players)[:, None]
+    parents, slots = np.nonzero(mask)
+    moves = row_start(players[parents]) + slots
+    child_boards, child_scores, _ = make_moves(boards[parents], scores[parents], players[parents], moves)
+    return parents, moves, child_boards, child_scores, 3 - players[parents]
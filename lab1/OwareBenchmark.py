@@ -0,0 +1,266 @@
+"""
+# Benchmark przeszukiwania gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Zestaw pomiarów wydajności silników na stałym zbiorze pozycji (otwarcie, środkowa faza gry, końcówka).
+  Dla każdej konfiguracji silnika (w formacie modułu OwareTournament) i każdej pozycji mierzone są:
+    - liczba odwiedzonych węzłów (wykonanych ruchów) oraz liczba węzłów na sekundę,
+    - średni współczynnik rozgałęzienia i efektywny współczynnik rozgałęzienia (stosunek liczby węzłów
+      dwóch ostatnich iteracji) - dla IterativeDeepening,
+    - czas osiągnięcia kolejnych głębokości (licznik iteracji IterativeDeepening),
+    - szczytowe zużycie pamięci (tracemalloc, w osobnym przebiegu, by nie zaburzać pomiaru czasu).
+  Wyniki zapisywane są w formacie JSON. Porównanie z wcześniejszym plikiem (--baseline) wypisuje pozycje, na których
+  liczba węzłów na sekundę spadła o więcej niż zadaną tolerancję, i kończy program kodem 1.
+
+  Przykładowe wywołanie:
+    python OwareBenchmark.py --output bench.json
+    python OwareBenchmark.py --baseline bench.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from array import array
+
+from easyAI import AI_Player
+
+from Oware import Oware
+from OwareSearch import IterativeDeepening
+from OwareTournament import make_engine
+
+CORPUS = [
+    {'name': 'opening-start', 'phase': 'opening', 'board': [4] * 12, 'player': 1, 'scores': [0, 0]},
+    {'name': 'opening-12', 'phase': 'opening', 'board': [1, 1, 2, 10, 0, 9, 1, 4, 7, 7, 0, 1], 'player': 1,
+     'scores': [0, 5]},
+    {'name': 'midgame-24', 'phase': 'midgame', 'board': [3, 1, 16, 1, 2, 0, 1, 0, 16, 4, 1, 3], 'player': 1,
+     'scores': [0, 0]},
+    {'name': 'midgame-75', 'phase': 'midgame', 'board': [0, 1, 0, 3, 0, 1, 6, 1, 3, 7, 6, 1], 'player': 2,
+     'scores': [10, 9]},
+    {'name': 'endgame-40', 'phase': 'endgame', 'board': [0, 2, 1, 1, 1, 1, 0, 4, 1, 6, 0, 4], 'player': 1,
+     'scores': [9, 18]},
+    {'name': 'endgame-60', 'phase': 'endgame', 'board': [7, 0, 2, 2, 1, 2, 0, 2, 4, 0, 0, 0], 'player': 1,
+     'scores': [11, 17]},
+]
+
+DEFAULT_CONFIGS = [
+    {'name': 'negamax-d6', 'algorithm': 'negamax', 'depth': 6},
+    {'name': 'id-d8', 'algorithm': 'iterative', 'max_depth': 8, 'time_ms': 10 ** 9},
+    {'name': 'id-d8-tt', 'algorithm': 'iterative', 'max_depth': 8, 'time_ms': 10 ** 9, 'tt': True},
+    {'name': 'mcts-2000', 'algorithm': 'mcts', 'playouts': 2000, 'time_ms': None},
+]
+
+
+class CountingOware(Oware):
+    """
+    Gra Oware zliczająca wykonane ruchy - pozwala porównać liczbę węzłów dowolnych silników (także Negamax z easyAI).
+
+        Atrybuty:
+            - made_moves (int) : liczba wywołań make_move
+    """
+
+    def __init__(self, players=None):
+        """
+        Inicjalizacja gry i licznika ruchów.
+
+            :parameter:
+                players (array): Tablica dwóch graczy
+
+            :returns:
+                CountingOware : obiekt klasy CountingOware
+        """
+
+        super().__init__(players)
+        self.made_moves = 0
+
+    def make_move(self, move):
+        """
+        Wykonuje ruch (Oware.make_move) i zwiększa licznik ruchów.
+
+            :parameter:
+                move (int): Indeks kubeczka, w którym gracz rozpoczyna ruch.
+
+            :returns:
+                void
+        """
+
+        self.made_moves += 1
+        super().make_move(move)
+
+
+def load_position(position):
+    """
+    Tworzy grę w stanie opisanym przez pozycję z korpusu.
+
+        :parameter:
+            position (dict): Pozycja - klucze board, player, scores
+
+        :returns:
+            CountingOware: Gra w podanym stanie
+    """
+
+    game = CountingOware([AI_Player(None), AI_Player(None)])
+    game.board = array('B', position['board'])
+    game.current_player = position['player']
+    game.players[0].score, game.players[1].score = position['scores']
+    return game
+
+
+def run_engine(config, position):
+    """
+    Wyznacza ruch silnika w pozycji i zbiera liczniki przeszukiwania.
+
+        :parameter:
+            config (dict): Konfiguracja silnika
+            position (dict): Pozycja z korpusu
+
+        :returns:
+            dict: Ruch, czas, liczba węzłów i liczniki specyficzne dla algorytmu
+    """
+
+    engine = make_engine(config)
+    game = load_position(position)
+    start = time.perf_counter()
+    move = engine(game)
+    elapsed = time.perf_counter() - start
+    result = {
+        'move': move,
+        'time': elapsed,
+        'nodes': game.made_moves,
+        'nps': game.made_moves / elapsed if elapsed else 0.0,
+    }
+    if isinstance(engine, IterativeDeepening):
+        result['depth'] = engine.depth_reached
+        result['branching_factor'] = engine.moves_generated / engine.interior_nodes if engine.interior_nodes else 0
+        iterations = engine.iterations
+        # liczniki iteracji są narastające - liczba węzłów samej iteracji to różnica kolejnych liczników
+        counts = [item['nodes'] for item in iterations]
+        per_iteration = [current - previous for previous, current in zip([0] + counts, counts)]
+        if len(per_iteration) >= 2 and per_iteration[-2]:
+            result['effective_branching_factor'] = per_iteration[-1] / per_iteration[-2]
+        result['time_to_depth'] = {str(item['depth']): item['elapsed'] for item in iterations}
+    if hasattr(engine, 'simulations'):
+        result['simulations'] = engine.simulations
+    if hasattr(engine, 'tt') and engine.tt is not None:
+        result['tt_hit_rate'] = engine.tt.hit_rate()
+    return result
+
+
+def peak_memory(config, position):
+    """
+    Mierzy szczytowe zużycie pamięci podczas wyznaczania ruchu (tracemalloc).
+
+        :parameter:
+            config (dict): Konfiguracja silnika
+            position (dict): Pozycja z korpusu
+
+        :returns:
+            int: Szczytowa ilość zaalokowanej pamięci w bajtach
+    """
+
+    tracemalloc.start()
+    try:
+        engine = make_engine(config)
+        engine(load_position(position))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(configs, corpus=CORPUS, repeat=1, memory=True):
+    """
+    Uruchamia wszystkie silniki na wszystkich pozycjach korpusu.
+
+        :parameter:
+            configs (list): Konfiguracje silników
+            corpus (list): Pozycje testowe
+            repeat (int): Liczba powtórzeń pomiaru czasu (zapisywany jest najszybszy przebieg)
+            memory (bool): Czy mierzyć szczytowe zużycie pamięci
+
+        :returns:
+            dict: Opis środowiska (meta) oraz lista wyników (results)
+    """
+
+    results = []
+    for config in configs:
+        for position in corpus:
+            runs = [run_engine(config, position) for _ in range(repeat)]
+            result = min(runs, key=lambda run: run['time'])
+            result.update({'engine': config['name'], 'position': position['name'], 'phase': position['phase']})
+            if memory:
+                result['peak_memory'] = peak_memory(config, position)
+            results.append(result)
+    meta = {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'configs': configs,
+    }
+    return {'meta': meta, 'results': results}
+
+
+def regressions(report, baseline, tolerance):
+    """
+    Porównuje liczbę węzłów na sekundę z wcześniejszym raportem.
+
+        :parameter:
+            report (dict): Bieżący raport (run_benchmark)
+            baseline (dict): Raport odniesienia
+            tolerance (float): Dopuszczalny względny spadek (np. 0.1 = 10%)
+
+        :returns:
+            list: Krotki (silnik, pozycja, nps odniesienia, bieżące nps) dla pomiarów z regresją
+    """
+
+    previous = {(item['engine'], item['position']): item for item in baseline['results']}
+    found = []
+    for item in report['results']:
+        old = previous.get((item['engine'], item['position']))
+        if old is not None and item['nps'] < old['nps'] * (1 - tolerance):
+            found.append((item['engine'], item['position'], old['nps'], item['nps']))
+    return found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark Oware search engines on a fixed corpus of positions')
+    parser.add_argument('--configs', help='JSON file with a list of engine configurations')
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    parser.add_argument('--repeat', type=int, default=1, help='Timing repetitions (the fastest run is kept)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Skip the peak memory pass')
+    parser.add_argument('--baseline', help='JSON report to compare nodes/second against')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='Allowed relative nodes/second drop')
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        configs = DEFAULT_CONFIGS
+
+    report = run_benchmark(configs, repeat=args.repeat, memory=args.memory)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for item in report['results']:
+        print(f"{item['engine']:12s} {item['position']:14s} {item['nodes']:9d} węzłów  {item['nps']:10.0f} węzłów/s  "
+              f"{item['time']:.3f}s", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        found = regressions(report, baseline, args.tolerance)
+        for engine, position, old, new in found:
+            print(f"REGRESJA {engine} {position}: {old:.0f} -> {new:.0f} węzłów/s", file=sys.stderr)
+        if found:
+            sys.exit(1)
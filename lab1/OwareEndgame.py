@@ -0,0 +1,378 @@
+"""
+# Baza końcówek gry Oware (analiza wsteczna)
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Instrukcja przygotowania środowiska:
+  Oprócz easyAI należy zainstalować paczkę numpy (https://numpy.org/install/)
+
+## Opis:
+  Nasiona nigdy nie wracają na planszę, więc pozycję z n nasionami można rozwiązać znając rozwiązania pozycji
+  z mniejszą liczbą nasion. Generator buduje bazę warstwa po warstwie (n = 7, 8, ..., max_seeds; pozycje z mniej niż
+  7 nasionami kończą grę). Dla każdej pozycji zapisywana jest dokładna różnica nasion, które gracz wykonujący ruch
+  zbierze od tej chwili do końca gry, względem nasion zebranych przez przeciwnika (przy optymalnej grze obu stron).
+  Pozycje, w których optymalna gra prowadzi do nieskończonego powtarzania ruchów, mają wartość 0.
+  Baza nie uwzględnia zakończenia gry po przekroczeniu 24 punktów - zależy ono od punktacji, a nie od planszy.
+  Baza rozgrywa więc pozycję do wyczerpania planszy (Oware.is_over: mniej niż 7 nasion lub brak ruchu), a nasiona,
+  które wtedy zostają na planszy, nie trafiają do żadnego gracza. Prawdziwa gra kończy się zwykle wcześniej, gdy
+  jeden z graczy przekroczy 24 punkty, dlatego dokładny jest tylko znak wyniku (zwycięzca), a różnica punktów jest
+  przybliżeniem - tak samo traktuje ją IterativeDeepening (OwareSearch.py).
+
+  Plansza zapisywana jest z perspektywy gracza wykonującego ruch (jego kubeczki mają indeksy 0-5), a indeks pozycji
+  to doskonała funkcja skrótu: numer rozkładu nasion na 12 kubeczków w kombinatorycznym systemie liczbowym.
+  Pozycje z n nasionami zajmują indeksy od C(n + 11, 12) do C(n + 12, 12) - 1, więc cała baza to jedna tablica int8
+  o długości C(max_seeds + 12, 12), zapisana w pliku .npy i odczytywana przez np.load(mmap_mode='r').
+
+  Rozwijanie pozycji (wykonywanie ruchów) rozdzielane jest pomiędzy procesy, a rozwiązywanie warstwy odbywa się
+  wektorowo w numpy - dla kolejnych progów v wyznaczane są zbiory pozycji, w których gracz może wymusić wynik >= v
+  (lub przeciwnik wynik <= -v) w skończonej liczbie ruchów.
+
+  Budowa bazy (jednorazowo):
+    python OwareEndgame.py --max-seeds 12 --workers 4 --output oware_endgame.npy
+  Wykorzystanie w przeszukiwaniu:
+    IterativeDeepening(time_ms=500, endgame=EndgameTable('oware_endgame.npy'))
+"""
+
+import argparse
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from easyAI import AI_Player
+
+from Oware import Oware
+
+# najmniejsza liczba nasion, przy której gra się nie kończy (Oware.is_over)
+MIN_SEEDS = 7
+# największa obsługiwana liczba nasion na planszy
+MAX_TABLE_SEEDS = 48
+
+BINOMIAL = [[0] * 64 for _ in range(64)]
+for _n in range(64):
+    BINOMIAL[_n][0] = 1
+    for _k in range(1, _n + 1):
+        BINOMIAL[_n][_k] = BINOMIAL[_n - 1][_k - 1] + BINOMIAL[_n - 1][_k]
+
+# rodzaje ruchów zwracane przez expand_chunk
+ILLEGAL, TERMINAL, LOWER, SAME = 0, 1, 2, 3
+
+
+def layer_offset(seeds):
+    """
+    Zwraca indeks pierwszej pozycji z podaną liczbą nasion (liczba pozycji z mniejszą liczbą nasion).
+
+        :parameter:
+            seeds (int): Liczba nasion na planszy
+
+        :returns:
+            int: C(seeds + 11, 12)
+    """
+
+    return BINOMIAL[seeds + 11][12]
+
+
+def layer_size(seeds):
+    """
+    Zwraca liczbę rozkładów podanej liczby nasion na 12 kubeczków.
+
+        :parameter:
+            seeds (int): Liczba nasion na planszy
+
+        :returns:
+            int: C(seeds + 11, 11)
+    """
+
+    return BINOMIAL[seeds + 11][11]
+
+
+def rank(board):
+    """
+    Doskonała funkcja skrótu planszy - numer rozkładu nasion w obrębie warstwy o tej samej liczbie nasion.
+
+        :parameter:
+            board (sequence): 12 liczb nasion w kubeczkach
+
+        :returns:
+            int: Indeks pozycji w warstwie (0 .. layer_size(sum(board)) - 1)
+    """
+
+    remaining = sum(board)
+    index = 0
+    for i in range(11):
+        parts = 12 - i
+        seeds = board[i]
+        if seeds:
+            # rozkłady, w których kubeczek i ma mniej nasion niż w planszy
+            index += BINOMIAL[remaining + parts - 1][parts - 1] - BINOMIAL[remaining - seeds + parts - 1][parts - 1]
+            remaining -= seeds
+    return index
+
+
+def unrank(seeds, index):
+    """
+    Odwrotność funkcji rank - odtwarza planszę z indeksu w warstwie.
+
+        :parameter:
+            seeds (int): Liczba nasion na planszy
+            index (int): Indeks pozycji w warstwie
+
+        :returns:
+            list: 12 liczb nasion w kubeczkach
+    """
+
+    board = [0] * 12
+    remaining = seeds
+    for i in range(11):
+        parts = 12 - i
+        count = 0
+        # rozkłady z dokładnie count nasionami w kubeczku i
+        block = BINOMIAL[remaining + parts - 2][parts - 2]
+        while index >= block:
+            index -= block
+            count += 1
+            block = BINOMIAL[remaining - count + parts - 2][parts - 2]
+        board[i] = count
+        remaining -= count
+    board[11] = remaining
+    return board
+
+
+def mover_board(game):
+    """
+    Zwraca planszę z perspektywy gracza wykonującego ruch (jego kubeczki mają indeksy 0-5).
+
+        :parameter:
+            game (Oware): Stan gry
+
+        :returns:
+            array: Plansza (obrócona o 6 kubeczków gdy ruch wykonuje gracz 2)
+    """
+
+    board = game.board
+    if game.current_player == 2:
+        return board[6:12] + board[0:6]
+    return board
+
+
+def table_index(board):
+    """
+    Zwraca indeks pozycji w całej bazie (przesunięcie warstwy + indeks w warstwie).
+
+        :parameter:
+            board (sequence): Plansza z perspektywy gracza wykonującego ruch
+
+        :returns:
+            int: Indeks pozycji w bazie
+    """
+
+    return layer_offset(sum(board)) + rank(board)
+
+
+def expand_chunk(seeds, start, stop):
+    """
+    Rozwija pozycje warstwy o indeksach start .. stop - 1: wykonuje wszystkie dozwolone ruchy gracza
+    (zgodnie z Oware.possible_moves i Oware.make_move) i klasyfikuje ich wynik.
+
+        :parameter:
+            seeds (int): Liczba nasion w warstwie
+            start (int): Pierwszy indeks
+            stop (int): Indeks za ostatnim
+
+        :returns:
+            tuple: Tablice (stop - start, 6): rodzaj ruchu (ILLEGAL, TERMINAL, LOWER, SAME),
+                   zebrane nasiona oraz indeks pozycji następnej (globalny dla LOWER, w warstwie dla SAME)
+    """
+
+    count = stop - start
+    kind = np.zeros((count, 6), dtype=np.int8)
+    gain = np.zeros((count, 6), dtype=np.int8)
+    target = np.full((count, 6), -1, dtype=np.int32)
+    game = Oware([AI_Player(None), AI_Player(None)])
+    player = game.players[0]
+
+    for row, index in enumerate(range(start, stop)):
+        game.board = array('B', unrank(seeds, index))
+        game.current_player = 1
+        for move in game.possible_moves():
+            player.score = 0
+            game.make_move(move)
+            game.switch_player()
+            gain[row, move] = player.score
+            # baza nie uwzględnia zakończenia gry po przekroczeniu 24 punktów
+            player.score = 0
+            if game.is_over():
+                kind[row, move] = TERMINAL
+            else:
+                # pozycja następna z perspektywy przeciwnika
+                successor = mover_board(game)
+                remaining = sum(successor)
+                if remaining == seeds:
+                    kind[row, move] = SAME
+                    target[row, move] = rank(successor)
+                else:
+                    kind[row, move] = LOWER
+                    target[row, move] = layer_offset(remaining) + rank(successor)
+            game.switch_player()
+            game.unmake_move(move)
+    return kind, gain, target
+
+
+def solve_layer(seeds, kind, gain, target, values):
+    """
+    Rozwiązuje warstwę pozycji o tej samej liczbie nasion. Dla kolejnych progów v wyznaczane są (jako najmniejsze
+    punkty stałe) zbiory pozycji, w których gracz może wymusić wynik >= v oraz w których przeciwnik może wymusić
+    wynik <= -v. Pozycje spoza obu zbiorów dla v = 1 mają wartość 0.
+
+        :parameter:
+            seeds (int): Liczba nasion w warstwie
+            kind (ndarray): Rodzaje ruchów (expand_chunk)
+            gain (ndarray): Nasiona zebrane ruchem
+            target (ndarray): Indeksy pozycji następnych
+            values (ndarray): Baza z rozwiązanymi warstwami niższymi
+
+        :returns:
+            ndarray: Wartości pozycji warstwy (int8)
+    """
+
+    legal = kind != ILLEGAL
+    same = kind == SAME
+    exits = legal & ~same
+    exit_value = gain.astype(np.int16)
+    lower = kind == LOWER
+    exit_value[lower] -= values[target[lower]]
+    has_move = legal.any(axis=1)
+    successor = np.where(same, target, 0)
+
+    result = np.zeros(len(kind), dtype=np.int8)
+    for threshold in range(1, seeds + 1):
+        exit_win = (exits & (exit_value >= threshold)).any(axis=1)
+        exit_lose = ~legal | (exits & (exit_value <= -threshold))
+        win = np.zeros(len(kind), dtype=bool)
+        lose = np.zeros(len(kind), dtype=bool)
+        while True:
+            new_win = exit_win | (same & lose[successor]).any(axis=1)
+            new_lose = has_move & (exit_lose | (same & win[successor])).all(axis=1)
+            if np.array_equal(new_win, win) and np.array_equal(new_lose, lose):
+                break
+            win, lose = new_win, new_lose
+        if not win.any() and not lose.any():
+            break
+        result[win] = threshold
+        result[lose] = -threshold
+    return result
+
+
+def build_table(max_seeds, output, workers=None, chunk_size=20000):
+    """
+    Buduje bazę końcówek dla pozycji z co najwyżej max_seeds nasionami i zapisuje ją w pliku .npy.
+
+        :parameter:
+            max_seeds (int): Największa liczba nasion na planszy
+            output (str): Ścieżka pliku wynikowego
+            workers (int): Liczba procesów rozwijających pozycje. Domyślnie liczba rdzeni procesora.
+            chunk_size (int): Liczba pozycji przekazywanych do procesu w jednym zadaniu
+
+        :returns:
+            void
+    """
+
+    if not MIN_SEEDS <= max_seeds <= MAX_TABLE_SEEDS:
+        raise ValueError(f'max_seeds must be between {MIN_SEEDS} and {MAX_TABLE_SEEDS}')
+    values = np.lib.format.open_memmap(output, mode='w+', dtype=np.int8, shape=(layer_offset(max_seeds + 1),))
+    values[:] = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for seeds in range(MIN_SEEDS, max_seeds + 1):
+            start = time.perf_counter()
+            size = layer_size(seeds)
+            bounds = [(begin, min(begin + chunk_size, size)) for begin in range(0, size, chunk_size)]
+            chunks = list(executor.map(expand_chunk, [seeds] * len(bounds), *zip(*bounds)))
+            kind = np.concatenate([chunk[0] for chunk in chunks])
+            gain = np.concatenate([chunk[1] for chunk in chunks])
+            target = np.concatenate([chunk[2] for chunk in chunks])
+            offset = layer_offset(seeds)
+            values[offset:offset + size] = solve_layer(seeds, kind, gain, target, values)
+            print(f"{seeds} nasion: {size} pozycji, {time.perf_counter() - start:.1f}s")
+    values.flush()
+
+
+class EndgameTable:
+    """
+    Odczyt bazy końcówek zmapowanej w pamięci (np.load z mmap_mode='r').
+
+        Atrybuty:
+            - values (ndarray) : wartości pozycji
+            - max_seeds (int) : największa liczba nasion obsługiwana przez bazę
+
+        Metody:
+            - __init__(self, path) : Otwarcie bazy
+            - probe(self, game) : Dokładna wartość pozycji (różnica przyszłych zdobyczy)
+            - scoring(self, game) : Ocena pozycji wykorzystująca bazę
+    """
+
+    def __init__(self, path):
+        """
+        Otwiera bazę końcówek zapisaną przez build_table.
+
+            :parameter:
+                path (str): Ścieżka pliku .npy
+
+            :returns:
+                EndgameTable : obiekt klasy EndgameTable
+        """
+
+        self.values = np.load(path, mmap_mode='r')
+        self.max_seeds = next(seeds for seeds in range(MAX_TABLE_SEEDS + 1)
+                              if layer_offset(seeds + 1) >= len(self.values))
+        if layer_offset(self.max_seeds + 1) != len(self.values):
+            raise ValueError(f'{path} is not an Oware endgame table')
+
+    def probe(self, game):
+        """
+        Zwraca dokładną różnicę nasion, które gracz wykonujący ruch zbierze do końca gry, względem nasion zebranych
+        przez przeciwnika. Dla zakończonej gry zwracane jest 0.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                int: Wartość pozycji lub None gdy na planszy jest więcej nasion niż obsługuje baza
+        """
+
+        board = mover_board(game)
+        seeds = sum(board)
+        if seeds > self.max_seeds:
+            return None
+        if game.is_over():
+            return 0
+        return int(self.values[layer_offset(seeds) + rank(board)])
+
+    def scoring(self, game):
+        """
+        Ocena pozycji jako różnica punktów gracza wykonującego ruch i przeciwnika. Jeśli pozycja jest w bazie,
+        dodawana jest różnica przyszłych zdobyczy - znak oceny wskazuje wtedy zwycięzcę, a jej wartość jest
+        przybliżonym wynikiem końcowym (baza nie uwzględnia zakończenia gry po przekroczeniu 24 punktów).
+        Można ją przekazać do Negamax (Negamax(8, scoring=table.scoring)) lub IterativeDeepening.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                int: Różnica punktów (powiększona o wartość z bazy)
+        """
+
+        margin = self.probe(game)
+        return game.player.score - game.opponent.score + (margin or 0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the Oware endgame table by retrograde analysis')
+    parser.add_argument('--max-seeds', dest='max_seeds', type=int, default=12,
+                        help='Largest number of seeds on the board covered by the table')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--output', default='oware_endgame.npy', help='Output .npy file')
+    args = parser.parse_args()
+
+    build_table(args.max_seeds, args.output, args.workers)
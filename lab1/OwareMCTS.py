@@ -0,0 +1,394 @@
+"""
+# Monte Carlo Tree Search (UCT) dla gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Alternatywa dla algorytmu Negamax, której siła rośnie wraz z przydzielonym czasem. Każda symulacja:
+    1. schodzi w dół drzewa wybierając ruchy według wzoru UCT (średni wynik + c * sqrt(ln N / n)),
+    2. rozwija jeden nowy węzeł,
+    3. rozgrywa szybką losową partię do końca (ruchy wykonywane w miejscu, cofane przez stos undo_stack),
+    4. propaguje wynik (wygrana 1, remis 0.5, porażka 0) w górę drzewa.
+
+  Liczba symulacji i budżet czasu są konfigurowalne, a przeszukiwanie można przerwać w dowolnej chwili metodą stop()
+  (np. z innego wątku) - zwracany jest wtedy najczęściej odwiedzany ruch. Drzewo jest wykorzystywane ponownie
+  w kolejnym ruchu: nowym korzeniem zostaje węzeł odpowiadający pozycji po ruchu przeciwnika.
+  Przy workers > 1 kilka niezależnych drzew budowanych jest równolegle w procesach (root parallelization),
+  a liczby odwiedzin ruchów z korzeni są sumowane. Flaga stop() jest wtedy współdzielona z procesami roboczymi
+  (multiprocessing.Event), więc przerywa także ich przeszukiwanie.
+
+  Obiekt klasy jest wywoływalny tak samo jak Negamax z easyAI:
+    AI_Player(MCTS(time_ms=500))
+"""
+
+import math
+import multiprocessing
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from OwareParallel import game_state, restore_game
+
+# flaga przerwania współdzielona z procesem głównym, ustawiana w procesach roboczych przez init_worker
+shared_stop = None
+
+
+def init_worker(stop_event):
+    """
+    Inicjalizacja procesu roboczego - zapamiętanie współdzielonej flagi przerwania przeszukiwania.
+
+        :parameter:
+            stop_event (multiprocessing.Event): Flaga ustawiana przez MCTS.stop()
+
+        :returns:
+            void
+    """
+
+    global shared_stop
+    shared_stop = stop_event
+
+
+class Node:
+    """
+    Węzeł drzewa MCTS.
+
+        Atrybuty:
+            - move (int) : ruch prowadzący do węzła
+            - parent (Node) : węzeł rodzica
+            - player (int) : numer gracza, który wykonał ruch prowadzący do węzła
+            - key (tuple) : stan gry w węźle (game_state), wykorzystywany przy ponownym użyciu drzewa
+            - children (list) : rozwinięte węzły potomne
+            - untried (list) : ruchy, które nie zostały jeszcze rozwinięte
+            - visits (int) : liczba symulacji przechodzących przez węzeł
+            - wins (float) : suma wyników tych symulacji z perspektywy gracza player
+    """
+
+    __slots__ = ('move', 'parent', 'player', 'key', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, game, move=None, parent=None, player=None):
+        """
+        Tworzy węzeł dla aktualnego stanu gry.
+
+            :parameter:
+                game (Oware): Stan gry w węźle
+                move (int): Ruch prowadzący do węzła
+                parent (Node): Węzeł rodzica
+                player (int): Numer gracza, który wykonał ruch
+
+            :returns:
+                Node : obiekt klasy Node
+        """
+
+        self.move = move
+        self.parent = parent
+        self.player = player
+        self.key = game_state(game)
+        self.children = []
+        self.untried = [] if game.is_over() else game.possible_moves()
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        """
+        Wybiera węzeł potomny o największej wartości UCT.
+
+            :parameter:
+                exploration (float): Współczynnik eksploracji c
+
+            :returns:
+                Node: Wybrany węzeł potomny
+        """
+
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+
+def winner(game):
+    """
+    Zwraca zwycięzcę partii według punktacji (jak w __main__ modułu Oware).
+
+        :parameter:
+            game (Oware): Stan gry
+
+        :returns:
+            int: 1 lub 2 - numer zwycięzcy, 0 - remis
+    """
+
+    score1, score2 = game.players[0].score, game.players[1].score
+    if score1 > score2:
+        return 1
+    if score1 < score2:
+        return 2
+    return 0
+
+
+class MCTS:
+    """
+    Przeszukiwanie drzewa Monte Carlo z wyborem ruchów UCT.
+
+        Atrybuty:
+            - playouts (int) : maksymalna liczba symulacji na ruch (None - bez limitu)
+            - time_ms (float) : budżet czasu na ruch w milisekundach (None - bez limitu)
+            - exploration (float) : współczynnik eksploracji UCT
+            - rollout_limit (int) : maksymalna liczba ruchów losowej partii
+            - reuse_tree (bool) : czy wykorzystywać drzewo z poprzedniego ruchu
+            - workers (int) : liczba niezależnych drzew budowanych równolegle w procesach
+            - root (Node) : korzeń drzewa z ostatniego przeszukania
+            - simulations (int) : liczba symulacji wykonanych w ostatnim przeszukaniu
+
+        Metody:
+            - __init__(self, playouts, time_ms, exploration, rollout_limit, reuse_tree, workers, seed) : Inicjalizacja
+            - __call__(self, game) : Wybór najlepszego ruchu dla bieżącego gracza
+            - search(self, game) : Budowa drzewa do wyczerpania limitu symulacji lub czasu
+            - rollout(self, game) : Szybka losowa partia
+            - stop(self) : Przerwanie trwającego przeszukiwania
+            - find_root(self, game) : Odszukanie pozycji w drzewie z poprzedniego ruchu
+            - parallel_search(self, game) : Równoległa budowa niezależnych drzew w procesach
+            - close(self) : Zamknięcie puli procesów
+    """
+
+    def __init__(self, playouts=None, time_ms=500, exploration=1.4, rollout_limit=200, reuse_tree=True, workers=1,
+                 seed=None):
+        """
+        Inicjalizacja algorytmu. Przeszukiwanie kończy się po wykonaniu playouts symulacji, po upływie time_ms
+        milisekund lub po wywołaniu stop() - w zależności od tego, co nastąpi pierwsze.
+
+            :parameter:
+                playouts (int): Limit symulacji na ruch, domyślnie None (tylko limit czasu)
+                time_ms (float): Budżet czasu na ruch w milisekundach, domyślnie 500
+                exploration (float): Współczynnik eksploracji UCT
+                rollout_limit (int): Maksymalna liczba ruchów losowej partii
+                reuse_tree (bool): Czy wykorzystywać drzewo z poprzedniego ruchu
+                workers (int): Liczba niezależnych drzew budowanych równolegle (root parallelization)
+                seed (int): Ziarno generatora liczb losowych
+
+            :returns:
+                MCTS : obiekt klasy MCTS
+        """
+
+        if playouts is None and time_ms is None:
+            raise ValueError('Either playouts or time_ms must be set')
+        self.playouts = playouts
+        self.time_ms = time_ms
+        self.exploration = exploration
+        self.rollout_limit = rollout_limit
+        self.reuse_tree = reuse_tree
+        self.workers = workers
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # przy kilku procesach flaga musi być widoczna także w procesach roboczych
+        self.stop_event = multiprocessing.Event() if workers > 1 else threading.Event()
+        self.executor = None
+        self.root = None
+        self.simulations = 0
+
+    def __call__(self, game):
+        """
+        Zwraca najczęściej odwiedzany ruch z korzenia drzewa.
+
+            :parameter:
+                game (Oware): Stan gry, dla którego szukamy ruchu
+
+            :returns:
+                int: Indeks kubeczka, od którego należy zacząć ruch
+        """
+
+        self.stop_event.clear()
+        if self.workers > 1:
+            return self.parallel_search(game)
+        root = self.search(game)
+        if not root.children:
+            # przeszukiwanie przerwane przed pierwszą symulacją
+            return game.possible_moves()[0]
+        best = max(root.children, key=lambda child: child.visits)
+        return best.move
+
+    def stop(self):
+        """
+        Przerywa trwające przeszukiwanie (anytime) - __call__ zwraca najlepszy dotychczas znaleziony ruch.
+        Przy workers > 1 przerywa również drzewa budowane w procesach roboczych.
+
+            :returns:
+                void
+        """
+
+        self.stop_event.set()
+
+    def find_root(self, game):
+        """
+        Szuka w drzewie z poprzedniego ruchu węzła odpowiadającego aktualnej pozycji (po naszym ruchu
+        i odpowiedzi przeciwnika).
+
+            :parameter:
+                game (Oware): Aktualny stan gry
+
+            :returns:
+                Node: Węzeł, który zostaje nowym korzeniem lub None gdy pozycji nie ma w drzewie
+        """
+
+        if self.root is None:
+            return None
+        key = game_state(game)
+        frontier = [self.root]
+        for _ in range(3):
+            for node in frontier:
+                if node.key == key:
+                    node.parent = None
+                    node.move = None
+                    return node
+            frontier = [child for node in frontier for child in node.children]
+        return None
+
+    def search(self, game):
+        """
+        Buduje drzewo przeszukiwania do wyczerpania limitu symulacji, czasu lub wywołania stop().
+        Gra jest modyfikowana w miejscu, a po każdej symulacji przywracana do stanu początkowego.
+
+            :parameter:
+                game (Oware): Stan gry w korzeniu
+
+            :returns:
+                Node: Korzeń drzewa
+        """
+
+        root = self.find_root(game) if self.reuse_tree else None
+        if root is None:
+            root = Node(game)
+        self.root = root
+
+        deadline = time.perf_counter() + self.time_ms / 1000 if self.time_ms is not None else None
+        undo_depth = len(game.undo_stack)
+        current_player = game.current_player
+        exploration = self.exploration
+        self.simulations = 0
+
+        while not self.stop_event.is_set():
+            if self.playouts is not None and self.simulations >= self.playouts:
+                break
+            if deadline is not None and self.simulations and time.perf_counter() >= deadline:
+                break
+
+            # selekcja
+            node = root
+            while not node.untried and node.children:
+                node = node.select(exploration)
+                game.make_move(node.move)
+                game.switch_player()
+
+            # rozwinięcie
+            if node.untried:
+                move = node.untried.pop(self.rng.randrange(len(node.untried)))
+                player = game.current_player
+                game.make_move(move)
+                game.switch_player()
+                child = Node(game, move, node, player)
+                node.children.append(child)
+                node = child
+
+            # symulacja
+            result = self.rollout(game)
+
+            # propagacja wyniku
+            while node is not None:
+                node.visits += 1
+                if result == 0:
+                    node.wins += 0.5
+                elif result == node.player:
+                    node.wins += 1
+                node = node.parent
+
+            while len(game.undo_stack) > undo_depth:
+                game.unmake_move(None)
+            game.current_player = current_player
+            self.simulations += 1
+
+        return root
+
+    def rollout(self, game):
+        """
+        Szybka losowa partia od bieżącej pozycji. Ruchy wykonywane są w miejscu - cofa je dopiero metoda search.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                int: Zwycięzca partii (1, 2) lub 0 przy remisie
+        """
+
+        choice = self.rng.choice
+        for _ in range(self.rollout_limit):
+            if game.is_over():
+                break
+            game.make_move(choice(game.possible_moves()))
+            game.switch_player()
+        return winner(game)
+
+    def parallel_search(self, game):
+        """
+        Buduje niezależne drzewa w procesach roboczych i wybiera ruch o największej łącznej liczbie odwiedzin
+        (pierwszy możliwy ruch, gdy żaden ruch z korzenia nie został odwiedzony).
+
+            :parameter:
+                game (Oware): Stan gry w korzeniu
+
+            :returns:
+                int: Indeks kubeczka, od którego należy zacząć ruch
+        """
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(self.stop_event,))
+        playouts = None if self.playouts is None else -(-self.playouts // self.workers)
+        state = game_state(game)
+        futures = [self.executor.submit(root_visits, state, playouts, self.time_ms, self.exploration,
+                                        self.rollout_limit, self.rng.getrandbits(32))
+                   for _ in range(self.workers)]
+        visits = {}
+        self.simulations = 0
+        for future in futures:
+            counts, simulations = future.result()
+            self.simulations += simulations
+            for move, count in counts.items():
+                visits[move] = visits.get(move, 0) + count
+        if not visits:
+            # przeszukiwanie przerwane (lub zbyt mały budżet) przed pierwszą symulacją w każdym procesie
+            return game.possible_moves()[0]
+        return max(visits, key=visits.get)
+
+    def close(self):
+        """
+        Zamyka pulę procesów roboczych.
+
+            :returns:
+                void
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def root_visits(state, playouts, time_ms, exploration, rollout_limit, seed):
+    """
+    Buduje drzewo MCTS w procesie roboczym i zwraca liczby odwiedzin ruchów z korzenia.
+
+        :parameter:
+            state (tuple): Stan gry (OwareParallel.game_state)
+            playouts (int): Limit symulacji
+            time_ms (float): Budżet czasu w milisekundach
+            exploration (float): Współczynnik eksploracji UCT
+            rollout_limit (int): Maksymalna liczba ruchów losowej partii
+            seed (int): Ziarno generatora liczb losowych
+
+        :returns:
+            tuple: (słownik ruch -> liczba odwiedzin, liczba wykonanych symulacji)
+    """
+
+    mcts = MCTS(playouts, time_ms, exploration, rollout_limit, reuse_tree=False, seed=seed)
+    if shared_stop is not None:
+        mcts.stop_event = shared_stop
+    root = mcts.search(restore_game(state))
+    return {child.move: child.visits for child in root.children}, mcts.simulations
@@ -0,0 +1,287 @@
+"""
+# Równoległe przeszukiwanie korzenia dla gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Gracz ma do wyboru co najwyżej 6 ruchów, więc korzeń drzewa gry naturalnie dzieli się na niezależne poddrzewa.
+  Klasa ParallelRootSearch rozdziela ruchy zwrócone przez Oware.possible_moves() pomiędzy procesy
+  ProcessPoolExecutor. Każdy proces przeszukuje swoje poddrzewo algorytmem alfa-beta (IterativeDeepening.search),
+  zaczynając od wspólnego ograniczenia alfa przechowywanego w pamięci współdzielonej (multiprocessing.Value).
+  Po zakończeniu przeszukiwania poddrzewa proces podnosi wspólne alfa, z którego korzystają kolejne zadania.
+  Okno zaczyna się tuż poniżej wspólnego alfa, więc ruch równie dobry jak najlepszy dotąd dostaje dokładną ocenę,
+  a przy remisie wybierany jest pierwszy z nich w kolejności possible_moves() - niezależnie od tego, który proces
+  skończył pierwszy.
+
+  Uruchomienie modułu porównuje czas przeszukiwania z jednowątkowym IterativeDeepening (ta sama głębokość, bez
+  limitu czasu) i wypisuje zmierzone przyspieszenie. Bywa ono mniejsze od 1: start zadań i przesyłanie pozycji
+  kosztuje, a procesy nie korzystają z odcięć wariantu głównego z płytszych iteracji, więc przeszukują więcej
+  węzłów niż wersja jednowątkowa. Zysk możliwy jest tylko przy kilku rdzeniach i dużej głębokości:
+    python OwareParallel.py --depth 9 --workers 4
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from easyAI import AI_Player
+
+from Oware import Oware
+from OwareSearch import IterativeDeepening
+
+inf = float('infinity')
+
+# wspólne ograniczenie alfa, ustawiane w procesach roboczych przez init_worker
+shared_alpha = None
+
+
+def init_worker(alpha):
+    """
+    Inicjalizacja procesu roboczego - zapamiętanie współdzielonego ograniczenia alfa.
+
+        :parameter:
+            alpha (multiprocessing.Value): Współdzielona wartość alfa korzenia
+
+        :returns:
+            void
+    """
+
+    global shared_alpha
+    shared_alpha = alpha
+
+
+def game_state(game):
+    """
+    Zwraca zwartą reprezentację stanu gry, którą można przesłać do innego procesu.
+
+        :parameter:
+            game (Oware): Stan gry
+
+        :returns:
+            tuple: (plansza w bajtach, numer gracza wykonującego ruch, punktacja gracza 1, punktacja gracza 2)
+    """
+
+    return game.board.tobytes(), game.current_player, game.players[0].score, game.players[1].score
+
+
+def restore_game(state):
+    """
+    Odtwarza grę Oware ze zwartej reprezentacji zwróconej przez game_state.
+
+        :parameter:
+            state (tuple): Stan gry zwrócony przez game_state
+
+        :returns:
+            Oware: Nowy obiekt gry w podanym stanie
+    """
+
+    board, current_player, score1, score2 = state
+    game = Oware([AI_Player(None), AI_Player(None)])
+    game.board = array('B', board)
+    game.current_player = current_player
+    game.players[0].score = score1
+    game.players[1].score = score2
+    return game
+
+
+def search_root_move(state, move, depth, scoring=None):
+    """
+    Przeszukuje poddrzewo jednego ruchu z korzenia. Dolna granica okna alfa-beta leży tuż poniżej wspólnego
+    ograniczenia alfa, które po przeszukaniu zostaje podniesione, jeśli ruch okazał się lepszy.
+
+        :parameter:
+            state (tuple): Stan gry w korzeniu (game_state)
+            move (int): Ruch z korzenia, którego poddrzewo przeszukujemy
+            depth (int): Głębokość przeszukania liczona od korzenia
+            scoring (function): Funkcja oceniająca (musi dać się przesłać do procesu), domyślnie game.scoring()
+
+        :returns:
+            tuple: (ruch, ocena ruchu z perspektywy gracza w korzeniu, czy ocena jest dokładna - False, gdy ruch
+                   jest gorszy od najlepszego dotąd i ocena jest tylko ograniczeniem górnym, liczba węzłów)
+    """
+
+    game = restore_game(state)
+    searcher = IterativeDeepening(max_depth=depth, scoring=scoring)
+    searcher.reset()
+    # okno otwarte o jedną wartość niżej - ruch równy najlepszemu też dostaje dokładną ocenę
+    alpha = math.nextafter(shared_alpha.value, -inf)
+    game.make_move(move)
+    game.switch_player()
+    value = -searcher.search(game, depth - 1, -inf, -alpha, 1)
+    with shared_alpha.get_lock():
+        if value > shared_alpha.value:
+            shared_alpha.value = value
+    return move, value, value > alpha, searcher.nodes
+
+
+class ParallelRootSearch:
+    """
+    Przeszukiwanie alfa-beta o stałej głębokości z ruchami korzenia rozdzielonymi pomiędzy procesy.
+
+        Atrybuty:
+            - depth (int) : głębokość przeszukania
+            - workers (int) : liczba procesów roboczych (1 - przeszukiwanie jednowątkowe w bieżącym procesie)
+            - scoring (function) : funkcja oceniająca, domyślnie game.scoring()
+            - nodes (int) : liczba węzłów odwiedzonych w ostatnim przeszukaniu
+            - value (float) : ocena najlepszego ruchu z ostatniego przeszukania
+            - elapsed (float) : czas ostatniego przeszukania w sekundach
+
+        Metody:
+            - __init__(self, depth, workers, scoring) : Inicjalizacja algorytmu
+            - __call__(self, game) : Wybór najlepszego ruchu dla bieżącego gracza
+            - start(self) : Uruchomienie puli procesów
+            - close(self) : Zamknięcie puli procesów
+    """
+
+    def __init__(self, depth=8, workers=None, scoring=None):
+        """
+        Inicjalizacja algorytmu. Pula procesów tworzona jest przy pierwszym przeszukaniu i wykorzystywana ponownie
+        w kolejnych ruchach.
+
+            :parameter:
+                depth (int): Głębokość przeszukania
+                workers (int): Liczba procesów roboczych. Domyślnie liczba rdzeni procesora.
+                scoring (function): Funkcja f(game) -> ocena zdefiniowana na poziomie modułu (przesyłana do procesów)
+
+            :returns:
+                ParallelRootSearch : obiekt klasy ParallelRootSearch
+        """
+
+        self.depth = depth
+        self.workers = workers or os.cpu_count() or 1
+        self.scoring = scoring
+        self.alpha = multiprocessing.Value('d', -inf)
+        self.executor = None
+        self.nodes = 0
+        self.value = None
+        self.elapsed = 0.0
+
+    def __call__(self, game):
+        """
+        Zwraca najlepszy ruch. Przy jednym procesie ruchy korzenia przeszukiwane są po kolei w bieżącym procesie
+        (wersja jednowątkowa), w przeciwnym razie trafiają do puli procesów.
+
+            :parameter:
+                game (Oware): Stan gry, dla którego szukamy ruchu
+
+            :returns:
+                int: Indeks kubeczka, od którego należy zacząć ruch
+        """
+
+        start = time.perf_counter()
+        state = game_state(game)
+        moves = game.possible_moves()
+        self.alpha.value = -inf
+
+        if self.workers == 1:
+            init_worker(self.alpha)
+            results = [search_root_move(state, move, self.depth, self.scoring) for move in moves]
+        else:
+            self.start()
+            futures = [self.executor.submit(search_root_move, state, move, self.depth, self.scoring)
+                       for move in moves]
+            results = [future.result() for future in futures]
+
+        # wyniki są w kolejności moves - przy remisie wygrywa pierwszy ruch, a nie proces, który skończył pierwszy
+        best_move, best_value = moves[0], -inf
+        for move, value, exact, _ in results:
+            if exact and value > best_value:
+                best_move, best_value = move, value
+        self.nodes = sum(nodes for _, _, _, nodes in results)
+        self.value = best_value
+        self.elapsed = time.perf_counter() - start
+        return best_move
+
+    def start(self):
+        """
+        Tworzy pulę procesów roboczych (jeśli jeszcze nie istnieje) i czeka aż wszystkie procesy zostaną uruchomione,
+        dzięki czemu czas ich startu nie jest wliczany do czasu pierwszego przeszukania.
+
+            :returns:
+                void
+        """
+
+        if self.executor is None and self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                                initargs=(self.alpha,))
+            list(self.executor.map(abs, range(self.workers)))
+
+    def close(self):
+        """
+        Zamyka pulę procesów roboczych.
+
+            :returns:
+                void
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def compare(game, depth, workers):
+    """
+    Porównuje przeszukiwanie równoległe z jednowątkowym IterativeDeepening dla jednej pozycji.
+
+        :parameter:
+            game (Oware): Stan gry
+            depth (int): Głębokość przeszukania
+            workers (int): Liczba procesów wersji równoległej
+
+        :returns:
+            dict: Ruchy, oceny, liczby węzłów, czasy obu wersji oraz przyspieszenie
+    """
+
+    serial = IterativeDeepening(time_ms=inf, max_depth=depth)
+    parallel = ParallelRootSearch(depth, workers=workers)
+    try:
+        parallel.start()
+        start = time.perf_counter()
+        serial_move = serial(game)
+        serial_time = time.perf_counter() - start
+        parallel_move = parallel(game)
+    finally:
+        parallel.close()
+    return {
+        'serial_move': serial_move,
+        'parallel_move': parallel_move,
+        'serial_value': serial.value,
+        'parallel_value': parallel.value,
+        'serial_nodes': serial.nodes,
+        'parallel_nodes': parallel.nodes,
+        'serial_time': serial_time,
+        'parallel_time': parallel.elapsed,
+        'speedup': serial_time / parallel.elapsed if parallel.elapsed else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare parallel root-split search with IterativeDeepening')
+    parser.add_argument('--depth', type=int, default=8, help='Search depth')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--plies', type=int, default=10,
+                        help='Number of positions (plies of a depth-4 self-play game) to compare on')
+    args = parser.parse_args()
+
+    game = Oware([AI_Player(IterativeDeepening(max_depth=4, time_ms=inf)),
+                  AI_Player(IterativeDeepening(max_depth=4, time_ms=inf))])
+    serial_total = parallel_total = 0.0
+    for ply in range(args.plies):
+        if game.is_over():
+            break
+        result = compare(game, args.depth, args.workers)
+        serial_total += result['serial_time']
+        parallel_total += result['parallel_time']
+        print(f"ruch {ply + 1}: IterativeDeepening {result['serial_time']:.3f}s ({result['serial_nodes']} węzłów, "
+              f"ocena {result['serial_value']:.3f}), równolegle {result['parallel_time']:.3f}s "
+              f"({result['parallel_nodes']} węzłów, ocena {result['parallel_value']:.3f}), "
+              f"przyspieszenie {result['speedup']:.2f}x")
+        game.play_move(game.get_move())
+    if parallel_total:
+        print(f"Łącznie: przyspieszenie {serial_total / parallel_total:.2f}x względem IterativeDeepening "
+              f"przy {args.workers} procesach (rdzeni: {os.cpu_count()})")
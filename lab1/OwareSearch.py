@@ -0,0 +1,284 @@
+"""
+# Przeszukiwanie z iteracyjnym pogłębianiem dla gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Negamax o stałej głębokości odpowiada bardzo szybko w otwarciu i bardzo wolno w środkowej fazie gry.
+  Klasa IterativeDeepening przeszukuje drzewo gry algorytmem alfa-beta na coraz większą głębokość, aż do wyczerpania
+  budżetu czasu na ruch (w milisekundach). Kolejne iteracje zaczynają od wariantu głównego (PV) znalezionego
+  w poprzedniej iteracji, co poprawia odcięcia alfa-beta. Po przekroczeniu czasu zwracany jest najlepszy ruch
+  z ostatniej zakończonej iteracji.
+
+  Przeszukiwanie wykonuje ruchy w miejscu (make_move / unmake_move klasy Oware) i może korzystać z tablicy
+  transpozycji OwareTT oraz z bazy końcówek EndgameTable (pozycje z bazy nie są dalej przeszukiwane).
+  Obiekt klasy jest wywoływalny tak samo jak Negamax z easyAI:
+    AI_Player(IterativeDeepening(time_ms=200, tt=OwareTT()))
+"""
+
+import time
+
+from OwareTT import LOWERBOUND, EXACT, UPPERBOUND
+
+inf = float('infinity')
+
+
+class SearchTimeout(Exception):
+    """
+    Wyjątek przerywający przeszukiwanie po przekroczeniu budżetu czasu.
+    """
+
+
+class IterativeDeepening:
+    """
+    Algorytm alfa-beta z iteracyjnym pogłębianiem i limitem czasu na ruch.
+
+        Atrybuty:
+            - time_ms (float) : budżet czasu na ruch w milisekundach
+            - max_depth (int) : maksymalna głębokość przeszukania
+            - scoring (function) : funkcja oceniająca stan gry z perspektywy gracza wykonującego ruch
+            - tt (OwareTT) : opcjonalna tablica transpozycji
+            - endgame (EndgameTable) : opcjonalna baza końcówek
+            - check_every (int) : co ile węzłów sprawdzany jest upływ czasu
+            - on_iteration (function) : opcjonalna funkcja wywoływana po każdej zakończonej iteracji
+            - nodes (int) : liczba węzłów odwiedzonych w ostatnim przeszukaniu
+            - interior_nodes (int) : liczba węzłów, dla których wygenerowano ruchy
+            - moves_generated (int) : łączna liczba wygenerowanych ruchów (średni współczynnik rozgałęzienia
+                                    to moves_generated / interior_nodes)
+            - iterations (list) : słowniki {depth, nodes, elapsed} dla kolejnych zakończonych iteracji
+            - depth_reached (int) : głębokość ostatniej zakończonej iteracji
+            - pv (list) : wariant główny z ostatniej zakończonej iteracji
+            - value (float) : ocena pozycji z ostatniej zakończonej iteracji
+
+        Metody:
+            - __init__(self, time_ms, max_depth, scoring, tt, check_every, endgame, on_iteration) : Inicjalizacja
+            - __call__(self, game) : Wybór najlepszego ruchu dla bieżącego gracza
+            - reset(self) : Przygotowanie liczników i stanu przed nowym przeszukaniem
+            - search(self, game, depth, alpha, beta, ply, on_pv) : Rekurencyjne przeszukiwanie alfa-beta
+            - order_moves(self, moves, first) : Ustawienie wskazanego ruchu na początku listy
+    """
+
+    def __init__(self, time_ms=200, max_depth=64, scoring=None, tt=None, check_every=1024, endgame=None,
+                 on_iteration=None):
+        """
+        Inicjalizacja algorytmu.
+
+            :parameter:
+                time_ms (float): Budżet czasu na jeden ruch w milisekundach
+                max_depth (int): Maksymalna głębokość, po osiągnięciu której pogłębianie zostaje zakończone
+                scoring (function): Funkcja f(game) -> ocena. Domyślnie wykorzystywana jest metoda game.scoring()
+                tt (OwareTT): Tablica transpozycji, domyślnie None (bez tablicy)
+                check_every (int): Co ile odwiedzonych węzłów sprawdzany jest upływ czasu
+                endgame (EndgameTable): Baza końcówek, domyślnie None. Jej wartości są różnicą punktów, dlatego
+                            przy braku funkcji scoring wykorzystywana jest wtedy ocena endgame.scoring. Z inną
+                            funkcją scoring (inna skala ocen) baza nie jest odpytywana w trakcie przeszukiwania.
+                on_iteration (function): Funkcja f(searcher, depth, value, elapsed) wywoływana po każdej zakończonej
+                            iteracji (np. do zbierania statystyk), domyślnie None
+
+            :returns:
+                IterativeDeepening : obiekt klasy IterativeDeepening
+        """
+
+        self.time_ms = time_ms
+        self.max_depth = max_depth
+        self.scoring = scoring
+        self.tt = tt
+        self.check_every = check_every
+        self.endgame = endgame
+        self.on_iteration = on_iteration
+        self.nodes = 0
+        self.interior_nodes = 0
+        self.moves_generated = 0
+        self.iterations = []
+        self.depth_reached = 0
+        self.pv = []
+        self.value = None
+
+    def __call__(self, game):
+        """
+        Zwraca najlepszy ruch znaleziony w ramach budżetu czasu. Pierwsza iteracja (głębokość 1) wykonywana jest
+        zawsze do końca, dzięki czemu algorytm zawsze zwraca poprawny ruch.
+
+            :parameter:
+                game (Oware): Stan gry, dla którego szukamy ruchu
+
+            :returns:
+                int: Indeks kubeczka, od którego należy zacząć ruch
+        """
+
+        self.reset()
+        start = time.perf_counter()
+        undo_depth = len(game.undo_stack)
+        current_player = game.current_player
+        best_move = game.possible_moves()[0]
+
+        for depth in range(1, self.max_depth + 1):
+            if depth == 2:
+                # dopiero od drugiej iteracji obowiązuje limit czasu
+                self.deadline = start + self.time_ms / 1000
+            self.root_best = None
+            try:
+                value = self.search(game, depth, -inf, inf, 0, True)
+            except SearchTimeout:
+                # cofnięcie ruchów przerwanego przeszukania
+                while len(game.undo_stack) > undo_depth:
+                    game.unmake_move(None)
+                game.current_player = current_player
+                if self.root_best is not None:
+                    # ruch PV został już przeszukany w tej iteracji, więc lepszy od niego ruch jest wiarygodny
+                    best_move = self.root_best
+                break
+            best_move = self.pv[0]
+            self.value = value
+            self.depth_reached = depth
+            elapsed = time.perf_counter() - start
+            self.iterations.append({'depth': depth, 'nodes': self.nodes, 'elapsed': elapsed})
+            if self.on_iteration is not None:
+                self.on_iteration(self, depth, value, elapsed)
+            if elapsed >= self.time_ms / 1000:
+                break
+        return best_move
+
+    def reset(self):
+        """
+        Zeruje liczniki oraz wariant główny przed nowym przeszukaniem (bez limitu czasu - ustawia go __call__).
+        Wywoływana przez __call__, a także przez kod wywołujący bezpośrednio metodę search (np. podczas
+        równoległego przeszukiwania korzenia w OwareParallel.py).
+
+            :returns:
+                void
+        """
+
+        if self.scoring:
+            self.evaluate = self.scoring
+        elif self.endgame is not None:
+            self.evaluate = self.endgame.scoring
+        else:
+            self.evaluate = lambda g: g.scoring()
+        # wartości z bazy są różnicą punktów - można je mieszać tylko z oceną w tej samej skali
+        self.probe_endgame = self.endgame is not None and self.evaluate == self.endgame.scoring
+        self.deadline = None
+        self.nodes = 0
+        self.interior_nodes = 0
+        self.moves_generated = 0
+        self.iterations = []
+        self.next_check = self.check_every
+        self.depth_reached = 0
+        self.pv = []
+        self.value = None
+        if self.tt is not None:
+            self.tt.new_search()
+
+    def order_moves(self, moves, first):
+        """
+        Przenosi wskazany ruch na początek listy ruchów.
+
+            :parameter:
+                moves (list): Lista możliwych ruchów
+                first (int): Ruch, który ma zostać przeszukany jako pierwszy (lub None)
+
+            :returns:
+                list: Lista ruchów z ruchem first na początku
+        """
+
+        if first is not None and first in moves and moves[0] != first:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def search(self, game, depth, alpha, beta, ply, on_pv=False):
+        """
+        Przeszukiwanie alfa-beta w wariancie negamax. Wariant główny z poprzedniej iteracji oraz ruch z tablicy
+        transpozycji przeszukiwane są jako pierwsze.
+
+            :parameter:
+                game (Oware): Stan gry
+                depth (int): Pozostała głębokość przeszukania
+                alpha (float): Dolne ograniczenie oceny
+                beta (float): Górne ograniczenie oceny
+                ply (int): Odległość od korzenia drzewa
+                on_pv (bool): Czy węzeł leży na wariancie głównym poprzedniej iteracji
+
+            :returns:
+                float: Ocena pozycji z perspektywy gracza wykonującego ruch
+        """
+
+        self.nodes += 1
+        if self.deadline is not None and self.nodes >= self.next_check:
+            self.next_check = self.nodes + self.check_every
+            if time.perf_counter() >= self.deadline:
+                raise SearchTimeout()
+
+        if depth == 0 or game.is_over():
+            # tak jak w easyAI: szybsze zwycięstwa (i późniejsze porażki) są nieco lepiej oceniane
+            self.child_line = []
+            return self.evaluate(game) * (1 + 0.001 * depth)
+
+        if ply > 0 and self.probe_endgame:
+            margin = self.endgame.probe(game)
+            if margin is not None:
+                # wynik z bazy końcówek - pozycji nie trzeba przeszukiwać. Baza gra do wyczerpania planszy, a gra
+                # kończy się wcześniej, gdy zwycięzca przekroczy 24 punkty: zwycięzca (znak wyniku) jest dokładny,
+                # różnica punktów jest tylko przybliżeniem - tak jak ocena liścia, bez premii za głębokość
+                self.child_line = []
+                return game.player.score - game.opponent.score + margin
+
+        alpha_orig = alpha
+        tt_move = None
+        key = None
+        if self.tt is not None:
+            key = self.tt.keys.hash(game)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                tt_move = entry[4]
+                if ply > 0 and entry[1] >= depth:
+                    flag, value = entry[2], entry[3]
+                    if flag == LOWERBOUND:
+                        alpha = max(alpha, value)
+                    elif flag == UPPERBOUND:
+                        beta = min(beta, value)
+                    if flag == EXACT or alpha >= beta:
+                        self.child_line = [tt_move]
+                        return value
+
+        moves = game.possible_moves()
+        self.interior_nodes += 1
+        self.moves_generated += len(moves)
+        pv_move = self.pv[ply] if on_pv and ply < len(self.pv) else None
+        self.order_moves(moves, tt_move)
+        self.order_moves(moves, pv_move)
+
+        best_value = -inf
+        best_move = moves[0]
+        best_line = None
+        for move in moves:
+            game.make_move(move)
+            game.switch_player()
+            value = -self.search(game, depth - 1, -beta, -alpha, ply + 1, move == pv_move)
+            game.switch_player()
+            game.unmake_move(move)
+
+            if value > best_value:
+                best_value = value
+                best_move = move
+                best_line = self.child_line
+                if ply == 0 and move != moves[0]:
+                    self.root_best = move
+            if value > alpha:
+                alpha = value
+                if alpha >= beta:
+                    break
+
+        self.child_line = [best_move] + (best_line or [])
+        if ply == 0:
+            self.pv = self.child_line
+        if self.tt is not None:
+            if best_value <= alpha_orig:
+                flag = UPPERBOUND
+            elif best_value >= beta:
+                flag = LOWERBOUND
+            else:
+                flag = EXACT
+            self.tt.save(key, depth, flag, best_value, best_move)
+        return best_value
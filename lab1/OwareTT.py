@@ -0,0 +1,298 @@
+"""
+# Tablica transpozycji dla gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Podczas siania nasion do tej samej pozycji można dojść wieloma kolejnościami ruchów (transpozycje).
+  Tablica transpozycji zapamiętuje wynik przeszukania pozycji (głębokość, rodzaj ograniczenia, wartość i najlepszy
+  ruch), dzięki czemu Negamax nie przeszukuje jej ponownie od zera.
+
+  Pozycja identyfikowana jest 64-bitowym kluczem Zobrista złożonym z planszy, gracza wykonującego ruch oraz punktacji
+  obu graczy. Rozmiar tablicy ograniczony jest limitem pamięci, a przy kolizji indeksów działa polityka zastępowania
+  "dwóch kubełków": pierwszy slot przechowuje wpis z największą głębokością (lub z aktualnego przeszukania),
+  drugi jest zawsze nadpisywany najnowszym wpisem.
+
+  Klasa OwareTT implementuje interfejs tablic transpozycji z easyAI (lookup, store). Negamax z easyAI nie oznacza
+  jednak początku kolejnych przeszukań (new_search), więc zamiast niego należy używać TTNegamax:
+    TTNegamax(6, tt=OwareTT(max_bytes=64 * 2 ** 20))
+  IterativeDeepening z OwareSearch.py wywołuje new_search samodzielnie.
+"""
+
+import random
+import sys
+
+from easyAI import Negamax
+from easyAI.AI.Negamax import LOWERBOUND, EXACT, UPPERBOUND
+
+# największa liczba nasion w kubeczku lub punktacja gracza uwzględniana w kluczach Zobrista
+MAX_SEEDS = 96
+
+
+class ZobristKeys:
+    """
+    Zestaw losowych 64-bitowych kluczy Zobrista dla planszy Oware.
+
+        Atrybuty:
+            - pits (list) : klucze dla par (kubeczek, liczba nasion), 12 list po MAX_SEEDS + 1 kluczy
+            - scores (list) : klucze punktacji, 2 listy po MAX_SEEDS + 1 kluczy
+            - side (int) : klucz dołączany gdy ruch wykonuje gracz 2
+
+        Metody:
+            - __init__(self, seed) : Wylosowanie kluczy
+            - hash(self, game) : Obliczenie klucza Zobrista dla stanu gry
+    """
+
+    def __init__(self, seed=2023):
+        """
+        Losuje klucze Zobrista przy pomocy generatora o zadanym ziarnie, dzięki czemu klucze są powtarzalne
+        pomiędzy uruchomieniami programu.
+
+            :parameter:
+                seed (int): Ziarno generatora liczb losowych
+
+            :returns:
+                ZobristKeys : obiekt klasy ZobristKeys
+        """
+
+        rng = random.Random(seed)
+        self.pits = [[rng.getrandbits(64) for _ in range(MAX_SEEDS + 1)] for _ in range(12)]
+        self.scores = [[rng.getrandbits(64) for _ in range(MAX_SEEDS + 1)] for _ in range(2)]
+        self.side = rng.getrandbits(64)
+
+    def hash(self, game):
+        """
+        Oblicza klucz Zobrista dla planszy, gracza wykonującego ruch oraz punktacji obu graczy.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                int: 64-bitowy klucz Zobrista
+        """
+
+        pits = self.pits
+        board = game.board
+        key = (self.scores[0][game.players[0].score % (MAX_SEEDS + 1)]
+               ^ self.scores[1][game.players[1].score % (MAX_SEEDS + 1)])
+        if game.current_player == 2:
+            key ^= self.side
+        for i in range(12):
+            key ^= pits[i][board[i]]
+        return key
+
+
+class OwareTT:
+    """
+    Tablica transpozycji o ograniczonym rozmiarze, indeksowana kluczami Zobrista.
+
+        Atrybuty:
+            - keys (ZobristKeys) : klucze Zobrista
+            - size (int) : liczba kubełków tablicy (potęga dwójki)
+            - generation (int) : numer bieżącego przeszukania, wykorzystywany przy zastępowaniu wpisów
+            - probes, hits, stores, replacements (int) : liczniki statystyk
+
+        Metody:
+            - __init__(self, max_bytes, keys) : Utworzenie tablicy w limicie pamięci
+            - probe(self, key) : Odczyt wpisu dla klucza
+            - save(self, key, depth, flag, value, move) : Zapis wpisu zgodnie z polityką zastępowania
+            - lookup(self, game) : Odczyt wpisu dla gry (interfejs easyAI)
+            - store(self, game, depth, value, move, flag) : Zapis wpisu dla gry (interfejs easyAI)
+            - new_search(self) : Oznaczenie początku nowego przeszukania
+            - clear(self) : Wyczyszczenie tablicy i statystyk
+            - hit_rate(self) : Odsetek trafień
+            - stats(self) : Słownik ze statystykami tablicy
+    """
+
+    # przybliżony koszt jednego wpisu: krotka 6 elementów, klucz 64-bitowy i referencja w liście
+    ENTRY_BYTES = sys.getsizeof((0,) * 6) + sys.getsizeof(2 ** 63) + 8
+
+    def __init__(self, max_bytes=32 * 2 ** 20, keys=None):
+        """
+        Tworzy tablicę transpozycji, której rozmiar dobierany jest tak, by wpisy nie przekroczyły limitu pamięci.
+        Każdy kubełek zawiera dwa sloty: zastępowany według głębokości oraz zastępowany zawsze.
+
+            :parameter:
+                max_bytes (int): Limit pamięci zajmowanej przez wpisy tablicy (w bajtach)
+                keys (ZobristKeys): Klucze Zobrista. Domyślnie tworzone są nowe z ustalonym ziarnem.
+
+            :returns:
+                OwareTT : obiekt klasy OwareTT
+        """
+
+        if max_bytes < 2 * self.ENTRY_BYTES:
+            raise ValueError('max_bytes is too small to hold a single bucket')
+        self.keys = keys if keys is not None else ZobristKeys()
+        size = 1
+        while size * 4 * self.ENTRY_BYTES <= max_bytes:
+            size *= 2
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy oraz zeruje statystyki.
+
+            :returns:
+                void
+        """
+
+        self.depth_slots = [None] * self.size
+        self.always_slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def new_search(self):
+        """
+        Oznacza początek nowego przeszukania. Wpisy z poprzednich przeszukań mogą zostać zastąpione
+        w slocie głębokości nawet przez płytsze wyniki.
+
+            :returns:
+                void
+        """
+
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        Zwraca wpis zapisany dla klucza Zobrista.
+
+            :parameter:
+                key (int): Klucz Zobrista pozycji
+
+            :returns:
+                tuple: (klucz, głębokość, flaga, wartość, ruch, generacja) lub None jeśli brak wpisu
+        """
+
+        self.probes += 1
+        index = key & self.mask
+        entry = self.depth_slots[index]
+        if entry is None or entry[0] != key:
+            entry = self.always_slots[index]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry
+
+    def save(self, key, depth, flag, value, move):
+        """
+        Zapisuje wynik przeszukania pozycji. Slot głębokości jest nadpisywany gdy nowy wpis dotyczy tej samej
+        pozycji, jest co najmniej tak głęboki lub stary wpis pochodzi z wcześniejszego przeszukania.
+        W przeciwnym wypadku wpis trafia do slotu zastępowanego zawsze.
+
+            :parameter:
+                key (int): Klucz Zobrista pozycji
+                depth (int): Głębokość przeszukania
+                flag (int): Rodzaj ograniczenia (LOWERBOUND, EXACT, UPPERBOUND)
+                value (float): Wartość pozycji
+                move (int): Najlepszy znaleziony ruch
+
+            :returns:
+                void
+        """
+
+        self.stores += 1
+        index = key & self.mask
+        entry = (key, depth, flag, value, move, self.generation)
+        old = self.depth_slots[index]
+        if old is None or old[0] == key or depth >= old[1] or old[5] != self.generation:
+            if old is not None and old[0] != key:
+                self.replacements += 1
+                # wypchnięty wpis ma jeszcze szansę przetrwać w slocie zastępowanym zawsze
+                self.always_slots[index] = old
+            self.depth_slots[index] = entry
+        else:
+            if self.always_slots[index] is not None:
+                self.replacements += 1
+            self.always_slots[index] = entry
+
+    def lookup(self, game):
+        """
+        Odczytuje wpis dla stanu gry w formacie oczekiwanym przez Negamax z easyAI.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                dict: Słownik z kluczami depth, flag, value, move lub None jeśli brak wpisu
+        """
+
+        entry = self.probe(self.keys.hash(game))
+        if entry is None:
+            return None
+        return {'depth': entry[1], 'flag': entry[2], 'value': entry[3], 'move': entry[4]}
+
+    def store(self, game, depth, value, move, flag):
+        """
+        Zapisuje wynik przeszukania stanu gry (interfejs Negamax z easyAI).
+
+            :parameter:
+                game (Oware): Stan gry
+                depth (int): Głębokość przeszukania
+                value (float): Wartość pozycji
+                move (int): Najlepszy znaleziony ruch
+                flag (int): Rodzaj ograniczenia (LOWERBOUND, EXACT, UPPERBOUND)
+
+            :returns:
+                void
+        """
+
+        self.save(self.keys.hash(game), depth, flag, value, move)
+
+    def hit_rate(self):
+        """
+        Zwraca odsetek zapytań zakończonych trafieniem.
+
+            :returns:
+                float: Liczba trafień podzielona przez liczbę zapytań (0 gdy nie było zapytań)
+        """
+
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        """
+        Zwraca statystyki tablicy transpozycji.
+
+            :returns:
+                dict: Liczba zapytań, trafień, zapisów, zastąpień, zajętych slotów oraz odsetek trafień
+        """
+
+        used = sum(entry is not None for entry in self.depth_slots) \
+            + sum(entry is not None for entry in self.always_slots)
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'hit_rate': self.hit_rate(),
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'used_slots': used,
+            'capacity': 2 * self.size,
+        }
+
+
+class TTNegamax(Negamax):
+    """
+    Negamax z easyAI, który przed każdym wyborem ruchu oznacza w tablicy transpozycji początek nowego przeszukania.
+    Bez tego generacja tablicy OwareTT się nie zmienia i wpisy z poprzednich ruchów nigdy nie są traktowane
+    jako stare przy zastępowaniu.
+    """
+
+    def __call__(self, game):
+        """
+        Wybiera ruch algorytmem Negamax.
+
+            :parameter:
+                game (Oware): Stan gry
+
+            :returns:
+                int: Wybrany ruch
+        """
+
+        if self.tt is not None:
+            self.tt.new_search()
+        return super().__call__(game)
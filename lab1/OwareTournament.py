@@ -0,0 +1,361 @@
+"""
+# Turniej silników gry Oware
+
+## Autorzy:
+  Kacper Stankiewicz, Mikołaj Prętki
+
+## Opis:
+  Porównywanie silników przy pomocy pojedynczego game.play() (które wyświetla planszę po każdym ruchu) nie nadaje się
+  do strojenia parametrów. Moduł rozgrywa bez wyświetlania tysiące partii pomiędzy konfiguracjami silników
+  (algorytm, głębokość, funkcja oceny, budżet czasu) w puli procesów. Każde losowe otwarcie rozgrywane jest dwukrotnie,
+  z zamianą stron, a wynik każdej partii zapisywany jest w osobnej linii pliku JSONL.
+  Na koniec obliczany jest ranking Elo (model Bradleya-Terry'ego, remis liczony jako pół zwycięstwa)
+  wraz z przedziałami ufności wyznaczonymi metodą bootstrap.
+
+  Konfiguracja silnika to słownik, np.:
+    {"name": "negamax6", "algorithm": "negamax", "depth": 6}
+    {"name": "id100", "algorithm": "iterative", "time_ms": 100, "tt": true, "scoring": "material"}
+    {"name": "mcts100", "algorithm": "mcts", "time_ms": 100}
+
+  Przykładowe wywołanie:
+    python OwareTournament.py --configs engines.json --games 200 --workers 8 --output results.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+from easyAI import AI_Player
+
+from Oware import Oware
+from OwareMCTS import MCTS
+from OwareSearch import IterativeDeepening
+from OwareTT import OwareTT, TTNegamax
+
+DEFAULT_CONFIGS = [
+    {'name': 'negamax1', 'algorithm': 'negamax', 'depth': 1},
+    {'name': 'negamax4', 'algorithm': 'negamax', 'depth': 4},
+    {'name': 'id50', 'algorithm': 'iterative', 'time_ms': 50, 'tt': True},
+    {'name': 'id50-material', 'algorithm': 'iterative', 'time_ms': 50, 'tt': True, 'scoring': 'material'},
+]
+
+
+def material(game):
+    """
+    Funkcja oceny: różnica punktów gracza wykonującego ruch i jego przeciwnika.
+
+        :parameter:
+            game (Oware): Stan gry
+
+        :returns:
+            int: Różnica punktów
+    """
+
+    return game.player.score - game.opponent.score
+
+
+SCORINGS = {
+    'default': None,
+    'material': material,
+}
+
+
+def make_engine(config):
+    """
+    Tworzy algorytm AI na podstawie konfiguracji silnika.
+
+        :parameter:
+            config (dict): Konfiguracja silnika - klucze name, algorithm (negamax, iterative, mcts) oraz parametry
+                        algorytmu: depth, time_ms, tt (bool), tt_bytes, scoring (nazwa funkcji oceny z SCORINGS),
+                        playouts, exploration
+
+        :returns:
+            object: Algorytm, który można przekazać do AI_Player
+    """
+
+    scoring = SCORINGS[config.get('scoring', 'default')]
+    tt = OwareTT(config.get('tt_bytes', 16 * 2 ** 20)) if config.get('tt') else None
+    algorithm = config.get('algorithm', 'negamax')
+    if algorithm == 'negamax':
+        return TTNegamax(config.get('depth', 4), scoring=scoring, tt=tt)
+    if algorithm == 'iterative':
+        return IterativeDeepening(time_ms=config.get('time_ms', 100), max_depth=config.get('max_depth', 64),
+                                  scoring=scoring, tt=tt)
+    if algorithm == 'mcts':
+        return MCTS(playouts=config.get('playouts'), time_ms=config.get('time_ms', 100),
+                    exploration=config.get('exploration', 1.4))
+    raise ValueError('Unknown algorithm ' + str(algorithm))
+
+
+def random_opening(plies, seed):
+    """
+    Losuje otwarcie - ciąg losowych dozwolonych ruchów, po którym gra nie jest zakończona.
+
+        :parameter:
+            plies (int): Liczba ruchów otwarcia
+            seed (int): Ziarno generatora liczb losowych
+
+        :returns:
+            list: Ruchy otwarcia
+    """
+
+    rng = random.Random(seed)
+    while True:
+        game = Oware([AI_Player(None), AI_Player(None)])
+        moves = []
+        for _ in range(plies):
+            if game.is_over():
+                break
+            move = rng.choice(game.possible_moves())
+            moves.append(move)
+            game.play_move(move)
+        if not game.is_over():
+            return moves
+
+
+def play_game(game_id, config1, config2, opening, max_moves=300):
+    """
+    Rozgrywa jedną partię bez wyświetlania planszy.
+
+        :parameter:
+            game_id (int): Numer partii
+            config1 (dict): Konfiguracja silnika gracza 1
+            config2 (dict): Konfiguracja silnika gracza 2
+            opening (list): Ruchy otwarcia wykonywane przed oddaniem gry silnikom
+            max_moves (int): Limit ruchów silników, po którym partia jest przerywana
+
+        :returns:
+            dict: Wynik partii (silniki, punktacja, zwycięzca, liczba ruchów, czasy namysłu)
+    """
+
+    game = Oware([AI_Player(make_engine(config1)), AI_Player(make_engine(config2))])
+    for move in opening:
+        game.play_move(move)
+    think_time = [0.0, 0.0]
+    plies = 0
+    while not game.is_over() and plies < max_moves:
+        start = time.perf_counter()
+        move = game.get_move()
+        think_time[game.current_player - 1] += time.perf_counter() - start
+        game.play_move(move)
+        plies += 1
+
+    score1, score2 = game.players[0].score, game.players[1].score
+    if score1 > score2:
+        winner = 1
+    elif score1 < score2:
+        winner = 2
+    else:
+        winner = 0
+    return {
+        'game': game_id,
+        'player1': config1['name'],
+        'player2': config2['name'],
+        'opening': opening,
+        'score1': score1,
+        'score2': score2,
+        'winner': winner,
+        'plies': plies,
+        'think_time1': think_time[0],
+        'think_time2': think_time[1],
+    }
+
+
+def schedule(configs, games_per_pair, opening_plies, seed):
+    """
+    Przygotowuje listę partii turnieju każdy z każdym. Każde otwarcie rozgrywane jest dwukrotnie z zamianą stron.
+
+        :parameter:
+            configs (list): Konfiguracje silników
+            games_per_pair (int): Liczba partii każdej pary silników (zaokrąglana w górę do parzystej)
+            opening_plies (int): Liczba losowych ruchów otwarcia
+            seed (int): Ziarno losowania otwarć
+
+        :returns:
+            list: Krotki (numer partii, konfiguracja gracza 1, konfiguracja gracza 2, otwarcie)
+    """
+
+    games = []
+    for pair, (config1, config2) in enumerate(combinations(configs, 2)):
+        for round_ in range((games_per_pair + 1) // 2):
+            opening = random_opening(opening_plies, seed * 1000003 + pair * 10007 + round_)
+            games.append((len(games), config1, config2, opening))
+            games.append((len(games), config2, config1, opening))
+    return games
+
+
+def run_tournament(configs, games_per_pair, output, workers=None, opening_plies=4, seed=0):
+    """
+    Rozgrywa turniej w puli procesów i zapisuje wynik każdej zakończonej partii do pliku JSONL.
+
+        :parameter:
+            configs (list): Konfiguracje silników
+            games_per_pair (int): Liczba partii każdej pary silników
+            output (str): Ścieżka pliku JSONL z wynikami partii
+            workers (int): Liczba procesów, domyślnie liczba rdzeni procesora
+            opening_plies (int): Liczba losowych ruchów otwarcia
+            seed (int): Ziarno losowania otwarć
+
+        :returns:
+            list: Wyniki wszystkich partii
+    """
+
+    names = [config['name'] for config in configs]
+    if len(set(names)) != len(names):
+        raise ValueError('Engine names must be unique')
+    games = schedule(configs, games_per_pair, opening_plies, seed)
+    results = []
+    with open(output, 'w', encoding='utf-8') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, *game) for game in games]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+    results.sort(key=lambda result: result['game'])
+    return results
+
+
+def load_results(path):
+    """
+    Wczytuje wyniki partii z pliku JSONL.
+
+        :parameter:
+            path (str): Ścieżka pliku JSONL
+
+        :returns:
+            list: Wyniki partii
+    """
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bradley_terry(names, results, iterations=200):
+    """
+    Wyznacza ranking Elo metodą największej wiarygodności w modelu Bradleya-Terry'ego. Remis liczony jest jako
+    pół zwycięstwa dla każdej ze stron, a każda para dostaje jeden wirtualny remis, dzięki czemu ranking jest
+    skończony również dla silników bez zwycięstw.
+
+        :parameter:
+            names (list): Nazwy silników
+            results (list): Wyniki partii
+            iterations (int): Liczba iteracji algorytmu minoryzacji-maksymalizacji
+
+        :returns:
+            dict: Ranking Elo każdego silnika (średnia rankingów równa 0)
+    """
+
+    index = {name: i for i, name in enumerate(names)}
+    count = len(names)
+    wins = [0.0] * count
+    games = [[0.0] * count for _ in range(count)]
+    for i, j in combinations(range(count), 2):
+        wins[i] += 0.5
+        wins[j] += 0.5
+        games[i][j] += 1
+        games[j][i] += 1
+    for result in results:
+        i, j = index[result['player1']], index[result['player2']]
+        games[i][j] += 1
+        games[j][i] += 1
+        if result['winner'] == 1:
+            wins[i] += 1
+        elif result['winner'] == 2:
+            wins[j] += 1
+        else:
+            wins[i] += 0.5
+            wins[j] += 0.5
+
+    strength = [1.0] * count
+    for _ in range(iterations):
+        strength = [wins[i] / sum(games[i][j] / (strength[i] + strength[j]) for j in range(count) if games[i][j])
+                    if wins[i] else strength[i] for i in range(count)]
+        norm = math.exp(sum(math.log(s) for s in strength) / count)
+        strength = [s / norm for s in strength]
+    return {name: 400 * math.log10(strength[index[name]]) for name in names}
+
+
+def compute_elo(names, results, bootstrap=200, confidence=0.95, seed=0):
+    """
+    Oblicza ranking Elo wraz z przedziałami ufności (bootstrap - losowanie partii ze zwracaniem).
+
+        :parameter:
+            names (list): Nazwy silników
+            results (list): Wyniki partii
+            bootstrap (int): Liczba prób bootstrap
+            confidence (float): Poziom ufności przedziałów
+            seed (int): Ziarno generatora liczb losowych
+
+        :returns:
+            dict: Dla każdego silnika słownik z rankingiem (elo), granicami przedziału (low, high),
+                  liczbą partii i średnim wynikiem
+    """
+
+    rng = random.Random(seed)
+    elo = bradley_terry(names, results)
+    samples = {name: [] for name in names}
+    for _ in range(bootstrap):
+        resampled = [rng.choice(results) for _ in results]
+        for name, rating in bradley_terry(names, resampled, iterations=100).items():
+            samples[name].append(rating)
+
+    tail = (1 - confidence) / 2
+    table = {}
+    for name in names:
+        played = [result for result in results if name in (result['player1'], result['player2'])]
+        points = 0.0
+        for result in played:
+            if result['winner'] == 0:
+                points += 0.5
+            elif result['player' + str(result['winner'])] == name:
+                points += 1.0
+        ratings = sorted(samples[name])
+        table[name] = {
+            'elo': elo[name],
+            'low': ratings[int(tail * (len(ratings) - 1))] if ratings else elo[name],
+            'high': ratings[int((1 - tail) * (len(ratings) - 1))] if ratings else elo[name],
+            'games': len(played),
+            'score': points / len(played) if played else 0.0,
+        }
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Headless Oware engine tournament with Elo statistics')
+    parser.add_argument('--configs', help='JSON file with a list of engine configurations')
+    parser.add_argument('--games', type=int, default=20, help='Games per pair of engines')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--output', default='tournament.jsonl', help='JSONL file with per-game results')
+    parser.add_argument('--opening-plies', dest='opening_plies', type=int, default=4,
+                        help='Number of random opening moves')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random openings')
+    parser.add_argument('--results', help='Only compute Elo from an existing JSONL file')
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    else:
+        configs = DEFAULT_CONFIGS
+
+    if args.results:
+        results = load_results(args.results)
+        # nazwy graczy z pliku wyników - plik mógł powstać z innymi konfiguracjami niż bieżące
+        names = list(dict.fromkeys(name for result in results for name in (result['player1'], result['player2'])))
+    else:
+        start = time.perf_counter()
+        results = run_tournament(configs, args.games, args.output, args.workers, args.opening_plies, args.seed)
+        print(f"Rozegrano {len(results)} partii w {time.perf_counter() - start:.1f}s")
+        names = [config['name'] for config in configs]
+
+    table = compute_elo(names, results)
+    for name in sorted(names, key=lambda name: table[name]['elo'], reverse=True):
+        row = table[name]
+        print(f"{name:20s} Elo {row['elo']:7.1f}  [{row['low']:7.1f}, {row['high']:7.1f}]  "
+              f"partie: {row['games']:5d}  wynik: {100 * row['score']:5.1f}%")
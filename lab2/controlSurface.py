@@ -0,0 +1,212 @@
+"""
+=====================================
+  Tablica powierzchni sterowania
+=====================================
+
+Aby uruchomić program należy zainstalować następujące biblioteki
+pip install scikit-fuzzy
+pip install matplotlib
+
+Tablica powierzchni sterowania
+------------------------------
+
+* Opis
+   - system sterowania z modułu fuzzyLogic (control_system()) jest jednorazowo próbkowany (compute_batch) w węzłach siatki
+     odległość x prędkość x masa, a wynik zapisywany jest do pliku .npy (float32), który wczytywany jest
+     przez np.load(mmap_mode='r') - bez kopiowania do pamięci
+   - osie siatki oraz błąd interpolacji zmierzony na losowych punktach kontrolnych zapisywane są obok,
+     w pliku <plik>.json
+   - zapytania obsługiwane są interpolacją trójliniową - koszt stały, niezależny od liczby reguł
+     i rozdzielczości uniwersum przepustnicy
+   - oś masy jest gęstsza w zakresie 0.8-5t, gdzie leżą zbiory lekki i średni
+
+* Przykład użycia
+   - python controlSurface.py --output surface.npy
+   - surface = ControlSurface('surface.npy')
+     surface(500, 90, 1.5) -> ok. 33.3
+"""
+import argparse
+import json
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from fuzzyLogic import INPUTS, compute_batch
+
+DEFAULT_AXES = {
+    'distance': np.linspace(0, 500, 101),
+    'velocity': np.linspace(0, 150, 76),
+    'mass': np.concatenate([np.linspace(0.8, 4.8, 41), np.linspace(5, 40, 36)]),
+}
+
+
+def build_surface(output, axes=DEFAULT_AXES, validation=20000, seed=0):
+    """
+    Próbkuje system sterowania w węzłach siatki i zapisuje tablicę wraz z opisem osi.
+
+        :parameter:
+            output (str): Ścieżka pliku .npy
+            axes (dict): Rosnące węzły siatki dla osi distance, velocity i mass
+            validation (int): Liczba losowych punktów kontrolnych do pomiaru błędu interpolacji
+            seed (int): Ziarno generatora punktów kontrolnych
+
+        :returns:
+            dict: Opis tablicy (osie, błąd maksymalny i średni, czas budowy)
+    """
+
+    names = INPUTS
+    grids = np.meshgrid(*(np.asarray(axes[name], dtype=np.float64) for name in names), indexing='ij')
+    start = time.perf_counter()
+    table = compute_batch(*grids).astype(np.float32)
+    elapsed = time.perf_counter() - start
+    np.save(output, table)
+
+    meta = {
+        'axes': {name: [float(value) for value in axes[name]] for name in names},
+        'build_time': elapsed,
+    }
+    if validation:
+        rng = np.random.default_rng(seed)
+        points = [rng.uniform(axes[name][0], axes[name][-1], validation) for name in names]
+        error = np.abs(ControlSurface(output, meta).batch(*points) - compute_batch(*points))
+        meta['max_error'] = float(np.nanmax(error))
+        meta['mean_error'] = float(np.nanmean(error))
+    with open(output + '.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def cell(axis, value):
+    """
+    Wyznacza komórkę siatki zawierającą wartość oraz położenie wartości wewnątrz komórki.
+
+        :parameter:
+            axis (list): Rosnące węzły siatki
+            value (float): Wartość
+
+        :returns:
+            tuple: (indeks lewego węzła komórki, względne położenie w komórce 0-1)
+    """
+
+    i = bisect_right(axis, value) - 1
+    if i < 0:
+        return 0, 0.
+    if i >= len(axis) - 1:
+        return len(axis) - 2, 1.
+    low = axis[i]
+    return i, (value - low) / (axis[i + 1] - low)
+
+
+class ControlSurface:
+    """
+    Stablicowany system sterowania z interpolacją trójliniową.
+
+        Atrybuty:
+            - table (ndarray) : wartości przepustnicy w węzłach siatki (mmap)
+            - axes (list) : węzły siatki kolejnych osi (listy liczb)
+            - max_error (float) : zmierzony maksymalny błąd interpolacji (None gdy nie mierzono)
+
+        Metody:
+            - __init__(self, path, meta) : Wczytanie tablicy
+            - __call__(self, distance, velocity, mass) : Otwarcie przepustnicy dla jednej próbki
+            - batch(self, distances, velocities, masses) : Otwarcie przepustnicy dla tablic próbek
+    """
+
+    def __init__(self, path, meta=None):
+        """
+        Wczytuje tablicę (mmap) i opis osi z pliku <path>.json.
+
+            :parameter:
+                path (str): Ścieżka pliku .npy
+                meta (dict): Opis tablicy, domyślnie wczytywany z <path>.json
+
+            :returns:
+                ControlSurface : obiekt klasy ControlSurface
+        """
+
+        if meta is None:
+            with open(path + '.json', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        self.table = np.load(path, mmap_mode='r')
+        self.axes = [meta['axes'][name] for name in INPUTS]
+        self.max_error = meta.get('max_error')
+        if self.table.shape != tuple(len(axis) for axis in self.axes):
+            raise ValueError('Table shape does not match its axes')
+
+    def __call__(self, distance, velocity, mass):
+        """
+        Wyznacza otwarcie przepustnicy dla jednej próbki (wartości spoza siatki są przycinane do jej zakresu).
+
+            :parameter:
+                distance (float): Odległość od pojazdu przed nami w metrach
+                velocity (float): Prędkość aktualna w km/h
+                mass (float): Masa pojazdu w tonach
+
+            :returns:
+                float: Otwarcie przepustnicy w procentach
+        """
+
+        axes = self.axes
+        i, a = cell(axes[0], distance)
+        j, b = cell(axes[1], velocity)
+        k, c = cell(axes[2], mass)
+
+        # jeden odczyt 8 narożników komórki z mmap - tablica nie jest kopiowana do pamięci
+        ((t000, t001), (t010, t011)), ((t100, t101), (t110, t111)) = self.table[i:i + 2, j:j + 2, k:k + 2].tolist()
+        v00 = t000 + (t001 - t000) * c
+        v01 = t010 + (t011 - t010) * c
+        v10 = t100 + (t101 - t100) * c
+        v11 = t110 + (t111 - t110) * c
+        v0 = v00 + (v01 - v00) * b
+        v1 = v10 + (v11 - v10) * b
+        return v0 + (v1 - v0) * a
+
+    def batch(self, distances, velocities, masses):
+        """
+        Wyznacza otwarcie przepustnicy dla tablic próbek (wektorowa interpolacja trójliniowa).
+
+            :parameter:
+                distances (array): Odległości (N,)
+                velocities (array): Prędkości (N,)
+                masses (array): Masy (N,)
+
+            :returns:
+                ndarray: Otwarcie przepustnicy (N,)
+        """
+
+        indices, weights = [], []
+        for axis, values in zip(self.axes, (distances, velocities, masses)):
+            axis = np.asarray(axis)
+            values = np.asarray(values, dtype=np.float64)
+            i = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, len(axis) - 2)
+            t = np.clip((values - axis[i]) / (axis[i + 1] - axis[i]), 0., 1.)
+            indices.append(i)
+            weights.append(t)
+        (i, j, k), (a, b, c) = indices, weights
+
+        result = 0.
+        for di, wi in ((0, 1 - a), (1, a)):
+            for dj, wj in ((0, 1 - b), (1, b)):
+                for dk, wk in ((0, 1 - c), (1, c)):
+                    result = result + self.table[i + di, j + dj, k + dk] * (wi * wj * wk)
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a lookup table of the fuzzy cruise control surface')
+    parser.add_argument('--output', default='surface.npy', help='Output .npy file (axes are written to <output>.json)')
+    parser.add_argument('--validation', type=int, default=20000, help='Random points used to measure the error')
+    args = parser.parse_args()
+
+    meta = build_surface(args.output, validation=args.validation)
+    print(f"Tablica zapisana w {args.output} ({meta['build_time']:.1f}s)")
+    if args.validation:
+        print(f"Błąd interpolacji: maksymalny {meta['max_error']:.3f}, średni {meta['mean_error']:.4f}")
+
+    surface = ControlSurface(args.output)
+    start = time.perf_counter()
+    for _ in range(100000):
+        surface(500, 90, 1.5)
+    print(f"Przepustnica (500m, 90km/h, 1.5t): {surface(500, 90, 1.5):.2f}% "
+          f"({(time.perf_counter() - start) * 10:.2f} us na zapytanie)")
@@ -44,67 +44,269 @@ Adaptacyjny Tempomat
       * masa pojazdu = 1.5t
    - Przepustnica powinna być:
       * otwarta w 33%
+
+* Obliczenia wsadowe
+   - compute_batch(odległości, prędkości, masy) wyznacza otwarcie przepustnicy dla tablic numpy
+     (np. odtwarzanie zapisów telemetrii) - wyniki zgodne z ControlSystemSimulation.compute()
+
+* Użycie jako biblioteka
+   - import modułu nie buduje systemu i nie rysuje wykresów - control_system() buduje system przy pierwszym
+     wywołaniu i zapamiętuje go, simulation() tworzy nową symulację, show_plots() rysuje wykresy
+   - python fuzzyLogic.py --distance 500 --velocity 90 --mass 1.5 --headless
 """
-import matplotlib.pyplot as plt
+import argparse
+from functools import lru_cache
+
 import numpy as np
 import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-
-# stworzenie tablic zawierających wartości rzeczywiste
-distance = ctrl.Antecedent(np.arange(0, 501, 1), 'distance')
-velocity = ctrl.Antecedent(np.arange(0, 151, 1), 'velocity')
-mass = ctrl.Antecedent(np.arange(0.8, 41, 0.1), 'mass')
-throttle = ctrl.Consequent(np.arange(0, 101, 1), 'throttle')
-
-# stworzenie membership functions dla danych wejściowych i wyjściowych
-distance.automf(names=['blisko', 'optymalnie', 'daleko'])
-distance['blisko'] = fuzz.trapmf(distance.universe, [0,0,50,250])
-
-velocity.automf(names=['mała', 'średnia', 'wysoka'])
-
-mass.automf(names=['lekki', 'średni', 'ciężki'])
-mass['lekki'] = fuzz.trimf(mass.universe, [0.8,0.8, 1.6])
-mass['średni'] = fuzz.trimf(mass.universe, [1.0, 3.0, 4.5])
-mass['ciężki'] = fuzz.trimf(mass.universe, [3.0,40.0,40.0])
-
-throttle.automf(names=['zamknięta', 'lekko otwarta', 'średnio otwarta', 'mocno otwarta'])
-# nadpisanie wartości MF dla przepustnicy zamkniętej
-throttle['zamknięta'] = fuzz.trapmf(throttle.universe, [0, 0, 5, 33])
-
-# wyświetlenie wykresów
-distance.view()
-velocity.view()
-mass.view()
-throttle.view()
-
-# zasady
-
-rule1 = ctrl.Rule(distance['blisko'], throttle['zamknięta'])
-rule2 = ctrl.Rule(distance['optymalnie'] & velocity['średnia'], throttle['lekko otwarta'])
-rule3 = ctrl.Rule(distance['optymalnie'] & velocity['wysoka'], throttle['zamknięta'])
-rule4 = ctrl.Rule(distance['daleko'] & velocity['mała'], throttle['mocno otwarta'])
-rule5 = ctrl.Rule(distance['daleko'] & velocity['średnia'], throttle['lekko otwarta'])
-rule6 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['lekki'], throttle['średnio otwarta'])
-rule7 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['średni'], throttle['średnio otwarta'])
-rule8 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['ciężki'], throttle['mocno otwarta'])
-rule9 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['lekki'], throttle['lekko otwarta'])
-rule10 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['średni'], throttle['lekko otwarta'])
-rule11 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['ciężki'], throttle['zamknięta'])
-
-# stworzenie kontrolera z zestawem zasad
-thrt_ctrl = ctrl.ControlSystem(
-    [rule1, rule2, rule3, rule4, rule5, rule6, rule7, rule8, rule9, rule10, rule11])
-
-# stworzenie symulacji dla kontrolera
-throttle_simulation = ctrl.ControlSystemSimulation(thrt_ctrl)
-
-# sprawdzenie symulacji
-throttle_simulation.input['distance'] = 500
-throttle_simulation.input['velocity'] = 90
-throttle_simulation.input['mass'] = 1.5
-
-throttle_simulation.compute()
-
-print(throttle_simulation.output['throttle'])
-throttle.view(sim=throttle_simulation)
-plt.show()
\ No newline at end of file
+
+INPUTS = ('distance', 'velocity', 'mass')
+
+
+@lru_cache(maxsize=None)
+def control_system():
+    """
+    Buduje system sterowania tempomatu (zmienne, funkcje przynależności i 11 reguł). System tworzony jest raz,
+    przy pierwszym wywołaniu - kolejne wywołania zwracają ten sam obiekt. Moduł skfuzzy.control (wraz
+    z matplotlib, które importuje) ładowany jest dopiero tutaj, więc sam import fuzzyLogic jest szybki.
+
+        :returns:
+            ControlSystem: System sterowania
+    """
+
+    from skfuzzy import control as ctrl
+
+    # stworzenie tablic zawierających wartości rzeczywiste
+    distance = ctrl.Antecedent(np.arange(0, 501, 1), 'distance')
+    velocity = ctrl.Antecedent(np.arange(0, 151, 1), 'velocity')
+    mass = ctrl.Antecedent(np.arange(0.8, 41, 0.1), 'mass')
+    throttle = ctrl.Consequent(np.arange(0, 101, 1), 'throttle')
+
+    # stworzenie membership functions dla danych wejściowych i wyjściowych
+    distance.automf(names=['blisko', 'optymalnie', 'daleko'])
+    distance['blisko'] = fuzz.trapmf(distance.universe, [0,0,50,250])
+
+    velocity.automf(names=['mała', 'średnia', 'wysoka'])
+
+    mass.automf(names=['lekki', 'średni', 'ciężki'])
+    mass['lekki'] = fuzz.trimf(mass.universe, [0.8,0.8, 1.6])
+    mass['średni'] = fuzz.trimf(mass.universe, [1.0, 3.0, 4.5])
+    mass['ciężki'] = fuzz.trimf(mass.universe, [3.0,40.0,40.0])
+
+    throttle.automf(names=['zamknięta', 'lekko otwarta', 'średnio otwarta', 'mocno otwarta'])
+    # nadpisanie wartości MF dla przepustnicy zamkniętej
+    throttle['zamknięta'] = fuzz.trapmf(throttle.universe, [0, 0, 5, 33])
+
+    # zasady
+
+    rule1 = ctrl.Rule(distance['blisko'], throttle['zamknięta'])
+    rule2 = ctrl.Rule(distance['optymalnie'] & velocity['średnia'], throttle['lekko otwarta'])
+    rule3 = ctrl.Rule(distance['optymalnie'] & velocity['wysoka'], throttle['zamknięta'])
+    rule4 = ctrl.Rule(distance['daleko'] & velocity['mała'], throttle['mocno otwarta'])
+    rule5 = ctrl.Rule(distance['daleko'] & velocity['średnia'], throttle['lekko otwarta'])
+    rule6 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['lekki'], throttle['średnio otwarta'])
+    rule7 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['średni'], throttle['średnio otwarta'])
+    rule8 = ctrl.Rule(distance['optymalnie'] & velocity['mała'] & mass['ciężki'], throttle['mocno otwarta'])
+    rule9 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['lekki'], throttle['lekko otwarta'])
+    rule10 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['średni'], throttle['lekko otwarta'])
+    rule11 = ctrl.Rule(distance['daleko'] & velocity['wysoka'] & mass['ciężki'], throttle['zamknięta'])
+
+    # stworzenie kontrolera z zestawem zasad
+    return ctrl.ControlSystem(
+        [rule1, rule2, rule3, rule4, rule5, rule6, rule7, rule8, rule9, rule10, rule11])
+
+
+def variables(system=None):
+    """
+    Zwraca zmienne systemu sterowania według etykiet.
+
+        :parameter:
+            system (ControlSystem): System sterowania, domyślnie control_system()
+
+        :returns:
+            dict: Zmienne (Antecedent i Consequent) - klucze distance, velocity, mass, throttle
+    """
+
+    system = system or control_system()
+    return {variable.label: variable for variable in list(system.antecedents) + list(system.consequents)}
+
+
+def simulation(system=None):
+    """
+    Tworzy nową symulację dla systemu sterowania.
+
+        :parameter:
+            system (ControlSystem): System sterowania, domyślnie control_system()
+
+        :returns:
+            ControlSystemSimulation: Symulacja
+    """
+
+    from skfuzzy import control as ctrl
+    return ctrl.ControlSystemSimulation(system or control_system())
+
+
+def compute(distance, velocity, mass, sim):
+    """
+    Wyznacza otwarcie przepustnicy dla jednej próbki za pomocą symulacji skfuzzy.
+
+        :parameter:
+            distance (float): Odległość od pojazdu przed nami w metrach
+            velocity (float): Prędkość aktualna w km/h
+            mass (float): Masa pojazdu w tonach
+            sim (ControlSystemSimulation): Symulacja (simulation())
+
+        :returns:
+            float: Otwarcie przepustnicy w procentach
+    """
+
+    sim.input['distance'] = distance
+    sim.input['velocity'] = velocity
+    sim.input['mass'] = mass
+    sim.compute()
+    return sim.output['throttle']
+
+
+def show_plots(sim=None):
+    """
+    Wyświetla wykresy funkcji przynależności (oraz wyniku symulacji, jeśli została podana).
+    Moduł matplotlib.pyplot importowany jest dopiero tutaj.
+
+        :parameter:
+            sim (ControlSystemSimulation): Symulacja, której wynik ma zostać pokazany na wykresie przepustnicy
+
+        :returns:
+            void
+    """
+
+    import matplotlib.pyplot as plt
+
+    found = variables()
+    for label in INPUTS:
+        found[label].view()
+    found['throttle'].view(sim=sim)
+    plt.show()
+
+
+def membership_batch(term, inputs):
+    """
+    Wyznacza stopień spełnienia przesłanki reguły (Term lub TermAggregate) dla wszystkich próbek naraz.
+
+        :parameter:
+            term (TermPrimitive): Przesłanka reguły
+            inputs (dict): Tablice wartości wejściowych, klucze - etykiety zmiennych (Antecedent.label)
+
+        :returns:
+            ndarray: Stopnie spełnienia (N,)
+    """
+
+    from skfuzzy.control.term import TermAggregate
+
+    if isinstance(term, TermAggregate):
+        first = membership_batch(term.term1, inputs)
+        if term.kind == 'not':
+            return 1. - first
+        second = membership_batch(term.term2, inputs)
+        methods = term.agg_methods
+        return methods.and_func(first, second) if term.kind == 'and' else methods.or_func(first, second)
+    variable = term.parent
+    return fuzz.interp_membership(variable.universe, term.mf, inputs[variable.label])
+
+
+def compute_batch(distances, velocities, masses, system=None, chunk_size=4096):
+    """
+    Wektorowy odpowiednik ControlSystemSimulation.compute() dla wielu próbek jednocześnie.
+    Wykorzystuje reguły i funkcje przynależności przekazanego systemu (domyślnie control_system()) i powtarza obliczenia
+    skfuzzy: rozmycie wejść, stopnie spełnienia reguł (AND - fmin, OR - fmax), przycięcie i złożenie (max)
+    zbiorów wyjściowych, dogęszczenie uniwersum o punkty przecięcia funkcji przynależności z poziomami przycięcia
+    oraz defuzyfikację metodą środka ciężkości dla funkcji kawałkami liniowej.
+    Próbki przetwarzane są porcjami po chunk_size, aby ograniczyć zużycie pamięci.
+
+        :parameter:
+            distances (array): Odległości od pojazdu przed nami (N,)
+            velocities (array): Prędkości aktualne (N,)
+            masses (array): Masy pojazdu (N,)
+            system (ControlSystem): System sterowania, domyślnie control_system()
+            chunk_size (int): Liczba próbek przetwarzanych naraz
+
+        :returns:
+            ndarray: Otwarcie przepustnicy (N,), NaN dla próbek, dla których żadna reguła nie jest spełniona
+    """
+
+    values = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (distances, velocities, masses)))
+    shape = values[0].shape
+    values = [value.ravel() for value in values]
+    output = np.empty(values[0].size, dtype=np.float64)
+    system = system or control_system()
+    found = variables(system)
+    consequent = found['throttle']
+    universe = consequent.universe.astype(np.float64)
+    terms = list(consequent.terms.values())
+
+    for start in range(0, output.size, chunk_size):
+        stop = start + chunk_size
+        inputs = {}
+        for label, value in zip(INPUTS, values):
+            # skfuzzy przycina wartości wejściowe do zakresu uniwersum
+            bounds = found[label].universe
+            inputs[label] = np.clip(value[start:stop], bounds.min(), bounds.max())
+
+        # poziomy przycięcia zbiorów wyjściowych (kumulacja reguł o tym samym następniku)
+        cuts = {}
+        for rule in system.rules:
+            firing = membership_batch(rule.antecedent, inputs)
+            for weighted in rule.consequent:
+                activation = firing * weighted.weight
+                label = weighted.term.label
+                cuts[label] = activation if label not in cuts else consequent.accumulation_method(activation, cuts[label])
+
+        # punkty, w których funkcje przynależności osiągają poziom przycięcia (jak _interp_universe_fast)
+        points = [np.broadcast_to(universe, (len(inputs['distance']), universe.size))]
+        for term in terms:
+            if term.label not in cuts:
+                continue
+            cut = cuts[term.label][:, None]
+            mf = term.mf
+            above = np.where(cut == 0., mf > cut, mf >= cut)
+            crossing = above[:, 1:] != above[:, :-1]
+            slope = np.diff(mf)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                shift = (cut - mf[:-1]) * np.diff(universe) / slope
+            # brak przecięcia - punkt istniejący w uniwersum (odcinek zerowej szerokości nie zmienia wyniku)
+            points.append(universe[:-1] + np.where(crossing, shift, 0.))
+        x = np.sort(np.concatenate(points, axis=1), axis=1)
+
+        y = np.zeros_like(x)
+        for term in terms:
+            if term.label in cuts:
+                np.maximum(y, np.minimum(cuts[term.label][:, None], np.interp(x, universe, term.mf)), out=y)
+
+        # środek ciężkości funkcji kawałkowo liniowej (jak skfuzzy.defuzzify.centroid)
+        width = np.diff(x, axis=1)
+        y1, y2 = y[:, :-1], y[:, 1:]
+        area = 0.5 * width * (y1 + y2)
+        moment = width ** 2 * (y2 + 0.5 * y1) / 3. + x[:, :-1] * area
+        total = area.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            output[start:stop] = np.where(total > 0, moment.sum(axis=1) / total, np.nan)
+
+    return output.reshape(shape)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Adaptive cruise control fuzzy controller')
+    parser.add_argument('--distance', type=float, default=500, help='Distance to the vehicle ahead in metres')
+    parser.add_argument('--velocity', type=float, default=90, help='Current velocity in km/h')
+    parser.add_argument('--mass', type=float, default=1.5, help='Vehicle mass in tonnes')
+    parser.add_argument('--headless', action='store_true', help='Do not import matplotlib backends or show plots')
+    args = parser.parse_args()
+
+    if args.headless:
+        # skfuzzy.control importuje matplotlib.pyplot - backend Agg nie ładuje bibliotek okienkowych
+        import matplotlib
+        matplotlib.use('Agg')
+
+    # sprawdzenie symulacji
+    throttle_simulation = simulation()
+    print(compute(args.distance, args.velocity, args.mass, throttle_simulation))
+    if not args.headless:
+        show_plots(throttle_simulation)
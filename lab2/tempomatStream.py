@@ -0,0 +1,226 @@
+"""
+=====================================
+   Tempomat w trybie strumieniowym
+=====================================
+
+Aby uruchomić program należy zainstalować następujące biblioteki
+pip install scikit-fuzzy
+pip install matplotlib
+
+Tempomat w trybie strumieniowym
+-------------------------------
+
+* Opis
+   - sterownik pobiera kolejne próbki czujników (odległość, prędkość, masa) z generatora i co okres
+     1/rate sekundy wyznacza otwarcie przepustnicy
+   - źródła próbek:
+      * csv_replay - odtworzenie zapisu z pliku CSV (kolumny distance, velocity, mass)
+      * lead_vehicle - symulacja jazdy za pojazdem, który losowo zmienia prędkość; otwarcie przepustnicy
+        przekazywane jest do symulacji metodą send() generatora i wpływa na prędkość naszego pojazdu
+   - sterownik (backend):
+      * skfuzzy - ControlSystemSimulation z fuzzyLogic.py
+      * exact - analityczny silnik z fuzzyEngine.py
+      * table - tablica powierzchni sterowania z controlSurface.py (wymaga pliku --table)
+   - dla każdego taktu mierzony jest czas obliczeń oraz opóźnienie względem planowanego początku taktu;
+     takt, który nie zakończył się przed początkiem kolejnego, jest liczony jako przekroczenie terminu
+     (kolejne takty nie są pomijane - sterownik nadrabia zaległości)
+
+* Przykład użycia
+   - python tempomatStream.py --simulate 10 --rate 100 --backend exact
+   - python tempomatStream.py --csv zapis.csv --rate 200 --backend table --table surface.npy
+"""
+import argparse
+import csv
+import math
+import random
+import time
+
+
+def csv_replay(path):
+    """
+    Odtwarza próbki z pliku CSV z nagłówkiem zawierającym kolumny distance, velocity i mass.
+
+        :parameter:
+            path (str): Ścieżka pliku CSV
+
+        :returns:
+            generator: Próbki (odległość, prędkość, masa); wartości przekazane przez send() są ignorowane
+    """
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield float(row['distance']), float(row['velocity']), float(row['mass'])
+
+
+def lead_vehicle(duration, rate, mass=1.5, distance=150., velocity=90., seed=None):
+    """
+    Symuluje jazdę za pojazdem, który co kilka sekund losowo zmienia prędkość. Otwarcie przepustnicy przekazane
+    przez send() przyspiesza nasz pojazd (słabiej, im jest cięższy), a hamowanie silnikiem i opór powietrza go spowalniają.
+
+        :parameter:
+            duration (float): Czas symulacji w sekundach
+            rate (float): Częstotliwość próbek w Hz
+            mass (float): Masa naszego pojazdu w tonach
+            distance (float): Początkowa odległość od pojazdu przed nami w metrach
+            velocity (float): Początkowa prędkość obu pojazdów w km/h
+            seed (int): Ziarno generatora liczb losowych
+
+        :returns:
+            generator: Próbki (odległość, prędkość, masa)
+    """
+
+    rng = random.Random(seed)
+    dt = 1. / rate
+    lead = target = velocity
+    # co 5 sekund, ale nie rzadziej niż co próbkę - przy rate < 0.2 Hz zmiana w każdym kroku
+    change_every = max(1, round(5 * rate))
+    for step in range(int(duration * rate)):
+        if step % change_every == 0:
+            target = rng.uniform(40., 130.)
+        # pojazd przed nami zbliża się do prędkości docelowej z przyspieszeniem do 1 m/s^2
+        lead += max(-1., min(1., (target - lead) / 3.6)) * 3.6 * dt
+        throttle = yield distance, velocity, mass
+        if throttle is None:
+            throttle = 0.
+        # napęd (słabszy dla cięższych pojazdów), hamowanie silnikiem przy zamkniętej przepustnicy i opór powietrza
+        opening = throttle / 100.
+        acceleration = 4. * opening * (1.5 / mass) ** 0.5 - 0.8 * (1. - opening) - 0.0004 * (velocity / 3.6) ** 2
+        velocity = max(0., velocity + acceleration * 3.6 * dt)
+        distance = max(0., distance + (lead - velocity) / 3.6 * dt)
+
+
+def make_controller(backend, table=None):
+    """
+    Tworzy funkcję wyznaczającą otwarcie przepustnicy dla jednej próbki.
+
+        :parameter:
+            backend (str): skfuzzy, exact lub table
+            table (str): Ścieżka tablicy powierzchni sterowania (dla backend == 'table')
+
+        :returns:
+            function: Funkcja (odległość, prędkość, masa) -> otwarcie przepustnicy w procentach
+    """
+
+    if backend == 'skfuzzy':
+        from fuzzyLogic import compute, simulation
+        throttle_simulation = simulation()
+
+        def controller(distance, velocity, mass):
+            return compute(distance, velocity, mass, throttle_simulation)
+
+        return controller
+    if backend == 'exact':
+        from fuzzyEngine import tempomat
+        system = tempomat()
+        return lambda distance, velocity, mass: system.compute(distance=distance, velocity=velocity, mass=mass)
+    if backend == 'table':
+        if table is None:
+            raise ValueError('The table backend needs a control surface file')
+        from controlSurface import ControlSurface
+        return ControlSurface(table)
+    raise ValueError(f'Unknown backend: {backend}')
+
+
+def percentile(values, q):
+    """
+    Wyznacza percentyl (metoda najbliższej rangi).
+
+        :parameter:
+            values (list): Posortowane wartości
+            q (float): Percentyl 0-100
+
+        :returns:
+            float: Wartość percentyla
+    """
+
+    if not values:
+        return 0.
+    return values[max(0, math.ceil(q / 100. * len(values)) - 1)]
+
+
+def run(source, controller, rate, on_command=None):
+    """
+    Pętla sterownika: co 1/rate sekundy pobiera próbkę ze źródła, wyznacza otwarcie przepustnicy
+    i przekazuje je do źródła (send) oraz do funkcji on_command.
+
+        :parameter:
+            source (generator): Źródło próbek (odległość, prędkość, masa)
+            controller (function): Funkcja wyznaczająca otwarcie przepustnicy
+            rate (float): Częstotliwość taktów w Hz
+            on_command (function): Opcjonalna funkcja (czas taktu, próbka, przepustnica) wywoływana po każdym takcie
+
+        :returns:
+            dict: Liczba taktów, przekroczenia terminu oraz percentyle czasu obliczeń i opóźnienia w mikrosekundach
+    """
+
+    period = 1. / rate
+    compute_times = []
+    latencies = []
+    misses = 0
+    start = time.perf_counter()
+    tick = 0
+    try:
+        sample = next(source)
+        while True:
+            scheduled = start + tick * period
+            now = time.perf_counter()
+            if now < scheduled:
+                time.sleep(scheduled - now)
+            begin = time.perf_counter()
+            throttle = controller(*sample)
+            finish = time.perf_counter()
+
+            compute_times.append(finish - begin)
+            latencies.append(finish - scheduled)
+            if finish > scheduled + period:
+                misses += 1
+            if on_command is not None:
+                on_command(scheduled - start, sample, throttle)
+            tick += 1
+            sample = source.send(throttle)
+    except StopIteration:
+        pass
+
+    compute_times.sort()
+    latencies.sort()
+    report = {'ticks': tick, 'rate': rate, 'deadline_misses': misses, 'duration': time.perf_counter() - start}
+    for name, values in (('compute', compute_times), ('latency', latencies)):
+        for q in (50, 90, 99, 99.9):
+            report[f'{name}_p{q:g}_us'] = percentile(values, q) * 1e6
+        report[f'{name}_max_us'] = values[-1] * 1e6 if values else 0.
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the fuzzy cruise controller on a stream of sensor samples')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--csv', help='Replay samples from a CSV file with distance, velocity and mass columns')
+    group.add_argument('--simulate', type=float, metavar='SECONDS', help='Simulate following a lead vehicle')
+    parser.add_argument('--rate', type=float, default=100., help='Control loop frequency in Hz')
+    parser.add_argument('--backend', choices=['skfuzzy', 'exact', 'table'], default='exact')
+    parser.add_argument('--table', help='Control surface .npy file for the table backend')
+    parser.add_argument('--mass', type=float, default=1.5, help='Vehicle mass in tonnes for the simulation')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help='Write emitted throttle commands to this CSV file')
+    args = parser.parse_args()
+
+    controller = make_controller(args.backend, args.table)
+    if args.csv:
+        source = csv_replay(args.csv)
+    else:
+        source = lead_vehicle(args.simulate, args.rate, mass=args.mass, seed=args.seed)
+
+    commands = []
+    report = run(source, controller, args.rate,
+                 lambda t, sample, throttle: commands.append((t,) + tuple(sample) + (throttle,)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['time', 'distance', 'velocity', 'mass', 'throttle'])
+            writer.writerows(commands)
+
+    print(f"Takty: {report['ticks']} ({report['rate']:g} Hz), przekroczenia terminu: {report['deadline_misses']}")
+    for name, label in (('compute', 'Czas obliczeń'), ('latency', 'Opóźnienie')):
+        print(f"{label} [us]: p50 {report[name + '_p50_us']:.1f}  p90 {report[name + '_p90_us']:.1f}  "
+              f"p99 {report[name + '_p99_us']:.1f}  p99.9 {report[name + '_p99.9_us']:.1f}  "
+              f"max {report[name + '_max_us']:.1f}")
@@ -0,0 +1,245 @@
+"""
+=====================================
+ Strojenie parametrów tempomatu
+=====================================
+
+Program korzysta wyłącznie z modułów fuzzyEngine.py i tempomatStream.py - nie wymaga scikit-fuzzy.
+
+Strojenie parametrów tempomatu
+------------------------------
+
+* Opis
+   - kandydaci to kombinacje punktów załamania wybranych zbiorów (domyślnie trapmf odległości 'blisko'
+     oraz trzy trójkąty masy), pozostałe zbiory i reguły są takie jak w fuzzyLogic.py
+   - każdy kandydat steruje pojazdem w zestawie scenariuszy jazdy za pojazdem zmieniającym prędkość
+     (tempomatStream.lead_vehicle, różne masy i ziarna), obliczenia silnikiem analitycznym (fuzzyEngine)
+   - kandydaci oceniani są równolegle w puli procesów
+   - miary:
+      * płynność - średnia i maksymalna zmiana otwarcia przepustnicy między taktami
+      * bezpieczeństwo - minimalna odległość, minimalny odstęp czasowy (odległość / prędkość),
+        odsetek czasu z odstępem poniżej 1s, liczba kolizji (pierwsze osiągnięcie odległości 0)
+   - ranking według wyniku: 1000 * kolizje + 100 * odsetek czasu poniżej 1s + średnia zmiana przepustnicy
+     (mniej znaczy lepiej)
+   - analiza wrażliwości: średni wynik dla każdej wartości każdego parametru (im większy rozrzut, tym
+     większy wpływ parametru na zachowanie sterownika)
+
+* Przykład użycia
+   - python tempomatSweep.py --workers 4 --top 10 --output sweep.json
+   - python tempomatSweep.py --samples 200 --seed 1
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fuzzyEngine import tempomat
+from tempomatStream import lead_vehicle
+
+SPACE = {
+    ('distance', 'blisko'): [[0, 0, top, end] for top in (25, 50, 75, 100) for end in (150, 200, 250, 300)],
+    ('mass', 'lekki'): [[0.8, 0.8, end] for end in (1.2, 1.6, 2.0)],
+    ('mass', 'średni'): [[start, peak, end] for start in (1.0, 1.5) for peak in (2.5, 3.0) for end in (4.5, 6.0)],
+    ('mass', 'ciężki'): [[start, 40.0, 40.0] for start in (3.0, 4.5)],
+}
+
+SCENARIOS = [
+    {'name': 'osobowy', 'mass': 1.2, 'seed': 1, 'distance': 150., 'velocity': 90.},
+    {'name': 'osobowy-blisko', 'mass': 1.5, 'seed': 2, 'distance': 40., 'velocity': 110.},
+    {'name': 'dostawczy', 'mass': 3.5, 'seed': 3, 'distance': 200., 'velocity': 80.},
+    {'name': 'ciężarowy', 'mass': 30., 'seed': 4, 'distance': 120., 'velocity': 70.},
+]
+
+
+def candidates(space=SPACE, samples=None, seed=None):
+    """
+    Generuje kandydatów - wszystkie kombinacje wartości parametrów lub losową ich próbkę.
+
+        :parameter:
+            space (dict): Możliwe punkty załamania - klucze (nazwa zmiennej, nazwa zbioru)
+            samples (int): Liczba losowanych kandydatów, domyślnie None (wszystkie kombinacje)
+            seed (int): Ziarno generatora liczb losowych
+
+        :returns:
+            list: Kandydaci - słowniki (nazwa zmiennej, nazwa zbioru) -> punkty załamania
+    """
+
+    keys = list(space)
+    found = [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    if samples is not None and samples < len(found):
+        found = random.Random(seed).sample(found, samples)
+    return found
+
+
+def simulate(system, scenario, duration, rate):
+    """
+    Przeprowadza jeden scenariusz w pętli zamkniętej i wyznacza miary płynności i bezpieczeństwa.
+
+        :parameter:
+            system (MamdaniSystem): Sterownik
+            scenario (dict): Scenariusz - masa, ziarno, początkowa odległość i prędkość
+            duration (float): Czas symulacji w sekundach
+            rate (float): Częstotliwość sterowania w Hz
+
+        :returns:
+            dict: Miary scenariusza - min_distance i min_headway wynoszą None, gdy brak próbek (odstęp liczony
+                  jest tylko przy prędkości większej od 0), dzięki czemu wyniki można zapisać jako poprawny JSON
+    """
+
+    source = lead_vehicle(duration, rate, mass=scenario['mass'], distance=scenario['distance'],
+                          velocity=scenario['velocity'], seed=scenario['seed'])
+    changes = []
+    headways = []
+    min_distance = float('infinity')
+    collisions = 0
+    previous = None
+    try:
+        distance, velocity, mass = next(source)
+        while True:
+            throttle = system.compute(distance=distance, velocity=velocity, mass=mass) or 0.
+            if previous is not None:
+                changes.append(abs(throttle - previous))
+            previous = throttle
+            if distance <= 0 < min_distance:
+                collisions += 1
+            min_distance = min(min_distance, distance)
+            if velocity > 0:
+                headways.append(distance / (velocity / 3.6))
+            distance, velocity, mass = source.send(throttle)
+    except StopIteration:
+        pass
+
+    return {
+        'mean_change': sum(changes) / len(changes) if changes else 0.,
+        'max_change': max(changes, default=0.),
+        'min_distance': min_distance if min_distance < float('infinity') else None,
+        'min_headway': min(headways) if headways else None,
+        'close_fraction': sum(1 for headway in headways if headway < 1.) / len(headways) if headways else 0.,
+        'collisions': collisions,
+    }
+
+
+def worst(values):
+    """
+    Najmniejsza wartość miary po scenariuszach, z pominięciem scenariuszy bez próbek (None).
+
+        :parameter:
+            values (iterable): Wartości miary
+
+        :returns:
+            float: Najmniejsza wartość lub None, gdy żaden scenariusz nie ma próbek
+    """
+
+    return min((value for value in values if value is not None), default=None)
+
+
+def evaluate(candidate, scenarios=SCENARIOS, duration=30., rate=10.):
+    """
+    Ocenia kandydata na wszystkich scenariuszach (funkcja wykonywana w procesie roboczym).
+
+        :parameter:
+            candidate (dict): Punkty załamania zbiorów - klucze (nazwa zmiennej, nazwa zbioru)
+            scenarios (list): Scenariusze
+            duration (float): Czas każdego scenariusza w sekundach
+            rate (float): Częstotliwość sterowania w Hz
+
+        :returns:
+            dict: Miary uśrednione (płynność, odsetek czasu poniżej 1s) lub najgorsze (odległość, odstęp,
+                  kolizje) po scenariuszach oraz wynik score
+    """
+
+    system = tempomat(candidate)
+    results = [simulate(system, scenario, duration, rate) for scenario in scenarios]
+    metrics = {
+        'mean_change': sum(result['mean_change'] for result in results) / len(results),
+        'max_change': max(result['max_change'] for result in results),
+        'min_distance': worst(result['min_distance'] for result in results),
+        'min_headway': worst(result['min_headway'] for result in results),
+        'close_fraction': sum(result['close_fraction'] for result in results) / len(results),
+        'collisions': sum(result['collisions'] for result in results),
+    }
+    metrics['score'] = 1000 * metrics['collisions'] + 100 * metrics['close_fraction'] + metrics['mean_change']
+    return metrics
+
+
+def sweep(space=SPACE, scenarios=SCENARIOS, samples=None, seed=None, workers=None, duration=30., rate=10.):
+    """
+    Ocenia kandydatów w puli procesów i sortuje ich według wyniku.
+
+        :parameter:
+            space (dict): Możliwe punkty załamania zbiorów
+            scenarios (list): Scenariusze
+            samples (int): Liczba losowanych kandydatów (None - wszystkie kombinacje)
+            seed (int): Ziarno losowania kandydatów
+            workers (int): Liczba procesów, domyślnie liczba rdzeni
+            duration (float): Czas każdego scenariusza w sekundach
+            rate (float): Częstotliwość sterowania w Hz
+
+        :returns:
+            list: Pary (kandydat, miary) posortowane od najlepszego
+    """
+
+    found = candidates(space, samples, seed)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        metrics = executor.map(evaluate, found, itertools.repeat(scenarios), itertools.repeat(duration),
+                               itertools.repeat(rate), chunksize=max(1, len(found) // 64))
+        ranked = list(zip(found, metrics))
+    ranked.sort(key=lambda item: item[1]['score'])
+    return ranked
+
+
+def sensitivity(ranked):
+    """
+    Analiza wrażliwości - średni wynik dla każdej wartości każdego parametru.
+
+        :parameter:
+            ranked (list): Pary (kandydat, miary)
+
+        :returns:
+            dict: (nazwa zmiennej, nazwa zbioru) -> lista par (punkty załamania, średni wynik), od najlepszej
+    """
+
+    found = {}
+    for candidate, metrics in ranked:
+        for key, points in candidate.items():
+            scores = found.setdefault(key, {}).setdefault(tuple(points), [])
+            scores.append(metrics['score'])
+    return {key: sorted(((list(points), sum(scores) / len(scores)) for points, scores in values.items()),
+                        key=lambda item: item[1])
+            for key, values in found.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sweep membership function breakpoints of the fuzzy tempomat')
+    parser.add_argument('--samples', type=int, help='Evaluate a random sample of candidates instead of all')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for candidate sampling')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--duration', type=float, default=30., help='Simulated seconds per scenario')
+    parser.add_argument('--rate', type=float, default=10., help='Control frequency of the simulation in Hz')
+    parser.add_argument('--top', type=int, default=10, help='Number of best candidates to print')
+    parser.add_argument('--output', help='Write the full ranking to this JSON file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ranked = sweep(samples=args.samples, seed=args.seed, workers=args.workers, duration=args.duration,
+                   rate=args.rate)
+    print(f"Ocenionych kandydatów: {len(ranked)} w {time.perf_counter() - start:.1f}s")
+
+    for place, (candidate, metrics) in enumerate(ranked[:args.top], 1):
+        headway = '  brak' if metrics['min_headway'] is None else f"{metrics['min_headway']:5.2f}s"
+        print(f"{place:3d}. wynik {metrics['score']:8.3f}  kolizje {metrics['collisions']}  "
+              f"poniżej 1s {100 * metrics['close_fraction']:5.1f}%  min. odstęp {headway}  "
+              f"zmiana przepustnicy {metrics['mean_change']:.3f} (max {metrics['max_change']:.2f})")
+        print('      ' + ', '.join(f'{name}[{term}]={points}' for (name, term), points in candidate.items()))
+
+    print('Wrażliwość (średni wynik dla wartości parametru):')
+    for (name, term), values in sensitivity(ranked).items():
+        spread = values[-1][1] - values[0][1]
+        print(f"  {name}[{term}]: rozrzut {spread:.3f}, najlepsze {values[0][0]} ({values[0][1]:.3f})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([{'terms': [{'variable': name, 'term': term, 'points': points}
+                                  for (name, term), points in candidate.items()],
+                        'metrics': metrics} for candidate, metrics in ranked], f, indent=2, allow_nan=False)
@@ -0,0 +1,222 @@
+"""
+Model czynników ukrytych (ALS) do rekomendacji filmów
+
+Autor:
+Kacper Stankiewicz
+
+Macierz ocen przybliżana jest iloczynem macierzy czynników użytkowników U i filmów V (rank kolumn):
+ocena ~ średnia + U[u] . V[m]. Uczenie metodą naprzemiennych najmniejszych kwadratów (ALS) - na przemian, przy
+ustalonym V, każdy wiersz U jest rozwiązaniem regresji grzbietowej na ocenionych przez użytkownika filmach
+(i odwrotnie). Układy równań porcji użytkowników budowane są jednym iloczynem macierzy (maska ocen porcji razy
+iloczyny zewnętrzne czynników) i rozwiązywane jednym wywołaniem np.linalg.solve dla całej porcji wierszy - oceny
+przechowywane są w formacie CSR, a macierz gęsta budowana jest tylko dla bieżącej porcji. Porcje
+mogą być liczone w kilku wątkach - numpy zwalnia GIL na czas obliczeń.
+
+Zapytanie o rekomendacje to jeden iloczyn macierzy V i wektora czynników użytkownika, czyli koszt
+O(liczba filmów x rank), niezależny od liczby użytkowników (w przeciwieństwie do metod opartych o sąsiadów).
+Czynniki zapisywane są do pliku .npz razem z wersją pliku ocen, z którego uczono model (ratingsVersion) - model
+wczytany przez movieRecommendation.py --factors jest uczony od nowa, gdy plik ocen się zmienił.
+
+Przykładowe wywołanie (uczenie modelu):
+ python .\\factorModel.py --ratings ./data/ratings.json --output ./data/factors.npz --rank 10 --workers 4
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from movieRecommendation import denseRows, loadRatingMatrix
+from ratingsStore import ratingsVersion, readRatings
+
+
+def solveFactors(sparse, columnCount, mean, factors, regularization, workers=1, chunkSize=1024):
+    """
+    Funkcja wyznaczająca czynniki jednej strony (wierszy macierzy sparse) przy ustalonych czynnikach drugiej
+    strony - regresja grzbietowa na ocenionych pozycjach, z karą proporcjonalną do liczby ocen w wierszu. Macierz
+    gęsta budowana jest tylko dla porcji chunkSize wierszy
+    :param sparse (SparseRatings): oceny w formacie CSR (wiersze x kolumny)
+    :param columnCount (int): liczba kolumn
+    :param mean (float): średnia ocena odejmowana od ocen
+    :param factors (ndarray): czynniki kolumn, kolumny x rank
+    :param regularization (float): współczynnik regularyzacji
+    :param workers (int): liczba wątków
+    :param chunkSize (int): liczba wierszy rozwiązywanych jednym wywołaniem np.linalg.solve
+    :return: (ndarray) czynniki wierszy, wiersze x rank
+    """
+    rank = factors.shape[1]
+    # iloczyny zewnętrzne czynników kolumn - macierz układu wiersza to suma po jego ocenionych kolumnach
+    outer = (factors[:, :, None] * factors[:, None, :]).reshape(len(factors), rank * rank)
+    identity = np.eye(rank)
+    rowCount = len(sparse.indptr) - 1
+
+    def solveChunk(start):
+        ratings, mask = denseRows(sparse, np.arange(start, min(start + chunkSize, rowCount)), columnCount)
+        known = mask.astype(np.float64)
+        residuals = np.where(mask, ratings - mean, 0.)
+        systems = (known @ outer).reshape(-1, rank, rank)
+        counts = np.maximum(known.sum(axis=1), 1)
+        systems += regularization * counts[:, None, None] * identity
+        return np.linalg.solve(systems, (residuals @ factors)[:, :, None])[:, :, 0]
+
+    starts = range(0, rowCount, chunkSize)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return np.concatenate(list(executor.map(solveChunk, starts)))
+    return np.concatenate([solveChunk(start) for start in starts])
+
+
+def largest(values, n):
+    """
+    Funkcja wybierająca n największych wartości w czasie liniowym (np.partition) - sortowane jest tylko n wybranych;
+    przy remisie wyżej jest wartość o mniejszym indeksie, tak jak przy sortowaniu stabilnym
+    :param values (ndarray): wartości
+    :param n (int): liczba wybieranych wartości (0 - len(values))
+    :return: (ndarray) indeksy n największych wartości, od największej
+    """
+    if not 0 <= n <= len(values):
+        raise ValueError('n must be between 0 and ' + str(len(values)))
+    if n == 0:
+        return np.array([], dtype=np.int64)
+    threshold = np.partition(values, len(values) - n)[len(values) - n]
+    above = np.flatnonzero(values > threshold)
+    chosen = np.concatenate([above, np.flatnonzero(values == threshold)[:n - len(above)]])
+    return chosen[np.lexsort((chosen, -values[chosen]))]
+
+
+class FactorModel:
+    """
+    Czynniki ukryte użytkowników i filmów wraz z listą filmów ocenionych przez każdego użytkownika (CSR)
+    """
+
+    def __init__(self, users, movies, userFactors, movieFactors, mean, seenIndptr, seenIndices, version=None):
+        """
+        Konstruktor - zwykle wywoływany przez train lub load
+        :param users (list): imiona i nazwiska użytkowników
+        :param movies (list): tytuły filmów
+        :param userFactors (ndarray): czynniki użytkowników, użytkownicy x rank
+        :param movieFactors (ndarray): czynniki filmów, filmy x rank
+        :param mean (float): średnia ocena
+        :param seenIndptr (ndarray): początki wierszy listy filmów ocenionych przez użytkowników
+        :param seenIndices (ndarray): indeksy filmów ocenionych przez użytkowników
+        :param version (tuple): wersja pliku ocen, z którego uczono model (ratingsVersion)
+        """
+        self.users = list(users)
+        self.movies = list(movies)
+        self.userIndex = {user: i for i, user in enumerate(self.users)}
+        self.userFactors = userFactors
+        self.movieFactors = movieFactors
+        self.mean = float(mean)
+        self.seenIndptr = seenIndptr
+        self.seenIndices = seenIndices
+        self.version = version
+
+    @classmethod
+    def train(cls, dataset, rank=10, regularization=0.1, iterations=15, workers=1, seed=None, onIteration=None,
+              version=None):
+        """
+        Funkcja ucząca model metodą ALS
+        :param dataset (dictionary lub RatingsStore): oceny filmów wszystkich osób
+        :param rank (int): liczba czynników ukrytych
+        :param regularization (float): współczynnik regularyzacji
+        :param iterations (int): liczba iteracji (każda wyznacza czynniki użytkowników i filmów)
+        :param workers (int): liczba wątków rozwiązujących układy równań
+        :param seed (int): ziarno losowych czynników początkowych
+        :param onIteration: opcjonalna funkcja (numer iteracji, błąd RMSE na ocenach uczących)
+        :param version (tuple): wersja pliku ocen (ratingsVersion), zapisywana w modelu
+        :return: (FactorModel) wyuczony model
+        """
+        matrix = loadRatingMatrix(dataset)
+        users, movies = matrix.sparse, matrix.columns
+        mean = float(users.data.mean()) if len(users.data) else 0.
+
+        rng = np.random.default_rng(seed)
+        userFactors = rng.normal(0., 0.1, (len(matrix.users), rank))
+        movieFactors = rng.normal(0., 0.1, (len(matrix.movies), rank))
+        for iteration in range(iterations):
+            userFactors = solveFactors(users, len(matrix.movies), mean, movieFactors, regularization, workers)
+            movieFactors = solveFactors(movies, len(matrix.users), mean, userFactors, regularization, workers)
+            if onIteration is not None:
+                rows = np.repeat(np.arange(len(matrix.users)), np.diff(users.indptr))
+                error = np.einsum('ij,ij->i', userFactors[rows], movieFactors[users.indices]) - (users.data - mean)
+                onIteration(iteration + 1, float(np.sqrt(np.mean(np.square(error)))))
+
+        return cls(matrix.users, matrix.movies, userFactors, movieFactors, mean, np.array(users.indptr),
+                   np.array(users.indices, dtype=np.int32), version)
+
+    def predictRatings(self, targetUser):
+        """
+        Funkcja przewidująca oceny wszystkich filmów - jeden iloczyn macierzy czynników filmów i wektora użytkownika
+        :param targetUser (str): imię i nazwisko użytkownika
+        :return: (ndarray) przewidywane oceny w kolejności self.movies (NaN dla filmów już ocenionych)
+        """
+        if targetUser not in self.userIndex:
+            raise TypeError('Cannot find ' + targetUser + ' in the dataset')
+        row = self.userIndex[targetUser]
+        predicted = self.movieFactors @ self.userFactors[row] + self.mean
+        predicted[self.seenIndices[self.seenIndptr[row]:self.seenIndptr[row + 1]]] = np.nan
+        return predicted
+
+    def recommend(self, targetUser, n=5):
+        """
+        Funkcja wybierająca filmy o najwyższej i najniższej przewidywanej ocenie
+        :param targetUser (str): imię i nazwisko użytkownika dla którego chcemy poznać rekomendacje
+        :param n (int): liczba filmów polecanych i niepolecanych (co najmniej 0)
+        :return: (tuple) n tytułów filmowych polecanych i n niepolecanych
+        """
+        if n < 0:
+            raise ValueError('n must not be negative')
+        predicted = self.predictRatings(targetUser)
+        candidates = np.flatnonzero(~np.isnan(predicted))
+        n = min(n, len(candidates))
+        if n == 0:
+            return [], []
+        values = predicted[candidates]
+        best = candidates[largest(values, n)]
+        worst = candidates[largest(-values, n)]
+        return [self.movies[i] for i in best], [self.movies[i] for i in worst]
+
+    def save(self, path):
+        """
+        Funkcja zapisująca model do pliku .npz (pod podaną ścieżką, bez dopisywania rozszerzenia)
+        :param path (str): ścieżka pliku
+        :return: void
+        """
+        version = {} if self.version is None else {'version': np.array(self.version, dtype=np.int64)}
+        with open(path, 'wb') as f:
+            np.savez(f, users=np.array(self.users), movies=np.array(self.movies), userFactors=self.userFactors,
+                     movieFactors=self.movieFactors, mean=self.mean, seenIndptr=self.seenIndptr,
+                     seenIndices=self.seenIndices, **version)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Funkcja wczytująca model z pliku .npz
+        :param path (str): ścieżka pliku
+        :return: (FactorModel) model
+        """
+        with np.load(path) as f:
+            return cls(f['users'].tolist(), f['movies'].tolist(), f['userFactors'], f['movieFactors'],
+                       f['mean'], f['seenIndptr'], f['seenIndices'],
+                       tuple(f['version'].tolist()) if 'version' in f.files else None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train an alternating least squares latent factor model')
+    parser.add_argument('--ratings', default='./data/ratings.json',
+                        help='Ratings JSON file or binary ratings store')
+    parser.add_argument('--output', default='./data/factors.npz', help='Factor model file')
+    parser.add_argument('--rank', type=int, default=10, help='Number of latent factors')
+    parser.add_argument('--regularization', type=float, default=0.1, help='Ridge regularization strength')
+    parser.add_argument('--iterations', type=int, default=15, help='Number of ALS iterations')
+    parser.add_argument('--workers', type=int, default=1, help='Threads used to solve the least squares systems')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for the initial factors')
+    args = parser.parse_args()
+
+    model = FactorModel.train(readRatings(args.ratings), args.rank, args.regularization, args.iterations,
+                              args.workers, args.seed,
+                              lambda iteration, rmse: print(f"Iteracja {iteration}: RMSE {rmse:.4f}"),
+                              ratingsVersion(args.ratings))
+    model.save(args.output)
+    print(f"Zapisano czynniki {len(model.users)} użytkowników i {len(model.movies)} filmów "
+          f"(rank = {model.userFactors.shape[1]}) do {args.output}")
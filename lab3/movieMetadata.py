@@ -0,0 +1,167 @@
+"""
+Opisy filmów z The Movie DB z lokalną pamięcią podręczną
+
+Autor:
+Kacper Stankiewicz
+
+Opisy filmów pobierane są z API TMDB (klucz w zmiennej środowiskowej TMDB_SECRET) i zapisywane w bazie SQLite,
+w której kluczem jest znormalizowany tytuł (bez polskich znaków, małymi literami, z pojedynczymi spacjami).
+Wpisy starsze niż zadany czas życia (ttl) są usuwane i pobierane ponownie. Zapamiętywane są także tytuły, których
+TMDB nie zna, aby nie odpytywać o nie API przy każdym uruchomieniu. Nieudane pobrania (błąd sieci lub API) także
+są zapamiętywane, ale tylko na krótki czas (failureTtl, domyślnie 10 minut) - przy niedostępnym API kolejne
+uruchomienia nie czekają ponownie na każdy tytuł, a po tym czasie opis jest pobierany znowu.
+
+Tytuły, których nie ma w pamięci podręcznej, pobierane są równolegle w puli wątków o ograniczonej liczbie wątków.
+W trybie offline API nie jest odpytywane - brakujące opisy zastępowane są samym tytułem z pliku ocen (tak samo
+traktowane są filmy, których nie udało się pobrać z powodu błędu sieci).
+"""
+
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from unidecode import unidecode
+
+DAY = 24 * 60 * 60
+MINUTE = 60
+
+# wartość kolumny found dla nieudanego pobrania (1 - film znaleziony, 0 - film nieznany w TMDB)
+FAILED = -1
+
+
+def normalizeTitle(title):
+    """
+    Funkcja normalizująca tytuł filmu do postaci klucza pamięci podręcznej
+    :param title (str): tytuł filmu
+    :return: (str) tytuł bez polskich znaków, małymi literami, z pojedynczymi spacjami
+    """
+    return re.sub(r'\s+', ' ', unidecode(title)).strip().lower()
+
+
+def fetchMovie(title):
+    """
+    Funkcja wyszukująca film w TMDB (tak jak printMovies - pierwszy wynik wyszukiwania)
+    :param title (str): tytuł filmu
+    :return: (tuple) oryginalny tytuł i opis filmu lub None, gdy film nie został znaleziony
+    """
+    from tmdbv3api import Movie, TMDb
+
+    tmdb = TMDb()
+    tmdb.api_key = os.environ.get('TMDB_SECRET')
+    m = Movie().search(unidecode(title))
+    if len(m['results']) > 0:
+        return m[0].title, m[0].overview
+    return None
+
+
+class MetadataCache:
+    """
+    Pamięć podręczna opisów filmów w bazie SQLite, z usuwaniem wpisów starszych niż ttl sekund (nieudanych pobrań -
+    starszych niż failureTtl sekund)
+    """
+
+    def __init__(self, path, ttl=30 * DAY, failureTtl=10 * MINUTE):
+        """
+        Konstruktor - otwiera (lub tworzy) bazę
+        :param path (str): ścieżka pliku bazy (':memory:' - baza w pamięci)
+        :param ttl (float): czas życia wpisu w sekundach
+        :param failureTtl (float): czas życia wpisu o nieudanym pobraniu w sekundach
+        """
+        self.ttl = ttl
+        self.failureTtl = failureTtl
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS movies ('
+                                'key TEXT PRIMARY KEY, title TEXT, overview TEXT, found INTEGER, fetched REAL)')
+        self.connection.commit()
+
+    def evictExpired(self, now=None):
+        """
+        Funkcja usuwająca wpisy starsze niż ttl oraz nieudane pobrania starsze niż failureTtl
+        :param now (float): bieżący czas (time.time())
+        :return: (int) liczba usuniętych wpisów
+        """
+        now = time.time() if now is None else now
+        removed = self.connection.execute('DELETE FROM movies WHERE fetched < ? OR (found = ? AND fetched < ?)',
+                                          (now - self.ttl, FAILED, now - self.failureTtl)).rowcount
+        self.connection.commit()
+        return removed
+
+    def get(self, titles):
+        """
+        Funkcja odczytująca z bazy opisy podanych filmów
+        :param titles (list): tytuły filmów
+        :return: (dictionary) tytuł -> (oryginalny tytuł, opis), None (film nieznany w TMDB) lub (tytuł, '')
+                 (niedawne nieudane pobranie); brak klucza oznacza, że filmu nie ma w pamięci podręcznej
+        """
+        found = {}
+        query = ('SELECT title, overview, found FROM movies '
+                 'WHERE key = ? AND fetched >= ? AND (found != ? OR fetched >= ?)')
+        now = time.time()
+        limits = (now - self.ttl, FAILED, now - self.failureTtl)
+        for title in titles:
+            row = self.connection.execute(query, (normalizeTitle(title), *limits)).fetchone()
+            if row is None:
+                continue
+            if row[2] == FAILED:
+                found[title] = (title, '')
+            else:
+                found[title] = (row[0], row[1]) if row[2] else None
+        return found
+
+    def put(self, entries, failed=()):
+        """
+        Funkcja zapisująca opisy filmów
+        :param entries (dictionary): tytuł -> (oryginalny tytuł, opis) lub None (film nieznany w TMDB)
+        :param failed (iterable): tytuły, których nie udało się pobrać (zapamiętywane na failureTtl sekund)
+        :return: void
+        """
+        now = time.time()
+        rows = [(normalizeTitle(title), *(entry if entry is not None else (None, None)), entry is not None, now)
+                for title, entry in entries.items()]
+        rows += [(normalizeTitle(title), None, None, FAILED, now) for title in failed]
+        self.connection.executemany('INSERT OR REPLACE INTO movies VALUES (?, ?, ?, ?, ?)', rows)
+        self.connection.commit()
+
+    def close(self):
+        """
+        Funkcja zamykająca połączenie z bazą
+        :return: void
+        """
+        self.connection.close()
+
+
+def getMetadata(titles, cache=None, workers=8, offline=False, fetch=fetchMovie):
+    """
+    Funkcja zwracająca opisy filmów - z pamięci podręcznej, a brakujące pobiera równolegle z TMDB
+    (lub w trybie offline zastępuje samym tytułem)
+    :param titles (list): tytuły filmów
+    :param cache (MetadataCache): pamięć podręczna, None - bez pamięci podręcznej
+    :param workers (int): maksymalna liczba wątków pobierających opisy
+    :param offline (bool): tryb offline - bez zapytań do API
+    :param fetch: funkcja pobierająca opis jednego filmu (fetchMovie)
+    :return: (dictionary) tytuł -> (oryginalny tytuł, opis) lub None, gdy film nie został znaleziony
+    """
+    unique = list(dict.fromkeys(titles))
+    found = cache.get(unique) if cache is not None else {}
+    missing = [title for title in unique if title not in found]
+
+    if missing and offline:
+        found.update({title: (title, '') for title in missing})
+    elif missing:
+        def safeFetch(title):
+            try:
+                return fetch(title)
+            except Exception as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing)))) as executor:
+            fetched = dict(zip(missing, executor.map(safeFetch, missing)))
+        # błędy sieci zapamiętywane są tylko na failureTtl - film zastępowany jest tytułem jak w trybie offline
+        failed = {title for title, entry in fetched.items() if isinstance(entry, Exception)}
+        if cache is not None:
+            cache.put({title: entry for title, entry in fetched.items() if title not in failed}, failed)
+        found.update(fetched)
+        found.update({title: (title, '') for title in failed})
+    return {title: found[title] for title in unique}
@@ -20,20 +20,56 @@ Jego wartość umieścić w zmiennej środowiskowej o nazwie TMDB_SECRET
 
 Silnik uruchamiamy poprzez wywołanie komendy w konsoli z parametrami:
 - target : imie i nazwisko użytkownika dla którego chcemy uzyskac rekomendacje
-- score-type : metryka podobieństwa która ma być użyta [Euclidean,Pearson]
+- score-type : metryka podobieństwa która ma być użyta [Euclidean,Pearson] lub ALS - model czynników ukrytych
+  (factorModel.py), który przewiduje oceny bez szukania sąsiadów (method, neighbours i index są wtedy pomijane)
+- ratings (opcjonalny) : plik ocen - ratings.json lub plik binarny z ratingsStore.py, otwierany przez np.memmap
+  (domyślnie ./data/ratings.json)
+- count (opcjonalny) : liczba filmów polecanych i niepolecanych (domyślnie 5)
+- method (opcjonalny) : weighted - przewidywana ocena filmu to średnia ocen najbardziej podobnych użytkowników
+  ważona podobieństwem (domyślnie; dla metryki Pearson - użytkowników o największej dodatniej korelacji r, ważona
+  przez r), greedy - ulubione filmy najbliższych sąsiadów
+- neighbours (opcjonalny) : liczba sąsiadów uwzględnianych przez metodę weighted (domyślnie 10)
+- cache (opcjonalny) : plik SQLite z opisami filmów (domyślnie ./data/metadata.sqlite)
+- cache-ttl (opcjonalny) : liczba dni, po których opis jest pobierany ponownie (domyślnie 30)
+- offline (opcjonalny) : bez zapytań do TMDB - opisy tylko z pamięci podręcznej
+- factors (opcjonalny) : plik modelu ALS, uczonego i zapisywanego przy pierwszym użyciu i uczonego od nowa, gdy plik
+  ocen zmienił się od jego zapisania (bez pliku - uczony przy każdym uruchomieniu)
+- index (opcjonalny) : plik indeksu najbliższych sąsiadów (similarityIndex.py), budowany przy pierwszym użyciu
+  i przebudowywany, gdy plik ocen zmienił się od jego zbudowania
+- ann (opcjonalny) : plik przybliżonego indeksu sąsiadów LSH (lshIndex.py), budowany przy pierwszym użyciu - tylko
+  neighbours sąsiadów, bez porównywania z każdym użytkownikiem; przebudowywany, gdy plik ocen zmienił się od jego
+  zbudowania lub gdy podane tables / bits różnią się od zapisanych w indeksie
+- tables, bits (opcjonalne) : liczba tablic i hiperpłaszczyzn w tablicy indeksu ann (domyślnie 8 i 4)
+
+Tryb wsadowy (zamiast target) - rekomendacje dla wielu użytkowników w jednym przebiegu, zapisywane jako JSON lines
+(jeden wiersz {"user", "recommendations", "antiRecommendations"} na użytkownika, bez opisów z TMDB):
+- all : wszyscy użytkownicy z pliku ocen
+- users : plik z listą użytkowników (jeden w wierszu)
+- output (opcjonalny) : plik wynikowy (domyślnie standardowe wyjście)
+- workers (opcjonalny) : liczba procesów (domyślnie liczba rdzeni)
+Tryb wsadowy liczy dokładne współczynniki podobieństwa porcjami użytkowników w procesach roboczych (każdy wczytuje
+plik ocen raz), więc nie łączy się z opcjami index i ann.
 
 Przykładowe wywołanie:
  python .\movieRecommendation.py --target 'Paweł Czapiewski' --score-type 'Pearson'
+ python .\movieRecommendation.py --target 'Paweł Czapiewski' --score-type 'Pearson' --index ./data/index.npz
+ python .\movieRecommendation.py --target 'Paweł Czapiewski' --score-type 'ALS' --factors ./data/factors.npz
+ python .\movieRecommendation.py --all --score-type 'Pearson' --output ./data/recommendations.jsonl
 
 """
 
 import argparse
+import heapq
 import json
-import numpy as np
-from tmdbv3api import TMDb
-from tmdbv3api import Movie
 import os
-from unidecode import unidecode
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from movieMetadata import DAY, MetadataCache, getMetadata
+from ratingsStore import RatingsStore, ratingsVersion, readRatings
 
 
 def argsParser():
@@ -41,15 +77,62 @@ def argsParser():
     Funkcja służąca do zadeklarowania wymaganych argumentów, oraz
     wyciągania wartości z tych argumentów podanych na wejściu przez użytkownika
 
-    Zdefiniowane są 2 argumenty:
-        - targetUser
-        - scoreType
+    Zdefiniowane są 18 argumentów:
+        - targetUser lub all / users (tryb wsadowy - wszyscy użytkownicy lub lista z pliku)
+        - scoreType - Euclidean, Pearson lub ALS (model czynników ukrytych, factorModel.py)
+        - ratings (opcjonalny) - plik ocen JSON lub plik binarny (ratingsStore.py), domyślnie ./data/ratings.json
+        - count (opcjonalny) - liczba filmów polecanych i niepolecanych, domyślnie 5
+        - method (opcjonalny) - weighted (przewidywanie ocen) lub greedy (ulubione filmy najbliższych sąsiadów)
+        - neighbours (opcjonalny) - liczba sąsiadów uwzględnianych przez metodę weighted, domyślnie 10
+        - cache, cacheTtl, offline (opcjonalne) - pamięć podręczna opisów filmów (movieMetadata.py)
+        - index (opcjonalny) - plik indeksu sąsiadów (similarityIndex.py); gdy nie istnieje lub zbudowano go
+          z innej wersji pliku ocen, zostanie zbudowany
+        - factors (opcjonalny) - plik modelu ALS; gdy nie istnieje lub uczono go na innej wersji pliku ocen, model
+          zostanie wyuczony i zapisany
+        - ann (opcjonalny) - plik przybliżonego indeksu sąsiadów (lshIndex.py); gdy nie istnieje, zbudowano go
+          z innej wersji pliku ocen lub z innymi tables / bits, zostanie zbudowany
+        - tables, bits (opcjonalne) - parametry budowy indeksu ann, domyślnie zapisane w indeksie lub 8 i 4
+        - output, workers (opcjonalne) - plik wynikowy JSONL i liczba procesów trybu wsadowego
     """
     parser = argparse.ArgumentParser(description='Compute similarity score')
-    parser.add_argument('--target', dest='targetUser', required=True,
-                        help='Target user')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--target', dest='targetUser',
+                       help='Target user')
+    group.add_argument('--all', dest='all', action='store_true',
+                       help='Batch mode: recommendations for every user, written as JSON lines')
+    group.add_argument('--users', dest='users',
+                       help='Batch mode: recommendations for users listed in this file (one per line)')
+    parser.add_argument('--ratings', dest='ratings', default='./data/ratings.json',
+                        help='Ratings JSON file or binary ratings store (ratingsStore.py)')
     parser.add_argument("--score-type", dest="scoreType", required=True,
-                        choices=['Euclidean', 'Pearson'], help='Similarity metric to be used')
+                        choices=['Euclidean', 'Pearson', 'ALS'],
+                        help='Similarity metric to be used, or ALS for the latent factor model')
+    parser.add_argument('--count', dest='count', type=int, default=5,
+                        help='Number of recommended and not recommended movies')
+    parser.add_argument('--method', dest='method', choices=['weighted', 'greedy'], default='weighted',
+                        help='Similarity-weighted rating prediction or favourite movies of the nearest neighbours')
+    parser.add_argument('--neighbours', dest='neighbours', type=int, default=10,
+                        help='Number of neighbours used by the weighted method')
+    parser.add_argument('--cache', dest='cache', default='./data/metadata.sqlite',
+                        help='SQLite cache of movie descriptions')
+    parser.add_argument('--cache-ttl', dest='cacheTtl', type=float, default=30,
+                        help='Days after which cached descriptions are fetched again')
+    parser.add_argument('--offline', dest='offline', action='store_true',
+                        help='Do not query TMDB, use cached descriptions only')
+    parser.add_argument('--ann', dest='ann',
+                        help='Find approximate neighbours with this LSH index file (built if missing or out of date)')
+    parser.add_argument('--tables', dest='tables', type=int, default=None,
+                        help='Hash tables of the LSH index (default: as stored in the index, 8 for a new one)')
+    parser.add_argument('--bits', dest='bits', type=int, default=None,
+                        help='Hyperplanes per LSH table, fewer - higher recall (default: as stored, 4 for a new one)')
+    parser.add_argument('--output', dest='output', default='-',
+                        help='Batch mode: JSON lines output file (default: standard output)')
+    parser.add_argument('--workers', dest='workers', type=int, default=None,
+                        help='Batch mode: number of worker processes (default: CPU count)')
+    parser.add_argument('--factors', dest='factors',
+                        help='Read the ALS factor model from this file (trained and saved if missing)')
+    parser.add_argument('--index', dest='index',
+                        help='Read neighbours from this similarity index file (built if missing or out of date)')
     return parser
 
 
@@ -134,81 +217,571 @@ def calculateScores(dataset, targetUser, correlation_method):
     return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
 
-def getRecommendations(dataset, scores, targetUser):
+SparseRatings = namedtuple('SparseRatings', ['indptr', 'indices', 'data'])
+
+RatingMatrix = namedtuple('RatingMatrix', ['users', 'movies', 'userIndex', 'movieIndex', 'sparse', 'columns'])
+
+
+def loadRatingMatrix(dataset):
     """
-    Funkcja wybierająca filmy na podstawie ocen najlepiej dopasowanych użytkowników do celu (osoby)
+    Funkcja zamieniająca słownik ocen na macierz rzadką użytkownik x film (CSR) wraz z jej transpozycją - macierz
+    gęsta (użytkownicy x filmy) nie jest budowana
+    :param dataset (dictionary lub RatingsStore): oceny filmów wszystkich osób
+    :return: (RatingMatrix) listy użytkowników i filmów, słowniki nazwa -> indeks, oceny w wierszach użytkowników
+             (sparse) oraz w wierszach filmów (columns)
+    """
+    if isinstance(dataset, RatingsStore):
+        # tablice CSR z pliku (np.memmap) używane są bez kopiowania i bez budowania słowników ocen
+        sparse = SparseRatings(dataset.indptr, dataset.indices, dataset.data)
+        return RatingMatrix(dataset.users, dataset.movies, dataset.userIndex, dataset.movieIndex, sparse,
+                            transpose(sparse, len(dataset.movies)))
+
+    users = list(dataset)
+    movies = list(dict.fromkeys(movie for user in users for movie in dataset[user]))
+    userIndex = {user: i for i, user in enumerate(users)}
+    movieIndex = {movie: i for i, movie in enumerate(movies)}
+
+    indptr = np.zeros(len(users) + 1, dtype=np.int64)
+    np.cumsum([len(dataset[user]) for user in users], out=indptr[1:])
+    indices = np.fromiter((movieIndex[movie] for user in users for movie in dataset[user]),
+                          dtype=np.int32, count=int(indptr[-1]))
+    data = np.fromiter((rating for user in users for rating in dataset[user].values()),
+                       dtype=np.float64, count=int(indptr[-1]))
+    sparse = SparseRatings(indptr, indices, data)
+    return RatingMatrix(users, movies, userIndex, movieIndex, sparse, transpose(sparse, len(movies)))
+
+
+def transpose(sparse, columnCount):
+    """
+    Funkcja transponująca macierz CSR - wiersz wyniku to film i użytkownicy, którzy go ocenili (w kolejności
+    użytkowników)
+    :param sparse (SparseRatings): macierz w formacie CSR
+    :param columnCount (int): liczba kolumn (filmów)
+    :return: (SparseRatings) macierz transponowana w formacie CSR
+    """
+    rows = np.repeat(np.arange(len(sparse.indptr) - 1, dtype=np.int32), np.diff(sparse.indptr))
+    order = np.argsort(sparse.indices, kind='stable')
+    indptr = np.zeros(columnCount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sparse.indices, minlength=columnCount), out=indptr[1:])
+    return SparseRatings(indptr, rows[order], np.asarray(sparse.data)[order])
+
+
+def segmentPositions(indptr, rows):
+    """
+    Funkcja zwracająca pozycje elementów wybranych wierszy macierzy CSR (wiersz po wierszu)
+    :param indptr (ndarray): początki wierszy
+    :param rows (ndarray): indeksy wierszy
+    :return: (tuple) pozycje elementów w tablicach indices i data oraz liczby elementów kolejnych wierszy
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(starts, lengths), lengths
+
+
+def denseRows(sparse, rows, columnCount):
+    """
+    Funkcja zamieniająca wybrane wiersze macierzy CSR na macierz gęstą - tylko dla obliczeń, które jej wymagają
+    (np. porcja układów równań w factorModel.py)
+    :param sparse (SparseRatings): macierz w formacie CSR
+    :param rows (ndarray): indeksy wierszy
+    :param columnCount (int): liczba kolumn
+    :return: (tuple) macierz ocen len(rows) x columnCount (0 gdy brak oceny) oraz maska ocen
+    """
+    positions, lengths = segmentPositions(sparse.indptr, rows)
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    ratings = np.zeros((len(lengths), columnCount), dtype=np.float64)
+    mask = np.zeros((len(lengths), columnCount), dtype=bool)
+    ratings[owners, sparse.indices[positions]] = sparse.data[positions]
+    mask[owners, sparse.indices[positions]] = True
+    return ratings, mask
+
+
+def pairStatistics(matrix, rows, chunkSize=256):
+    """
+    Funkcja licząca statystyki wspólnie ocenionych filmów dla par (użytkownik z rows, każdy użytkownik) - te same
+    sumy, których używa pearsonScore. Dla każdej oceny użytkownika z rows odwiedzani są użytkownicy, którzy ocenili
+    ten sam film (wiersz matrix.columns), a sumy zbierane są przez np.bincount - koszt proporcjonalny do liczby
+    wspólnych ocen, bez macierzy gęstej użytkownik x film
+    :param matrix (RatingMatrix): macierz ocen
+    :param rows (ndarray): indeksy użytkowników, dla których liczymy statystyki
+    :param chunkSize (int): liczba użytkowników z rows przetwarzanych naraz (ogranicza pamięć tablic pomocniczych)
+    :return: (tuple) macierze (len(rows), liczba użytkowników): liczba wspólnych filmów, sumy ocen i kwadratów ocen
+             obu użytkowników oraz suma iloczynów ocen
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    userCount = len(matrix.sparse.indptr) - 1
+    statistics = np.zeros((6, len(rows), userCount), dtype=np.float64)
+    for start in range(0, len(rows), chunkSize):
+        chunk = rows[start:start + chunkSize]
+        positions, lengths = segmentPositions(matrix.sparse.indptr, chunk)
+        others, otherLengths = segmentPositions(matrix.columns.indptr, matrix.sparse.indices[positions])
+        pairs = np.repeat(np.repeat(np.arange(len(chunk)), lengths), otherLengths) * userCount
+        pairs += matrix.columns.indices[others]
+        x = np.repeat(matrix.sparse.data[positions].astype(np.float64), otherLengths)
+        y = matrix.columns.data[others].astype(np.float64)
+        for i, weights in enumerate((None, x, y, x * x, y * y, x * y)):
+            counts = np.bincount(pairs, weights, minlength=len(chunk) * userCount)
+            statistics[i, start:start + len(chunk)] = counts.reshape(len(chunk), userCount)
+    return tuple(statistics)
+
+
+def euclideanFromStatistics(numRatings, user1Sum, user2Sum, user1SquaredSum, user2SquaredSum, sumOfProducts):
+    """
+    Funkcja licząca współczynnik podobieństwa euclideanScore ze statystyk wspólnie ocenionych filmów
+    :return: (ndarray) współczynniki z zakresu 0 - 1.0 (0 gdy brak wspólnych filmów)
+    """
+    squaredDiff = np.maximum(user1SquaredSum + user2SquaredSum - 2 * sumOfProducts, 0)
+    return np.where(numRatings > 0, 1 / (1 + np.sqrt(squaredDiff)), 0.)
+
+
+def pearsonFromStatistics(numRatings, user1Sum, user2Sum, user1SquaredSum, user2SquaredSum, sumOfProducts):
+    """
+    Funkcja licząca współczynnik podobieństwa pearsonScore ze statystyk wspólnie ocenionych filmów
+    :return: (ndarray) współczynniki z zakresu 0 - 2.0 (0 gdy brak wspólnych filmów lub zerowa wariancja)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Sxy = sumOfProducts - (user1Sum * user2Sum / numRatings)
+        Sxx = user1SquaredSum - np.square(user1Sum) / numRatings
+        Syy = user2SquaredSum - np.square(user2Sum) / numRatings
+        score = 1 - (Sxy / np.sqrt(Sxx * Syy))
+    return np.where((numRatings > 0) & (Sxx * Syy != 0), score, 0.)
+
+
+def correlationFromStatistics(numRatings, user1Sum, user2Sum, user1SquaredSum, user2SquaredSum, sumOfProducts):
+    """
+    Funkcja licząca współczynnik korelacji Pearsona r ze statystyk wspólnie ocenionych filmów
+    :return: (ndarray) współczynniki z zakresu -1.0 - 1.0 (0 gdy brak wspólnych filmów lub zerowa wariancja)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Sxy = sumOfProducts - (user1Sum * user2Sum / numRatings)
+        Sxx = user1SquaredSum - np.square(user1Sum) / numRatings
+        Syy = user2SquaredSum - np.square(user2Sum) / numRatings
+        correlation = Sxy / np.sqrt(Sxx * Syy)
+    return np.where((numRatings > 0) & (Sxx * Syy != 0), correlation, 0.)
+
+
+SCORE_FUNCTIONS = {'Euclidean': euclideanFromStatistics, 'Pearson': pearsonFromStatistics}
+
+# współczynniki, według których metoda weighted wybiera sąsiadów i które są ich wagami - muszą rosnąć
+# z podobieństwem, więc dla metryki Pearson jest to korelacja r, a nie 1 - r (pearsonScore)
+WEIGHT_FUNCTIONS = {'Euclidean': euclideanFromStatistics, 'Pearson': correlationFromStatistics}
+
+
+def similarityScores(matrix, targetUser, scoreType):
+    """
+    Funkcja licząca współczynniki podobieństwa jednego użytkownika do wszystkich użytkowników (wektorowo)
+    :param matrix (RatingMatrix): macierz ocen
+    :param targetUser (str): imię i nazwisko użytkownika
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :return: (ndarray) współczynniki podobieństwa w kolejności matrix.users
+    """
+    if targetUser not in matrix.userIndex:
+        raise TypeError('Cannot find ' + targetUser + ' in the dataset')
+    statistics = pairStatistics(matrix, np.array([matrix.userIndex[targetUser]]))
+    return SCORE_FUNCTIONS[scoreType](*statistics)[0]
+
+
+def similarityMatrix(matrix, scoreType):
+    """
+    Funkcja licząca współczynniki podobieństwa wszystkich par użytkowników (wektorowo)
+    :param matrix (RatingMatrix): macierz ocen
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :return: (ndarray) macierz współczynników (liczba użytkowników x liczba użytkowników)
+    """
+    statistics = pairStatistics(matrix, np.arange(len(matrix.users)))
+    return SCORE_FUNCTIONS[scoreType](*statistics)
+
+
+def calculateScoresMatrix(matrix, targetUser, scoreType):
+    """
+    Wektorowy odpowiednik calculateScores - te same współczynniki i ta sama kolejność wyników
+    :param matrix (RatingMatrix): macierz ocen
+    :param targetUser (str): imię i nazwisko użytkownika dla którego chcemy poznać rekomendacje
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
+    """
+    return rankScores(matrix, similarityScores(matrix, targetUser, scoreType), targetUser)
+
+
+def rankScores(matrix, scores, targetUser):
+    """
+    Funkcja sortująca współczynniki podobieństwa jednego użytkownika (wiersz similarityMatrix) od największego
+    :param matrix (RatingMatrix): macierz ocen
+    :param scores (ndarray): współczynniki podobieństwa w kolejności matrix.users
+    :param targetUser (str): imię i nazwisko użytkownika, którego pomijamy na liście
+    :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
+    """
+    target = matrix.userIndex[targetUser]
+    # sortowanie stabilne - remisy w kolejności użytkowników, tak jak sorted(..., reverse=True)
+    order = [i for i in np.argsort(-scores, kind='stable') if i != target]
+    return [(matrix.users[i], float(scores[i])) for i in order]
+
+
+def rankNeighbours(matrix, weights, targetUser):
+    """
+    Funkcja sortująca wagi sąsiadów jednego użytkownika od największej - pomija użytkownika i sąsiadów z wagą
+    nie większą od 0 (brak wspólnych filmów, nieokreślona lub ujemna korelacja)
+    :param matrix (RatingMatrix): macierz ocen
+    :param weights (ndarray): wagi w kolejności matrix.users (WEIGHT_FUNCTIONS)
+    :param targetUser (str): imię i nazwisko użytkownika, którego pomijamy na liście
+    :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz wagę (większą od 0)
+    """
+    target = matrix.userIndex[targetUser]
+    # sortowanie stabilne - remisy w kolejności użytkowników
+    order = [i for i in np.argsort(-weights, kind='stable') if i != target and weights[i] > 0]
+    return [(matrix.users[i], float(weights[i])) for i in order]
+
+
+def neighbourScores(matrix, targetUser, scoreType):
+    """
+    Funkcja zwracająca sąsiadów dla metody weighted - użytkowników o dodatniej wadze WEIGHT_FUNCTIONS (dla metryki
+    Pearson korelacji r), od największej
+    :param matrix (RatingMatrix): macierz ocen
+    :param targetUser (str): imię i nazwisko użytkownika
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz wagę (większą od 0)
+    """
+    if targetUser not in matrix.userIndex:
+        raise TypeError('Cannot find ' + targetUser + ' in the dataset')
+    statistics = pairStatistics(matrix, np.array([matrix.userIndex[targetUser]]))
+    return rankNeighbours(matrix, WEIGHT_FUNCTIONS[scoreType](*statistics)[0], targetUser)
+
+
+def scoresForMethod(matrix, targetUser, scoreType, method='weighted'):
+    """
+    Funkcja zwracająca dokładną listę sąsiadów, której oczekuje wskazana metoda - dla weighted neighbourScores,
+    dla greedy calculateScoresMatrix
+    :param matrix (RatingMatrix): macierz ocen
+    :param targetUser (str): imię i nazwisko użytkownika
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :param method (str): weighted lub greedy
+    :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz współczynnik
+    """
+    if method == 'weighted':
+        return neighbourScores(matrix, targetUser, scoreType)
+    return calculateScoresMatrix(matrix, targetUser, scoreType)
+
+
+def predictRatings(matrix, sparse, scores, targetUser, k=10):
+    """
+    Funkcja przewidująca oceny filmów jako średnią ocen K najbardziej podobnych użytkowników ważoną
+    współczynnikiem podobieństwa - jeden iloczyn macierzy rzadkiej (wiersze sąsiadów) i wektora wag,
+    liczony przez np.bincount w czasie proporcjonalnym do liczby ocen sąsiadów
+    :param matrix (RatingMatrix): macierz ocen
+    :param sparse (SparseRatings): macierz ocen w formacie CSR (matrix.sparse)
+    :param scores: posortowana tablica zawierająca imię i nazwisko osoby, oraz współczynnik używany jako waga -
+                   musi rosnąć z podobieństwem (neighbourScores, nie pearsonScore)
+    :param targetUser (str): imię i nazwisko użytkownika dla którego chcemy poznać rekomendacje
+    :param k (int): liczba uwzględnianych sąsiadów
+    :return: (tuple) przewidywane oceny wszystkich filmów (NaN dla filmów obejrzanych lub bez ocen sąsiadów)
+             oraz suma wag sąsiadów, którzy ocenili film
+    """
+    neighbours = scores[:k]
+    rows = np.array([matrix.userIndex[user] for user, _ in neighbours], dtype=np.int64)
+    weights = np.array([score for _, score in neighbours], dtype=np.float64)
+
+    positions, lengths = segmentPositions(sparse.indptr, rows)
+    rowWeights = np.repeat(weights, lengths)
+    movies = sparse.indices[positions]
+
+    weightedSum = np.bincount(movies, weights=sparse.data[positions] * rowWeights, minlength=len(matrix.movies))
+    support = np.bincount(movies, weights=np.abs(rowWeights), minlength=len(matrix.movies))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        predicted = np.where(support > 0, weightedSum / support, np.nan)
+    target = matrix.userIndex[targetUser]
+    predicted[sparse.indices[sparse.indptr[target]:sparse.indptr[target + 1]]] = np.nan
+    return predicted, support
+
+
+def recommendMovies(matrix, sparse, scores, targetUser, n=5, k=10):
+    """
+    Funkcja wybierająca filmy o najwyższej i najniższej przewidywanej ocenie (predictRatings); przy równej
+    ocenie wyżej jest film oceniony przez bardziej podobnych sąsiadów (większa suma wag)
+    :param matrix (RatingMatrix): macierz ocen
+    :param sparse (SparseRatings): macierz ocen w formacie CSR (matrix.sparse)
+    :param scores: posortowana tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
+    :param targetUser (str): imię i nazwisko użytkownika dla którego chcemy poznać rekomendacje
+    :param n (int): liczba filmów polecanych i niepolecanych
+    :param k (int): liczba uwzględnianych sąsiadów
+    :return: (tuple) n tytułów filmowych polecanych i n niepolecanych
+    """
+    predicted, support = predictRatings(matrix, sparse, scores, targetUser, k)
+    candidates = np.flatnonzero(~np.isnan(predicted))
+    best = candidates[np.lexsort((-support[candidates], -predicted[candidates]))[:n]]
+    worst = candidates[np.lexsort((-support[candidates], predicted[candidates]))[:n]]
+    return [matrix.movies[i] for i in best], [matrix.movies[i] for i in worst]
+
+
+def selectMovies(dataset, scores, targetUser, n=5):
+    """
+    Funkcja wybierająca w jednym przejściu filmy polecane i niepolecane na podstawie ocen najlepiej dopasowanych
+    użytkowników. Sąsiedzi odwiedzani są od najbardziej podobnego (kopiec - bez sortowania całej listy scores),
+    filmy obejrzane przez użytkownika odrzucane są zbiorem budowanym raz, a z filmów każdego sąsiada wybieranych
+    jest tylko tyle najwyżej i najniżej ocenionych, ile jeszcze brakuje (heapq.nsmallest zamiast sortowania)
     :param dataset: oceny filmów wszystkich osób
     :param scores: tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
     :param targetUser: oceny filmów użytkownika dla którego chcemy poznać rekomendacje
-    :return: 5 tytułów filmowych (polecanych)
+    :param n: liczba filmów polecanych i niepolecanych
+    :return: (tuple) n tytułów filmowych polecanych i n niepolecanych
     """
+    seen = set(dataset[targetUser])
+    # pozycja na liście rozstrzyga remisy tak jak stabilne sortowanie malejące
+    neighbours = [(-score, position, user) for position, (user, score) in enumerate(scores)]
+    heapq.heapify(neighbours)
+
     recommendations = []
-    for elem in scores:
-        neighbour = elem[0]
-        neighbourMovies = [item[0] for item in
-                           sorted(dataset[neighbour].items(), key=lambda item: item[1], reverse=True)]
-        for movie in neighbourMovies:
-            if movie not in [item for item in dataset[targetUser]]:
-                recommendations.append(movie)
-                if len(recommendations) == 5:
-                    return recommendations
+    anti_recommendations = []
+    while neighbours and (len(recommendations) < n or len(anti_recommendations) < n):
+        neighbour = heapq.heappop(neighbours)[2]
+        unseen = [(movie, rating) for movie, rating in dataset[neighbour].items() if movie not in seen]
+        if len(recommendations) < n:
+            best = heapq.nsmallest(n - len(recommendations), unseen, key=lambda item: -item[1])
+            recommendations.extend(movie for movie, _ in best)
+        if len(anti_recommendations) < n:
+            worst = heapq.nsmallest(n - len(anti_recommendations), unseen, key=lambda item: item[1])
+            anti_recommendations.extend(movie for movie, _ in worst)
+    return recommendations, anti_recommendations
+
+
+def getRecommendations(dataset, scores, targetUser, n=5):
+    """
+    Funkcja wybierająca filmy na podstawie ocen najlepiej dopasowanych użytkowników do celu (osoby)
+    :param dataset: oceny filmów wszystkich osób
+    :param scores: tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
+    :param targetUser: oceny filmów użytkownika dla którego chcemy poznać rekomendacje
+    :param n: liczba filmów
+    :return: n tytułów filmowych (polecanych)
+    """
+    return selectMovies(dataset, scores, targetUser, n)[0]
 
 
-def getAntiRecommendations(dataset, scores, targetUser):
+def getAntiRecommendations(dataset, scores, targetUser, n=5):
     """
     Funkcja wybierająca filmy na podstawie ocen najlepiej dopasowanych użytkowników do celu (osoby)
     :param dataset: oceny filmów wszystkich osób
     :param scores: tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
     :param targetUser: oceny filmów użytkownika dla którego chcemy poznać rekomendacje
-    :return: 5 tytułów filmowych (niepolecanych)
+    :param n: liczba filmów
+    :return: n tytułów filmowych (niepolecanych)
     """
-    anti_recommendations = []
-    for elem in scores:
-        neighbour = elem[0]
-        neighbourMovies = [item[0] for item in
-                           sorted(dataset[neighbour].items(), key=lambda item: item[1])]
-        for movie in neighbourMovies:
-            if movie not in [item for item in dataset[targetUser]]:
-                anti_recommendations.append(movie)
-                if len(anti_recommendations) == 5:
-                    return anti_recommendations
+    return selectMovies(dataset, scores, targetUser, n)[1]
+
+
+def recommendForUser(dataset, matrix, sparse, scores, targetUser, method='weighted', n=5, k=10):
+    """
+    Funkcja wybierająca filmy polecane i niepolecane wskazaną metodą. Sąsiedzi muszą pochodzić ze źródła
+    właściwego dla metody (scoresForMethod lub getNeighbours indeksów z tym samym method) - dla metody weighted
+    wagi rosnące z podobieństwem (dla metryki Pearson korelacja r; 1 - r dawałby największe wagi użytkownikom
+    o przeciwnym guście)
+    :param dataset (dictionary): oceny filmów wszystkich osób
+    :param matrix (RatingMatrix): macierz ocen
+    :param sparse (SparseRatings): macierz ocen w formacie CSR (matrix.sparse)
+    :param scores: posortowana tablica zawierająca imię i nazwisko osoby, oraz policzony współczynnik
+    :param targetUser (str): imię i nazwisko użytkownika dla którego chcemy poznać rekomendacje
+    :param method (str): weighted (recommendMovies) lub greedy (selectMovies)
+    :param n (int): liczba filmów polecanych i niepolecanych
+    :param k (int): liczba sąsiadów uwzględnianych przez metodę weighted
+    :return: (tuple) n tytułów filmowych polecanych i n niepolecanych
+    """
+    if method == 'weighted':
+        return recommendMovies(matrix, sparse, scores, targetUser, n, k)
+    return selectMovies(dataset, scores, targetUser, n)
+
+
+# stan procesu roboczego trybu wsadowego - ustawiany raz przez initBatchWorker, a nie przesyłany z każdą porcją
+batchState = {}
+
+
+def initBatchWorker(path, scoreType, method, n, k):
+    """
+    Funkcja inicjalizująca proces roboczy trybu wsadowego - wczytuje oceny z pliku i buduje macierz ocen raz na
+    proces (do procesu trafia tylko ścieżka, a nie słownik ocen)
+    :param path (str): ścieżka pliku ocen (JSON lub binarny zapis ocen)
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :param method (str): weighted lub greedy
+    :param n (int): liczba filmów polecanych i niepolecanych
+    :param k (int): liczba sąsiadów uwzględnianych przez metodę weighted
+    :return: void
+    """
+    dataset = readRatings(path)
+    matrix = loadRatingMatrix(dataset)
+    # jedno źródło sąsiadów na metrykę - wagi dla metody weighted, współczynniki rankingu dla greedy
+    scoreFunction = (WEIGHT_FUNCTIONS if method == 'weighted' else SCORE_FUNCTIONS)[scoreType]
+    rank = rankNeighbours if method == 'weighted' else rankScores
+    batchState.update(dataset=dataset, matrix=matrix, sparse=matrix.sparse, scoreFunction=scoreFunction, rank=rank,
+                      method=method, n=n, k=k)
+
+
+def recommendShard(users):
+    """
+    Funkcja licząca w procesie roboczym rekomendacje dla porcji użytkowników. Współczynniki podobieństwa liczone
+    są dla całej porcji jednym iloczynem macierzy (porcja x wszyscy użytkownicy)
+    :param users (list): imiona i nazwiska użytkowników
+    :return: (list) słowniki z polami user, recommendations i antiRecommendations
+    """
+    state = batchState
+    matrix = state['matrix']
+    rows = np.array([matrix.userIndex[user] for user in users], dtype=np.int64)
+    similarities = state['scoreFunction'](*pairStatistics(matrix, rows))
+    results = []
+    for user, row in zip(users, similarities):
+        scores = state['rank'](matrix, row, user)
+        recommendations, antiRecommendations = recommendForUser(state['dataset'], matrix, state['sparse'], scores,
+                                                                user, state['method'], state['n'], state['k'])
+        results.append({'user': user, 'recommendations': recommendations,
+                        'antiRecommendations': antiRecommendations})
+    return results
+
+
+def batchRecommendations(path, scoreType, users=None, method='weighted', n=5, k=10, workers=None, shardSize=64,
+                         dataset=None):
+    """
+    Funkcja licząca rekomendacje dla wielu użytkowników w jednym przebiegu. Użytkownicy dzieleni są na porcje
+    rozdzielane między procesy robocze, które wczytują oceny z pliku raz na proces i liczą współczynniki
+    podobieństwa dla swojej porcji - pamięć rośnie z shardSize x liczba użytkowników, a nie z kwadratem liczby
+    użytkowników
+    :param path (str): ścieżka pliku ocen (JSON lub binarny zapis ocen)
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :param users (list): użytkownicy, None - wszyscy użytkownicy
+    :param method (str): weighted lub greedy
+    :param n (int): liczba filmów polecanych i niepolecanych
+    :param k (int): liczba sąsiadów uwzględnianych przez metodę weighted
+    :param workers (int): liczba procesów, domyślnie liczba rdzeni
+    :param shardSize (int): liczba użytkowników w jednej porcji
+    :param dataset (dictionary lub RatingsStore): oceny wczytane już z path (readRatings), używane tylko do
+                                                  sprawdzenia listy użytkowników; None - wczytywane z path
+    :return: (generator) słowniki z polami user, recommendations i antiRecommendations, w kolejności users
+    """
+    if dataset is None:
+        dataset = readRatings(path)
+    users = list(dataset if users is None else users)
+    for user in users:
+        if user not in dataset:
+            raise TypeError('Cannot find ' + user + ' in the dataset')
 
+    shards = [users[start:start + shardSize] for start in range(0, len(users), shardSize)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initBatchWorker,
+                             initargs=(path, scoreType, method, n, k)) as executor:
+        for results in executor.map(recommendShard, shards):
+            yield from results
 
-def printMovies(movies):
+
+def loadOrBuild(path, load, build, version, matches=None):
+    """
+    Funkcja wczytująca indeks lub model z pliku, a gdy plik nie istnieje albo zbudowano go z innej wersji pliku
+    ocen (lub z innymi parametrami) - budująca go od nowa i zapisująca pod tą samą ścieżką
+    :param path (str): ścieżka pliku indeksu lub modelu
+    :param load: funkcja wczytująca plik (np. SimilarityIndex.load)
+    :param build: funkcja bez argumentów budująca nowy obiekt (z metodą save i atrybutem version)
+    :param version (tuple): wersja bieżącego pliku ocen (ratingsVersion)
+    :param matches: opcjonalna funkcja sprawdzająca, czy wczytany obiekt ma żądane parametry
+    :return: wczytany lub zbudowany obiekt
+    """
+    if os.path.exists(path):
+        loaded = load(path)
+        if loaded.version != version:
+            print(f"{path} zbudowano z innej wersji pliku ocen - budowanie od nowa", file=sys.stderr)
+        elif matches is not None and not matches(loaded):
+            print(f"{path} zbudowano z innymi parametrami - budowanie od nowa", file=sys.stderr)
+        else:
+            return loaded
+    built = build()
+    built.save(path)
+    return built
+
+
+def printMovies(movies, cache=None, offline=False):
     """
     Funkcja wyświetlająca oryginalne tytuły filmów wraz z krótkikm opisem z The Movie DB
+    (opisy pobierane są równolegle i zapamiętywane w pamięci podręcznej - moduł movieMetadata)
     :param movies: tytuły filmów
+    :param cache (MetadataCache): pamięć podręczna opisów, None - bez pamięci podręcznej
+    :param offline (bool): tryb offline - opisy tylko z pamięci podręcznej
     :return: void
     """
-    tmdb = TMDb()
-    tmdb.api_key = os.environ.get('TMDB_SECRET')
-    movie = Movie()
+    metadata = getMetadata(movies, cache, offline=offline)
     for title in movies:
-        m = movie.search(unidecode(title))
-        if len(m['results']) > 0:
-            print(m[0].title)
-            print("\t" + m[0].overview)
+        if metadata[title] is not None:
+            print(metadata[title][0])
+            print("\t" + metadata[title][1])
             print("-----------------------")
 
 
 if __name__ == '__main__':
-    args = argsParser().parse_args()
+    parser = argsParser()
+    args = parser.parse_args()
+    if args.count < 0:
+        parser.error('--count must not be negative')
+    if args.targetUser is None and (args.index or args.ann):
+        parser.error('--index and --ann cannot be used with --all or --users')
     targetUser = args.targetUser
     scoreType = args.scoreType
-    ratings_file = './data/ratings.json'
-
-    with open(ratings_file, 'r', encoding='utf-8') as f:
-        data = json.loads(f.read())
-
-    if scoreType == 'Euclidean':
-        scores = calculateScores(data, targetUser, euclideanScore)
+    data = readRatings(args.ratings)
+
+    if scoreType == 'ALS':
+        from factorModel import FactorModel
+        if args.factors:
+            factors = loadOrBuild(args.factors, FactorModel.load,
+                                  lambda: FactorModel.train(data, seed=0, version=ratingsVersion(args.ratings)),
+                                  ratingsVersion(args.ratings))
+        else:
+            factors = FactorModel.train(data, seed=0)
+
+    if targetUser is None:
+        users = None
+        if args.users:
+            with open(args.users, 'r', encoding='utf-8') as f:
+                users = [line.strip() for line in f if line.strip()]
+        output = open(args.output, 'w', encoding='utf-8') if args.output != '-' else sys.stdout
+        if scoreType == 'ALS':
+            # jeden iloczyn macierzy i wektora na użytkownika - pula procesów nie jest potrzebna
+            results = []
+            for user in users if users is not None else factors.users:
+                recommended, notRecommended = factors.recommend(user, args.count)
+                results.append({'user': user, 'recommendations': recommended, 'antiRecommendations': notRecommended})
+        else:
+            results = batchRecommendations(args.ratings, scoreType, users, args.method, args.count, args.neighbours,
+                                           args.workers, dataset=data)
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+        if output is not sys.stdout:
+            output.close()
+        sys.exit(0)
+
+    if scoreType == 'ALS':
+        recommendations, antiRecommendations = factors.recommend(targetUser, args.count)
     else:
-        scores = calculateScores(data, targetUser, pearsonScore)
-
-    recommendations = getRecommendations(data, scores, targetUser)
-    antiRecommendations = getAntiRecommendations(data, scores, targetUser)
-
-    print(f"TOP 5 movies {targetUser} should watch:")
-    printMovies(recommendations)
-    print(f"\nTOP 5 movies {targetUser} should NOT watch:")
-    printMovies(antiRecommendations)
+        matrix = loadRatingMatrix(data)
+        if args.index:
+            from similarityIndex import SimilarityIndex
+            index = loadOrBuild(args.index, SimilarityIndex.load,
+                                lambda: SimilarityIndex.build(data, version=ratingsVersion(args.ratings)),
+                                ratingsVersion(args.ratings))
+            scores = index.getNeighbours(targetUser, scoreType, args.method)
+        elif args.ann:
+            from lshIndex import LshIndex
+            index = loadOrBuild(args.ann, LshIndex.load,
+                                lambda: LshIndex.build(data, args.tables or 8, args.bits or 4,
+                                                       version=ratingsVersion(args.ratings)),
+                                ratingsVersion(args.ratings),
+                                lambda loaded: (args.tables in (None, loaded.tables)
+                                                and args.bits in (None, loaded.bits)))
+            scores = index.getNeighbours(targetUser, scoreType, args.neighbours, args.method)
+        else:
+            scores = scoresForMethod(matrix, targetUser, scoreType, args.method)
+        recommendations, antiRecommendations = recommendForUser(data, matrix, matrix.sparse, scores, targetUser,
+                                                                args.method, args.count, args.neighbours)
+
+    cache = MetadataCache(args.cache, args.cacheTtl * DAY)
+    cache.evictExpired()
+    # opisy obu list pobierane są razem, aby wszystkie brakujące trafiły do puli wątków naraz
+    getMetadata(recommendations + antiRecommendations, cache, offline=args.offline)
+
+    print(f"TOP {args.count} movies {targetUser} should watch:")
+    printMovies(recommendations, cache, args.offline)
+    print(f"\nTOP {args.count} movies {targetUser} should NOT watch:")
+    printMovies(antiRecommendations, cache, args.offline)
+    cache.close()
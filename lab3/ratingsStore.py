@@ -0,0 +1,155 @@
+"""
+Binarny zapis ocen filmów
+
+Autor:
+Kacper Stankiewicz
+
+Zamiast słownika słowników z pliku ratings.json (cały plik i wszystkie tytuły jako osobne obiekty w pamięci) oceny
+zapisywane są w jednym pliku binarnym:
+- nagłówek JSON ze słownikami identyfikatorów - lista użytkowników i lista filmów (każdy tytuł zapisany raz,
+  w kolejności pierwszego wystąpienia, tak jak w loadRatingMatrix)
+- tablice CSR: początki wierszy użytkowników (int64), identyfikatory filmów (int32) i oceny (uint8)
+
+Tablice otwierane są przez np.memmap - start programu nie wymaga parsowania ocen, a system operacyjny wczytuje
+z dysku tylko te fragmenty, które są faktycznie czytane. RatingsStore zachowuje się jak słownik ocen
+(użytkownik -> {film: ocena}), więc może zastąpić dane wczytane z ratings.json.
+
+Przykładowe wywołanie (konwersja):
+ python .\\ratingsStore.py --ratings ./data/ratings.json --output ./data/ratings.bin
+"""
+
+import argparse
+import json
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+MAGIC = b'NAIRATE1'
+ALIGNMENT = 8
+
+
+def convert(dataset, path):
+    """
+    Funkcja zapisująca oceny w formacie binarnym
+    :param dataset (dictionary): oceny filmów wszystkich osób
+    :param path (str): ścieżka pliku wynikowego
+    :return: void
+    """
+    users = list(dataset)
+    movies = list(dict.fromkeys(movie for user in users for movie in dataset[user]))
+    movieIndex = {movie: i for i, movie in enumerate(movies)}
+
+    indptr = np.zeros(len(users) + 1, dtype=np.int64)
+    np.cumsum([len(dataset[user]) for user in users], out=indptr[1:])
+    # kolejność filmów w wierszu jak w pliku JSON - od niej zależą remisy w selectMovies
+    indices = np.fromiter((movieIndex[movie] for user in users for movie in dataset[user]),
+                          dtype=np.int32, count=int(indptr[-1]))
+    values = [rating for user in users for rating in dataset[user].values()]
+    if any(not isinstance(rating, int) or not 0 <= rating <= 255 for rating in values):
+        raise ValueError('Ratings must be integers between 0 and 255')
+    data = np.array(values, dtype=np.uint8)
+
+    header = json.dumps({'users': users, 'movies': movies, 'ratings': len(values)}, ensure_ascii=False).encode()
+    start = len(MAGIC) + 8 + len(header)
+    padding = -start % ALIGNMENT
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header) + padding))
+        f.write(header + b' ' * padding)
+        for array in (indptr, indices, data):
+            f.write(array.tobytes())
+
+
+class RatingsStore(Mapping):
+    """
+    Oceny filmów z pliku binarnego (convert) - słownik użytkownik -> {film: ocena} oparty na tablicach np.memmap
+    """
+
+    def __init__(self, path):
+        """
+        Konstruktor - wczytuje nagłówek i mapuje tablice ocen do pamięci
+        :param path (str): ścieżka pliku
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + ' is not a ratings store')
+            length, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(length).decode())
+
+        self.users = header['users']
+        self.movies = header['movies']
+        self.userIndex = {user: i for i, user in enumerate(self.users)}
+        self.movieIndex = {movie: i for i, movie in enumerate(self.movies)}
+
+        offset = len(MAGIC) + 8 + length
+        self.indptr = np.memmap(path, dtype=np.int64, mode='r', offset=offset, shape=(len(self.users) + 1,))
+        offset += self.indptr.nbytes
+        self.indices = np.memmap(path, dtype=np.int32, mode='r', offset=offset, shape=(header['ratings'],))
+        offset += self.indices.nbytes
+        self.data = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(header['ratings'],))
+
+    def __reduce__(self):
+        # w procesach roboczych plik mapowany jest ponownie zamiast kopiowania tablic
+        return RatingsStore, (self.path,)
+
+    def __getitem__(self, user):
+        """
+        Funkcja zwracająca oceny jednego użytkownika
+        :param user (str): imię i nazwisko użytkownika
+        :return: (dictionary) film -> ocena, w kolejności z pliku JSON
+        """
+        row = self.userIndex[user]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return dict(zip((self.movies[i] for i in self.indices[start:end].tolist()), self.data[start:end].tolist()))
+
+    def __iter__(self):
+        return iter(self.users)
+
+    def __len__(self):
+        return len(self.users)
+
+    def __contains__(self, user):
+        return user in self.userIndex
+
+
+def readRatings(path):
+    """
+    Funkcja wczytująca oceny z pliku JSON lub z pliku binarnego (rozpoznawanego po nagłówku)
+    :param path (str): ścieżka pliku ocen
+    :return: (dictionary lub RatingsStore) oceny filmów wszystkich osób
+    """
+    with open(path, 'rb') as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+    if binary:
+        return RatingsStore(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.loads(f.read())
+
+
+def ratingsVersion(path):
+    """
+    Funkcja zwracająca wersję pliku ocen - czas modyfikacji i rozmiar. Zapisywana w indeksach i modelach
+    zbudowanych z tego pliku, żeby wykryć, że plik ocen zmienił się od ich zbudowania
+    :param path (str): ścieżka pliku ocen
+    :return: (tuple) czas modyfikacji w nanosekundach i rozmiar w bajtach
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert a ratings JSON file to the binary ratings store')
+    parser.add_argument('--ratings', default='./data/ratings.json', help='Ratings JSON file')
+    parser.add_argument('--output', default='./data/ratings.bin', help='Binary ratings file')
+    args = parser.parse_args()
+
+    with open(args.ratings, 'r', encoding='utf-8') as f:
+        data = json.loads(f.read())
+
+    convert(data, args.output)
+    store = RatingsStore(args.output)
+    print(f"Zapisano {len(store.data)} ocen {len(store.users)} użytkowników ({len(store.movies)} filmów) "
+          f"do {args.output}")
@@ -0,0 +1,312 @@
+"""
+Serwer HTTP z rekomendacjami filmów
+
+Autor:
+Kacper Stankiewicz
+
+Serwer wczytuje oceny i buduje macierz ocen (CSR) raz przy starcie, a następnie odpowiada na zapytania współbieżnie
+(wątek na połączenie) - bez kosztu uruchamiania interpretera, importu numpy i parsowania pliku ocen przy każdym
+zapytaniu. Współczynniki podobieństwa liczone są w zapytaniu tylko dla wskazanego użytkownika (jeden wiersz,
+koszt proporcjonalny do ocen filmów, które ocenił), więc pamięć modelu rośnie liniowo z liczbą ocen, a nie
+z kwadratem liczby użytkowników - także wtedy, gdy w trakcie przeładowania stary i nowy model istnieją naraz.
+
+Adresy:
+- GET /recommend?user=...&metric=Pearson[&count=5&method=weighted&neighbours=10] - filmy polecane i niepolecane
+  (JSON, bez opisów z TMDB); count i neighbours muszą być liczbami całkowitymi większymi od 0
+- GET /metrics - histogramy czasu obsługi zapytań (w milisekundach) dla każdego adresu
+- GET /health - liczba użytkowników i filmów oraz czas wczytania modelu
+- POST /reload - ponowne wczytanie pliku ocen
+
+Przeładowanie buduje nowy model obok starego i podmienia jedną referencję - zapytania w trakcie obsługi kończą
+się na starym modelu, nowe trafiają do nowego, żadne nie jest odrzucane. Z opcją --watch plik ocen sprawdzany jest
+co zadaną liczbę sekund i przeładowywany po zmianie.
+
+Przykładowe wywołanie:
+ python .\\recommendationServer.py --ratings ./data/ratings.json --port 8000 --watch 5
+ curl "http://localhost:8000/recommend?user=Pawe%C5%82%20Czapiewski&metric=Pearson"
+"""
+
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from movieRecommendation import SCORE_FUNCTIONS, loadRatingMatrix, recommendForUser, scoresForMethod
+from ratingsStore import readRatings
+
+BUCKETS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+Model = namedtuple('Model', ['dataset', 'matrix', 'sparse', 'path', 'modified', 'loaded'])
+
+
+def loadModel(path):
+    """
+    Funkcja wczytująca oceny i budująca macierz ocen
+    :param path (str): plik ocen (JSON lub plik binarny z ratingsStore.py)
+    :return: (Model) dane potrzebne do obsługi zapytań
+    """
+    modified = os.path.getmtime(path)
+    dataset = readRatings(path)
+    matrix = loadRatingMatrix(dataset)
+    return Model(dataset, matrix, matrix.sparse, path, modified, time.time())
+
+
+class LatencyHistogram:
+    """
+    Histogram czasu obsługi zapytań - liczba zapytań w przedziałach BUCKETS (milisekundy), suma i maksimum
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Konstruktor
+        :param buckets (tuple): górne granice przedziałów w milisekundach (ostatni przedział jest otwarty)
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.
+        self.maximum = 0.
+        self.lock = threading.Lock()
+
+    def observe(self, milliseconds):
+        """
+        Funkcja dodająca pomiar
+        :param milliseconds (float): czas obsługi zapytania
+        :return: void
+        """
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, milliseconds)] += 1
+            self.total += milliseconds
+            self.maximum = max(self.maximum, milliseconds)
+
+    def snapshot(self):
+        """
+        Funkcja zwracająca stan histogramu
+        :return: (dictionary) liczba zapytań, średni i maksymalny czas oraz liczności przedziałów ('le' - górna granica)
+        """
+        with self.lock:
+            count = sum(self.counts)
+            buckets = [{'le': bound, 'count': n} for bound, n in zip(self.buckets + ('inf',), self.counts)]
+            return {'count': count, 'mean_ms': self.total / count if count else 0., 'max_ms': self.maximum,
+                    'buckets': buckets}
+
+
+class RecommendationService:
+    """
+    Stan serwera - bieżący model i histogramy czasu obsługi zapytań
+    """
+
+    def __init__(self, path):
+        """
+        Konstruktor - wczytuje model
+        :param path (str): plik ocen
+        """
+        self.model = loadModel(path)
+        self.reloadLock = threading.Lock()
+        self.histograms = {}
+        self.histogramsLock = threading.Lock()
+
+    def histogram(self, route):
+        """
+        Funkcja zwracająca histogram dla adresu (tworzony przy pierwszym zapytaniu)
+        :param route (str): ścieżka adresu
+        :return: (LatencyHistogram)
+        """
+        with self.histogramsLock:
+            return self.histograms.setdefault(route, LatencyHistogram())
+
+    def recommend(self, user, scoreType, n=5, method='weighted', k=10):
+        """
+        Funkcja wybierająca filmy polecane i niepolecane na podstawie bieżącego modelu
+        :param user (str): imię i nazwisko użytkownika
+        :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+        :param n (int): liczba filmów polecanych i niepolecanych
+        :param method (str): weighted lub greedy
+        :param k (int): liczba sąsiadów uwzględnianych przez metodę weighted
+        :return: (dictionary) pola user, metric, recommendations i antiRecommendations
+        """
+        # jedna referencja na całe zapytanie - przeładowanie w trakcie nie miesza starego i nowego modelu
+        model = self.model
+        if user not in model.matrix.userIndex:
+            raise KeyError('Cannot find ' + user + ' in the dataset')
+        scores = scoresForMethod(model.matrix, user, scoreType, method)
+        recommendations, antiRecommendations = recommendForUser(model.dataset, model.matrix, model.sparse, scores,
+                                                                user, method, n, k)
+        return {'user': user, 'metric': scoreType, 'recommendations': recommendations,
+                'antiRecommendations': antiRecommendations}
+
+    def reload(self, force=True):
+        """
+        Funkcja wczytująca ponownie plik ocen i podmieniająca model
+        :param force (bool): False - tylko gdy plik zmienił się od ostatniego wczytania
+        :return: (bool) czy model został podmieniony
+        """
+        with self.reloadLock:
+            path = self.model.path
+            if not force and os.path.getmtime(path) == self.model.modified:
+                return False
+            self.model = loadModel(path)
+            return True
+
+    def watch(self, interval):
+        """
+        Funkcja (wątek w tle) przeładowująca model po zmianie pliku ocen
+        :param interval (float): co ile sekund sprawdzać plik
+        :return: void
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                if self.reload(force=False):
+                    print(f"Przeładowano {self.model.path}")
+            except (OSError, ValueError) as error:
+                # plik w trakcie zapisu lub uszkodzony - zostaje poprzedni model
+                print(f"Nie udało się przeładować {self.model.path}: {error}")
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    """
+    Obsługa zapytań HTTP - self.server.service to RecommendationService
+    """
+
+    def sendJson(self, status, body):
+        """
+        Funkcja wysyłająca odpowiedź JSON
+        :param status (int): kod odpowiedzi HTTP
+        :param body (dictionary): treść odpowiedzi
+        :return: void
+        """
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def timed(self, route, handler):
+        """
+        Funkcja wywołująca obsługę adresu i zapisująca czas do histogramu
+        :param route (str): ścieżka adresu
+        :param handler: funkcja zwracająca (kod odpowiedzi, treść)
+        :return: void
+        """
+        start = time.perf_counter()
+        status, body = handler()
+        self.sendJson(status, body)
+        self.server.service.histogram(route).observe((time.perf_counter() - start) * 1000)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        routes = {'/recommend': lambda: self.recommend(query), '/metrics': self.metrics, '/health': self.health}
+        if url.path in routes:
+            self.timed(url.path, routes[url.path])
+        else:
+            self.sendJson(404, {'error': 'Unknown path ' + url.path})
+
+    def do_POST(self):
+        if urlparse(self.path).path == '/reload':
+            self.timed('/reload', self.reload)
+        else:
+            self.sendJson(404, {'error': 'Unknown path ' + self.path})
+
+    def recommend(self, query):
+        """
+        Funkcja obsługująca /recommend
+        :param query (dictionary): parametry zapytania
+        :return: (tuple) kod odpowiedzi i treść
+        """
+        if 'user' not in query:
+            return 400, {'error': 'Missing user parameter'}
+        scoreType = query.get('metric', 'Pearson')
+        method = query.get('method', 'weighted')
+        if scoreType not in SCORE_FUNCTIONS:
+            return 400, {'error': 'Unknown metric ' + scoreType}
+        if method not in ('weighted', 'greedy'):
+            return 400, {'error': 'Unknown method ' + method}
+        try:
+            n, k = int(query.get('count', 5)), int(query.get('neighbours', 10))
+        except ValueError:
+            return 400, {'error': 'count and neighbours must be integers'}
+        if n < 1 or k < 1:
+            return 400, {'error': 'count and neighbours must be at least 1'}
+        try:
+            return 200, self.server.service.recommend(query['user'], scoreType, n, method, k)
+        except KeyError as error:
+            return 404, {'error': error.args[0]}
+
+    def metrics(self):
+        """
+        Funkcja obsługująca /metrics
+        :return: (tuple) kod odpowiedzi i histogramy wszystkich adresów
+        """
+        with self.server.service.histogramsLock:
+            histograms = dict(self.server.service.histograms)
+        return 200, {route: histogram.snapshot() for route, histogram in histograms.items()}
+
+    def health(self):
+        """
+        Funkcja obsługująca /health
+        :return: (tuple) kod odpowiedzi i opis bieżącego modelu
+        """
+        model = self.server.service.model
+        return 200, {'users': len(model.matrix.users), 'movies': len(model.matrix.movies), 'ratings': model.path,
+                     'loaded': model.loaded}
+
+    def reload(self):
+        """
+        Funkcja obsługująca /reload
+        :return: (tuple) kod odpowiedzi i opis nowego modelu
+        """
+        try:
+            self.server.service.reload()
+        except (OSError, ValueError) as error:
+            return 500, {'error': str(error)}
+        return self.health()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def createServer(service, host='127.0.0.1', port=8000, verbose=False):
+    """
+    Funkcja tworząca serwer HTTP (wątek na połączenie)
+    :param service (RecommendationService): stan serwera
+    :param host (str): adres nasłuchiwania
+    :param port (int): port (0 - dowolny wolny)
+    :param verbose (bool): czy wypisywać każde zapytanie
+    :return: (ThreadingHTTPServer)
+    """
+    server = ThreadingHTTPServer((host, port), RecommendationHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve movie recommendations over HTTP from a warm in-memory model')
+    parser.add_argument('--ratings', default='./data/ratings.json',
+                        help='Ratings JSON file or binary ratings store (ratingsStore.py)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help='Reload the ratings file when it changes, checking every SECONDS')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    service = RecommendationService(args.ratings)
+    if args.watch:
+        threading.Thread(target=service.watch, args=(args.watch,), daemon=True).start()
+    server = createServer(service, args.host, args.port, args.verbose)
+    print(f"Serwer rekomendacji na http://{args.host}:{server.server_address[1]} "
+          f"({len(service.model.matrix.users)} użytkowników)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,352 @@
+"""
+Indeks najbliższych sąsiadów użytkowników
+
+Autor:
+Kacper Stankiewicz
+
+Indeks przechowuje dla każdej pary użytkowników statystyki wspólnie ocenionych filmów (liczba filmów, sumy ocen,
+sumy kwadratów ocen i sumy iloczynów - te same wielkości, których używa pearsonScore), a z nich wyznacza dla każdego
+użytkownika i każdej metryki [Euclidean,Pearson] listę K najbardziej podobnych użytkowników - osobno dla metody
+greedy (współczynniki SCORE_FUNCTIONS) i weighted (wagi WEIGHT_FUNCTIONS, dla metryki Pearson korelacja r).
+
+Dodanie, zmiana lub usunięcie oceny aktualizuje statystyki tylko w wierszu i kolumnie tego użytkownika (dla osób,
+które oceniły ten sam film), a listy sąsiadów przeliczane są tylko dla tych osób. Oceny przechowywane są jako
+słowniki użytkownik -> ocena dla każdego filmu, a macierze statystyk i listy sąsiadów w buforach z zapasem
+(podwajanych przy braku miejsca), więc dodanie użytkownika nie kopiuje macierzy N x N. Indeks zapisywany jest do
+pliku .npz razem z wersją pliku ocen (czas modyfikacji i rozmiar), więc zapytanie o sąsiadów nie wymaga
+przeliczania podobieństw dla całego zbioru, a indeks zbudowany z innej wersji ocen można wykryć i przebudować.
+
+Przykładowe wywołanie (budowa indeksu):
+ python .\\similarityIndex.py --ratings ./data/ratings.json --output ./data/index.npz --k 10
+"""
+
+import argparse
+
+import numpy as np
+
+from movieRecommendation import SCORE_FUNCTIONS, WEIGHT_FUNCTIONS, loadRatingMatrix, pairStatistics
+from ratingsStore import readRatings, ratingsVersion
+
+STATISTICS = ('numRatings', 'user1Sum', 'user1SquaredSum', 'sumOfProducts')
+
+# przechowywane listy sąsiadów - dla metody greedy pod nazwą metryki, dla metody weighted z przedrostkiem Weighted
+RANKINGS = dict(SCORE_FUNCTIONS, **{'Weighted' + scoreType: weightFunction
+                                    for scoreType, weightFunction in WEIGHT_FUNCTIONS.items()})
+
+
+def rankingName(scoreType, method):
+    """
+    Funkcja zwracająca nazwę listy sąsiadów (klucz RANKINGS) dla metryki i metody rekomendacji
+    :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+    :param method (str): weighted lub greedy
+    :return: (str) klucz RANKINGS
+    """
+    return 'Weighted' + scoreType if method == 'weighted' else scoreType
+
+
+def grow(buffer, shape):
+    """
+    Funkcja zwracająca bufor mieszczący tablicę o wymiarach shape - ten sam bufor, jeśli jest wystarczająco duży,
+    a w przeciwnym razie nowy, z co najmniej podwojonym za małym wymiarem (zawartość jest kopiowana). Dzięki temu
+    dodawanie kolejnych użytkowników kosztuje średnio tyle, ile zapis ich wierszy, a nie kopia całej macierzy
+    :param buffer (ndarray): bieżący bufor
+    :param shape (tuple): wymagane wymiary
+    :return: (ndarray) bufor o wymiarach nie mniejszych niż shape
+    """
+    if all(size <= capacity for size, capacity in zip(shape, buffer.shape)):
+        return buffer
+    capacity = tuple(max(size, 2 * current) if size > current else current
+                     for size, current in zip(shape, buffer.shape))
+    grown = np.zeros(capacity, dtype=buffer.dtype)
+    grown[tuple(slice(0, size) for size in buffer.shape)] = buffer
+    return grown
+
+
+class SimilarityIndex:
+    """
+    Indeks K najbliższych sąsiadów każdego użytkownika dla metryk Euclidean i Pearson oraz metod greedy i weighted
+    """
+
+    def __init__(self, users, movies, raters, statistics, k, version=None):
+        """
+        Konstruktor - zwykle używamy SimilarityIndex.build lub SimilarityIndex.load
+        :param users (list): imiona i nazwiska użytkowników
+        :param movies (list): tytuły filmów
+        :param raters (list): dla każdego filmu słownik indeks użytkownika -> ocena
+        :param statistics (dict): macierze statystyk par użytkowników (klucze STATISTICS); user1Sum[u, v] to suma
+                                  ocen użytkownika u z filmów ocenionych przez u i v
+        :param k (int): liczba przechowywanych sąsiadów
+        :param version (tuple): wersja pliku ocen, z którego zbudowano indeks (ratingsVersion)
+        """
+        self.users = list(users)
+        self.movies = list(movies)
+        self.userIndex = {user: i for i, user in enumerate(self.users)}
+        self.movieIndex = {movie: i for i, movie in enumerate(self.movies)}
+        self.raters = raters
+        self.k = k
+        self.version = version
+        # bufory z zapasem na nowych użytkowników - statistics, neighbours i scores to widoki na ich początek
+        self.buffers = dict(statistics)
+        for ranking in RANKINGS:
+            self.buffers['neighbours' + ranking] = np.zeros((len(self.users), self.width()), dtype=np.int32)
+            self.buffers['scores' + ranking] = np.zeros((len(self.users), self.width()), dtype=np.float64)
+        self.statistics, self.neighbours, self.scores = {}, {}, {}
+        self.resize()
+        self.refreshRows(np.arange(len(self.users)))
+
+    @classmethod
+    def build(cls, dataset, k=10, version=None):
+        """
+        Funkcja budująca indeks ze słownika ocen
+        :param dataset (dictionary lub RatingsStore): oceny filmów wszystkich osób
+        :param k (int): liczba przechowywanych sąsiadów
+        :param version (tuple): wersja pliku ocen (ratingsVersion), zapisywana w indeksie
+        :return: (SimilarityIndex) indeks
+        """
+        matrix = loadRatingMatrix(dataset)
+        statistics = pairStatistics(matrix, np.arange(len(matrix.users)))
+        # pairStatistics zwraca też user2Sum i user2SquaredSum - są to transpozycje user1Sum i user1SquaredSum
+        named = dict(zip(STATISTICS, (statistics[0], statistics[1], statistics[3], statistics[5])))
+        columns = matrix.columns
+        raters = [dict(zip(columns.indices[columns.indptr[m]:columns.indptr[m + 1]].tolist(),
+                           columns.data[columns.indptr[m]:columns.indptr[m + 1]].tolist()))
+                  for m in range(len(matrix.movies))]
+        return cls(matrix.users, matrix.movies, raters, named, k, version)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Funkcja wczytująca indeks z pliku .npz
+        :param path (str): ścieżka pliku
+        :return: (SimilarityIndex) indeks
+        """
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.users = [str(user) for user in data['users']]
+            index.movies = [str(movie) for movie in data['movies']]
+            index.userIndex = {user: i for i, user in enumerate(index.users)}
+            index.movieIndex = {movie: i for i, movie in enumerate(index.movies)}
+            indptr, raters, ratings = data['ratedIndptr'], data['ratedUsers'].tolist(), data['ratedData'].tolist()
+            index.raters = [dict(zip(raters[indptr[m]:indptr[m + 1]], ratings[indptr[m]:indptr[m + 1]]))
+                            for m in range(len(index.movies))]
+            index.k = int(data['k'])
+            index.version = tuple(data['version'].tolist()) if 'version' in data.files else None
+            index.buffers = {name: data[name] for name in STATISTICS}
+            # indeks zapisany przed dodaniem list dla metody weighted - brakujące listy liczone są ze statystyk
+            missing = [ranking for ranking in RANKINGS if 'neighbours' + ranking not in data.files]
+            for ranking in RANKINGS:
+                if ranking in missing:
+                    index.buffers['neighbours' + ranking] = np.zeros((len(index.users), index.width()), dtype=np.int32)
+                    index.buffers['scores' + ranking] = np.zeros((len(index.users), index.width()), dtype=np.float64)
+                else:
+                    index.buffers['neighbours' + ranking] = data['neighbours' + ranking]
+                    index.buffers['scores' + ranking] = data['scores' + ranking]
+        index.statistics, index.neighbours, index.scores = {}, {}, {}
+        index.resize()
+        if missing:
+            index.refreshRows(np.arange(len(index.users)), missing)
+        return index
+
+    def save(self, path):
+        """
+        Funkcja zapisująca indeks do pliku .npz (pod podaną ścieżką, bez dopisywania rozszerzenia)
+        :param path (str): ścieżka pliku
+        :return: void
+        """
+        arrays = {name: self.statistics[name] for name in STATISTICS}
+        for ranking in RANKINGS:
+            arrays['neighbours' + ranking] = self.neighbours[ranking]
+            arrays['scores' + ranking] = self.scores[ranking]
+        indptr = np.zeros(len(self.movies) + 1, dtype=np.int64)
+        np.cumsum([len(raters) for raters in self.raters], out=indptr[1:])
+        arrays['ratedIndptr'] = indptr
+        arrays['ratedUsers'] = np.array([u for raters in self.raters for u in raters], dtype=np.int32)
+        arrays['ratedData'] = np.array([r for raters in self.raters for r in raters.values()], dtype=np.float64)
+        if self.version is not None:
+            arrays['version'] = np.array(self.version, dtype=np.int64)
+        with open(path, 'wb') as f:
+            np.savez(f, users=np.array(self.users, dtype=str), movies=np.array(self.movies, dtype=str), k=self.k,
+                     **arrays)
+
+    def width(self):
+        """
+        Funkcja zwracająca liczbę sąsiadów przechowywanych dla jednego użytkownika
+        :return: (int) min(k, liczba użytkowników - 1)
+        """
+        return max(0, min(self.k, len(self.users) - 1))
+
+    def resize(self):
+        """
+        Funkcja dopasowująca widoki statystyk i list sąsiadów do bieżącej liczby użytkowników (bufory powiększane są
+        przez grow)
+        :return: void
+        """
+        n, width = len(self.users), self.width()
+        for name in STATISTICS:
+            self.buffers[name] = grow(self.buffers[name], (n, n))
+            self.statistics[name] = self.buffers[name][:n, :n]
+        for ranking in RANKINGS:
+            for name, views in (('neighbours' + ranking, self.neighbours), ('scores' + ranking, self.scores)):
+                self.buffers[name] = grow(self.buffers[name], (n, width))
+                views[ranking] = self.buffers[name][:n, :width]
+
+    def rowStatistics(self, rows):
+        """
+        Funkcja zwracająca statystyki par (użytkownik z rows, każdy użytkownik) w kolejności pairStatistics
+        :param rows (ndarray): indeksy użytkowników
+        :return: (tuple) statystyki jak w pairStatistics
+        """
+        s = self.statistics
+        return (s['numRatings'][rows], s['user1Sum'][rows], s['user1Sum'][:, rows].T,
+                s['user1SquaredSum'][rows], s['user1SquaredSum'][:, rows].T, s['sumOfProducts'][rows])
+
+    def refreshRows(self, rows, rankings=RANKINGS):
+        """
+        Funkcja przeliczająca listy sąsiadów wybranych użytkowników ze statystyk
+        :param rows (ndarray): indeksy użytkowników
+        :param rankings (iterable): przeliczane listy (klucze RANKINGS), domyślnie wszystkie
+        :return: void
+        """
+        if len(rows) == 0:
+            return
+        statistics = self.rowStatistics(rows)
+        width = self.width()
+        for ranking in rankings:
+            scores = RANKINGS[ranking](*statistics)
+            scores[np.arange(len(rows)), rows] = -np.inf
+            # sortowanie stabilne - remisy w kolejności użytkowników, tak jak w calculateScores
+            order = np.argsort(-scores, axis=1, kind='stable')[:, :width]
+            self.neighbours[ranking][rows] = order
+            self.scores[ranking][rows] = np.take_along_axis(scores, order, axis=1)
+
+    def getNeighbours(self, targetUser, scoreType, method='greedy'):
+        """
+        Funkcja zwracająca K najbardziej podobnych użytkowników - dla metody greedy w formacie wyniku
+        calculateScoresMatrix, dla weighted neighbourScores (tylko sąsiedzi o dodatniej wadze)
+        :param targetUser (str): imię i nazwisko użytkownika
+        :param scoreType (str): metryka podobieństwa [Euclidean,Pearson]
+        :param method (str): weighted lub greedy
+        :return: posortowana tablica zawierająca imię i nazwisko osoby, oraz współczynnik podobieństwa
+        """
+        if targetUser not in self.userIndex:
+            raise TypeError('Cannot find ' + targetUser + ' in the dataset')
+        row = self.userIndex[targetUser]
+        ranking = rankingName(scoreType, method)
+        neighbours = [(self.users[i], float(score))
+                      for i, score in zip(self.neighbours[ranking][row], self.scores[ranking][row])]
+        if method == 'weighted':
+            return [(user, score) for user, score in neighbours if score > 0]
+        return neighbours
+
+    def addUser(self, user):
+        """
+        Funkcja dodająca użytkownika bez ocen - statystyki innych użytkowników się nie zmieniają, więc przeliczane
+        są tylko listy, do których może trafić nowy użytkownik
+        :param user (str): imię i nazwisko użytkownika
+        :return: (int) indeks użytkownika
+        """
+        width = self.width()
+        self.userIndex[user] = len(self.users)
+        self.users.append(user)
+        self.resize()
+        row = self.userIndex[user]
+        if self.width() != width:
+            # mniej użytkowników niż k - wydłużają się wszystkie listy
+            rows = np.arange(len(self.users))
+        else:
+            # nowy użytkownik ma z każdym współczynnik 0, a przy remisie jest na końcu (największy indeks), więc
+            # trafia tylko na listy, których ostatni współczynnik jest ujemny (błąd zaokrąglenia 1 - r lub ujemne r)
+            affected = [np.flatnonzero(self.scores[ranking][:row, -1] < 0) for ranking in RANKINGS]
+            rows = np.unique(np.concatenate(affected + [np.array([row])]))
+        self.refreshRows(rows)
+        return row
+
+    def addMovie(self, movie):
+        """
+        Funkcja dodająca film bez ocen
+        :param movie (str): tytuł filmu
+        :return: (int) indeks filmu
+        """
+        self.movieIndex[movie] = len(self.movies)
+        self.movies.append(movie)
+        self.raters.append({})
+        return self.movieIndex[movie]
+
+    def setRating(self, user, movie, rating):
+        """
+        Funkcja dodająca lub zmieniająca ocenę i aktualizująca tylko dotknięte nią statystyki i listy sąsiadów
+        :param user (str): imię i nazwisko użytkownika
+        :param movie (str): tytuł filmu
+        :param rating (int): ocena
+        :return: void
+        """
+        u = self.userIndex[user] if user in self.userIndex else self.addUser(user)
+        m = self.movieIndex[movie] if movie in self.movieIndex else self.addMovie(movie)
+        if u in self.raters[m]:
+            self.updateStatistics(u, m, self.raters[m][u], -1)
+        self.raters[m][u] = rating
+        self.updateStatistics(u, m, rating, 1)
+        self.refreshAffected(m)
+
+    def removeRating(self, user, movie):
+        """
+        Funkcja usuwająca ocenę i aktualizująca tylko dotknięte nią statystyki i listy sąsiadów
+        :param user (str): imię i nazwisko użytkownika
+        :param movie (str): tytuł filmu
+        :return: void
+        """
+        u, m = self.userIndex[user], self.movieIndex[movie]
+        if u not in self.raters[m]:
+            return
+        self.updateStatistics(u, m, self.raters[m].pop(u), -1)
+        self.refreshAffected(m, u)
+
+    def updateStatistics(self, u, m, rating, sign):
+        """
+        Funkcja dodająca (sign = 1) lub odejmująca (sign = -1) wkład oceny filmu m użytkownika u do statystyk
+        jego par z osobami, które oceniły ten film
+        :param u (int): indeks użytkownika
+        :param m (int): indeks filmu
+        :param rating (float): ocena
+        :param sign (int): 1 lub -1
+        :return: void
+        """
+        s = self.statistics
+        others = np.array([v for v in self.raters[m] if v != u], dtype=np.int64)
+        otherRatings = np.array([self.raters[m][v] for v in others.tolist()], dtype=np.float64)
+
+        s['numRatings'][u, others] += sign
+        s['numRatings'][others, u] += sign
+        s['user1Sum'][u, others] += sign * rating
+        s['user1Sum'][others, u] += sign * otherRatings
+        s['user1SquaredSum'][u, others] += sign * rating ** 2
+        s['user1SquaredSum'][others, u] += sign * otherRatings ** 2
+        s['sumOfProducts'][u, others] += sign * rating * otherRatings
+        s['sumOfProducts'][others, u] += sign * rating * otherRatings
+
+        s['numRatings'][u, u] += sign
+        s['user1Sum'][u, u] += sign * rating
+        s['user1SquaredSum'][u, u] += sign * rating ** 2
+        s['sumOfProducts'][u, u] += sign * rating ** 2
+
+    def refreshAffected(self, m, *extra):
+        """
+        Funkcja przeliczająca listy sąsiadów osób, które oceniły film m (oraz dodatkowych użytkowników)
+        :param m (int): indeks filmu
+        :param extra (int): dodatkowe indeksy użytkowników
+        :return: void
+        """
+        rows = np.union1d(np.array(list(self.raters[m]), dtype=np.int64), np.array(extra, dtype=np.int64))
+        self.refreshRows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a top-K user similarity index')
+    parser.add_argument('--ratings', default='./data/ratings.json', help='Ratings JSON file or binary ratings store')
+    parser.add_argument('--output', default='./data/index.npz', help='Index file')
+    parser.add_argument('--k', type=int, default=10, help='Number of neighbours stored per user')
+    args = parser.parse_args()
+
+    index = SimilarityIndex.build(readRatings(args.ratings), args.k, ratingsVersion(args.ratings))
+    index.save(args.output)
+    print(f"Zapisano indeks {len(index.users)} użytkowników (k = {index.k}) do {args.output}")